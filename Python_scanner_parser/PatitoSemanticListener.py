@@ -7,6 +7,7 @@ from virtual_memory import VirtualMemory
 from TempManager import TempManager
 from quads import Quadruple
 from opcodes import OPCODES
+from folding import NOT_FOLDABLE, fold_binary
 
 class PatitoSemanticListener(PatitoListener):
     """
@@ -25,9 +26,20 @@ class PatitoSemanticListener(PatitoListener):
         1. Scanner: convierte texto en tokens
         2. Parser: tokens a árbol sintáctico
         3. Listener: árbol sintáctico a semántica + código intermedio
+
+    Con fold_constants, una operación entre dos constantes se evalúa al
+    compilar y su resultado se vuelve otra constante (sin cuádruplo).
+
+    Cada enterX/exitX solo saca del contexto lo que necesita (nombres,
+    operadores, número de argumentos) y llama a un método sin ctx
+    (begin_*, declare_*, push_*, emit_*, end_*); los emit_* reciben los
+    operandos como (addr, tipo) y las pilas solo las manejan los exitX.
+    descent_parser.DescentParser llama a esos mismos métodos mientras
+    parsea, sin construir el árbol, y code_generator.PatitoCodeGenerator
+    desde un visitor que pasa los operandos sin pilas.
     """
 
-    def __init__(self):
+    def __init__(self, fold_constants=True):
         # ============================================================
         # TABLAS PRINCIPALES DE COMPILACIÓN
         # ============================================================
@@ -42,6 +54,9 @@ class PatitoSemanticListener(PatitoListener):
         # Cubo semántico: define tipos + operadores válidos y resultado esperado
         self.cube = SemanticCube()
 
+        # Plegado de constantes: 2 * 3 se calcula aquí y no en la VM
+        self.fold_constants = fold_constants
+
         # ============================================================
         # MEMORIA VIRTUAL
         # ============================================================
@@ -72,16 +87,6 @@ class PatitoSemanticListener(PatitoListener):
         # Saltos pendientes de rellenar (backpatch)
         self.jump_stack = []
 
-        # ============================================================
-        # CONTROL DE CONTEXTO
-        # ============================================================
-        # Estas flags son necesarias porque la gramática permite:
-        #   if(expr)
-        #   if(expr relop expr)
-        # Sin estas flags, el listener no sabe cuándo expr pertenece a un IF/WHILE
-        self.in_if_condition = False
-        self.in_while_condition = False
-
         # Guarda el índice del inicio del ciclo while
         # para generar el salto hacia atrás
         self.while_start_stack = []
@@ -153,10 +158,43 @@ class PatitoSemanticListener(PatitoListener):
         self.constants[addr] = value
         return addr
 
+    # ============================================================
+    # OPERACIONES BINARIAS
+    # ============================================================
+    def emit_binary(self, op, l_op, l_ty, r_op, r_ty):
+        """
+        Genera (op, l_op, r_op, temp) y regresa (dirección, tipo) del resultado.
+        Si ambos operandos son constantes se pliega: el valor se calcula aquí,
+        se guarda como constante del tipo que indica el cubo y no se emite cuádruplo.
+        Los operandos temporales quedan consumidos y el resultado puede reusar
+        su dirección.
+        """
+        res_ty = self.cube.check_op(op, l_ty, r_ty)
+        opcode = OPCODES[op]
+
+        if (
+            self.fold_constants
+            and res_ty != "ERROR"
+            and l_op in self.constants
+            and r_op in self.constants
+        ):
+            value = fold_binary(opcode, self.constants[l_op], self.constants[r_op])
+            if value is not NOT_FOLDABLE:
+                return self.get_or_add_constant(value, res_ty), res_ty
+
+        self.temp_manager.release(l_op)
+        self.temp_manager.release(r_op)
+        _, addr = self.temp_manager.new_temp(res_ty)
+        self.quadruples.append(Quadruple(opcode, l_op, r_op, addr))
+        return addr, res_ty
+
     # ============================================================
     # PROGRAM
     # ============================================================
     def enterProgram(self, ctx):
+        self.begin_program()
+
+    def begin_program(self):
         """
         Estrategia compilador:
         - ANTES del main se generan funciones
@@ -176,60 +214,77 @@ class PatitoSemanticListener(PatitoListener):
 
         # Bloque MAIN (padre es ProgramContext)
         if isinstance(parent, PatitoParser.ProgramContext):
-            # backpatch GOTO al inicio del main
-            if self.goto_main_index is not None:
-                self.quadruples[self.goto_main_index].res = len(self.quadruples)
+            self.begin_main()
 
         # Bloque de función
         elif isinstance(parent, PatitoParser.FuncDeclContext):
-            fname = parent.ID().getText()
-            # Cuádruplo donde inicia el código ejecutable
-            self.funcdir.set_start(fname, len(self.quadruples))
-            # reset temporales → buena práctica / debug
-            self.temp_manager.counter = 0
+            self.begin_function_body(parent.ID().getText())
+
+        # Bloque THEN de un IF o cuerpo de un WHILE: la condición completa
+        # ya quedó en el tope de la pila → GOTOF
+        elif isinstance(parent, PatitoParser.WhileStmtContext) or (
+            isinstance(parent, PatitoParser.IfStmtContext) and ctx == parent.block(0)
+        ):
+            self.emit_condition_jump()
+
+    def begin_main(self):
+        # backpatch GOTO al inicio del main
+        if self.goto_main_index is not None:
+            self.quadruples[self.goto_main_index].res = len(self.quadruples)
+        self.temp_manager.reset()
+
+    def begin_function_body(self, fname):
+        # Cuádruplo donde inicia el código ejecutable
+        self.funcdir.set_start(fname, len(self.quadruples))
+        # temporales propios del marco de la función
+        self.temp_manager.reset()
 
     # ============================================================
     # DECLARACIONES
     # ============================================================
     def enterVarDecl(self, ctx):
+        vtype = ctx.type_().getText()
+        self.declare_vars([x.getText() for x in ctx.idList().ID()], vtype)
+
+    def declare_vars(self, names, vtype):
         """
         varDecl: idList : type;
         Cada ID genera una dirección nueva en el segmento:
         - Global si estamos en global
         - Local si estamos dentro de función
         """
-        vtype = ctx.type_().getText()
-        ids = [x.getText() for x in ctx.idList().ID()]
-        for name in ids:
+        for name in names:
             self.vartab.add_var(name, vtype)
 
     def enterFuncDecl(self, ctx):
+        params = []
+        if ctx.paramList():
+            params = [(p.ID().getText(), p.type_().getText()) for p in ctx.paramList().param()]
+        self.declare_function(ctx.ID().getText(), ctx.type_().getText(), params)
+
+    def declare_function(self, fname, ret_type, params):
         """
         type ID(params)
         Registrar función en directorio:
         - tipo retorno
         - parámetros (pero aún no set_start)
         """
-        ret_type = ctx.type_().getText()
-        fname = ctx.ID().getText()
         self.funcdir.add_function(fname, ret_type)
 
         # Agregar parámetros a tabla local
-        if ctx.paramList():
-            for p in ctx.paramList().param():
-                self.funcdir.add_param(
-                    p.ID().getText(),
-                    p.type_().getText()
-                )
+        for pname, ptype in params:
+            self.funcdir.add_param(pname, ptype)
 
     def exitFuncDecl(self, ctx):
+        self.end_function(ctx.ID().getText())
+
+    def end_function(self, fname):
         """
         Al salir:
             - Verificar RETURN obligatorio
             - INYECTAR ENDFUNC
             - Regresar a contexto global
         """
-        fname = ctx.ID().getText()
         finfo = self.funcdir.lookup_function(fname)
 
         # Si nunca se entró al block
@@ -254,82 +309,56 @@ class PatitoSemanticListener(PatitoListener):
         TRUE/FALSE → dirección const
         """
         if ctx.ID():
-            vinfo = self.vartab.lookup(ctx.ID().getText())
-            self.operand_stack.append(vinfo.address)
-            self.type_stack.append(vinfo.var_type)
-            return
-
-        if ctx.CTE_INT():
-            value = int(ctx.CTE_INT().getText())
-            addr = self.get_or_add_constant(value, "int")
-            self.operand_stack.append(addr)
-            self.type_stack.append("int")
-            return
-
-        if ctx.CTE_FLOAT():
-            value = float(ctx.CTE_FLOAT().getText())
-            addr = self.get_or_add_constant(value, "float")
-            self.operand_stack.append(addr)
-            self.type_stack.append("float")
-            return
-
-        if ctx.TRUE() or ctx.FALSE():
-            value = True if ctx.TRUE() else False
-            addr = self.get_or_add_constant(value, "bool")
-            self.operand_stack.append(addr)
-            self.type_stack.append("bool")
-            return
-
-        if ctx.STRING():
-            txt = ctx.STRING().getText()
-            addr = self.get_or_add_constant(txt, "string")
-            self.operand_stack.append(addr)
-            self.type_stack.append("string")
-            return
-
-    # ============================================================
-    # OPERADORES BINARIOS * /
-    # ============================================================
-    def exitMultOp(self, ctx):
-        """
-        multExpr (*) unaryExpr
-        ANTLR ya dejó ambos operandos evaluados en la pila
-        """
-        r_op = self.operand_stack.pop()
-        r_ty = self.type_stack.pop()
-        l_op = self.operand_stack.pop()
-        l_ty = self.type_stack.pop()
+            self.push_variable(ctx.ID().getText())
+        elif ctx.CTE_INT():
+            self.push_constant(int(ctx.CTE_INT().getText()), "int")
+        elif ctx.CTE_FLOAT():
+            self.push_constant(float(ctx.CTE_FLOAT().getText()), "float")
+        elif ctx.TRUE() or ctx.FALSE():
+            self.push_constant(True if ctx.TRUE() else False, "bool")
+        elif ctx.STRING():
+            self.push_constant(ctx.STRING().getText(), "string")
+
+    def push_variable(self, name):
+        vinfo = self.vartab.lookup(name)
+        self.push_operand(vinfo.address, vinfo.var_type)
 
-        op = ctx.getChild(1).getText()
-        res_ty = self.cube.check_op(op, l_ty, r_ty)
+    def push_constant(self, value, vtype):
+        self.push_operand(self.get_or_add_constant(value, vtype), vtype)
 
-        _, addr = self.temp_manager.new_temp(res_ty)
+    def push_operand(self, addr, vtype):
+        self.operand_stack.append(addr)
+        self.type_stack.append(vtype)
 
-        opcode = OPCODES[op]
-        self.quadruples.append(Quadruple(opcode, l_op, r_op, addr))
+    def pop_operand(self):
+        return self.operand_stack.pop(), self.type_stack.pop()
 
-        self.operand_stack.append(addr)
-        self.type_stack.append(res_ty)
+    def pop_operands(self, count):
+        # Los últimos `count` operandos como [(addr, tipo)], en orden
+        if not count:
+            return []
+        operands = list(zip(self.operand_stack[-count:], self.type_stack[-count:]))
+        del self.operand_stack[-count:]
+        del self.type_stack[-count:]
+        return operands
 
     # ============================================================
-    # OPERADORES BINARIOS + -
+    # OPERADORES BINARIOS * / + -
     # ============================================================
-    def exitAddOp(self, ctx):
-        r_op = self.operand_stack.pop()
-        r_ty = self.type_stack.pop()
-        l_op = self.operand_stack.pop()
-        l_ty = self.type_stack.pop()
-
-        op = ctx.getChild(1).getText()
-        res_ty = self.cube.check_op(op, l_ty, r_ty)
-
-        _, addr = self.temp_manager.new_temp(res_ty)
-        opcode = OPCODES[op]
+    def exitMultOp(self, ctx):
+        """
+        multExpr (*) unaryExpr
+        ANTLR ya dejó ambos operandos evaluados en la pila
+        """
+        self.apply_binary(ctx.getChild(1).getText())
 
-        self.quadruples.append(Quadruple(opcode, l_op, r_op, addr))
+    def exitAddOp(self, ctx):
+        self.apply_binary(ctx.getChild(1).getText())
 
-        self.operand_stack.append(addr)
-        self.type_stack.append(res_ty)
+    def apply_binary(self, op):
+        r_op, r_ty = self.pop_operand()
+        l_op, l_ty = self.pop_operand()
+        self.push_operand(*self.emit_binary(op, l_op, l_ty, r_op, r_ty))
 
     # ============================================================
     # EXPRESIONES RELACIONALES
@@ -337,15 +366,22 @@ class PatitoSemanticListener(PatitoListener):
     def exitRelExpr(self, ctx):
         """
         expr relop expr
-        Produce temporal booleano y si estamos en IF/WHILE → GOTOF
+        Produce temporal booleano
         """
-        left_ctx = ctx.expr(0)
-        right_ctx = ctx.expr(1)
-
         # expr_value almacena pares cuando exitToAdd los guarda
-        l_val = self.expr_value.get(left_ctx)
-        r_val = self.expr_value.get(right_ctx)
+        l_val = self.expr_value.get(ctx.expr(0))
+        r_val = self.expr_value.get(ctx.expr(1))
+
+        self.expr_value[ctx] = self.emit_relational(
+            ctx.relop().getText(), l_val, r_val, ctx.getText
+        )
 
+    def emit_relational(self, op, l_val, r_val, describe):
+        """
+        l_val / r_val: (addr, tipo) con que terminó cada operando, o None.
+        describe() da el texto de la expresión para el mensaje de error.
+        Regresa el (addr, tipo) del resultado.
+        """
         # fallback: use pop del stack
         def pop_stack(side):
             if not self.operand_stack:
@@ -357,7 +393,7 @@ class PatitoSemanticListener(PatitoListener):
 
         if not r_pair or not l_pair:
             raise SemanticError(
-                f"Expresión relacional incompleta: '{ctx.getText()}', "
+                f"Expresión relacional incompleta: '{describe()}', "
             )
 
         r_op, r_ty = r_pair
@@ -371,51 +407,37 @@ class PatitoSemanticListener(PatitoListener):
             self.operand_stack.pop()
             self.type_stack.pop()
 
-        op = ctx.relop().getText()
-        res_ty = self.cube.check_op(op, l_ty, r_ty)
-
-        _, addr = self.temp_manager.new_temp(res_ty)
-        opcode = OPCODES[op]
-        self.quadruples.append(Quadruple(opcode, l_op, r_op, addr))
+        addr, res_ty = self.emit_binary(op, l_op, l_ty, r_op, r_ty)
+        self.push_operand(addr, res_ty)
+        return addr, res_ty
 
-        self.operand_stack.append(addr)
-        self.type_stack.append(res_ty)
-        self.expr_value[ctx] = (addr, res_ty)
+    def emit_condition_jump(self):
+        """
+        GOTOF sobre la condición en el tope de la pila; el destino se
+        rellena al cerrar el bloque (queda en jump_stack).
+        """
+        cond, _ = self.pop_operand()
+        self.jump_stack.append(self.emit_gotof(cond))
 
-        # IF → GOTOF
-        if self.in_if_condition:
-            cond = self.operand_stack.pop()
-            self.type_stack.pop()
-            self.quadruples.append(
-                Quadruple(OPCODES["GOTOF"], cond, None, None)
-            )
-            self.jump_stack.append(len(self.quadruples) - 1)
-            self.in_if_condition = False
-
-        # WHILE → GOTOF
-        elif self.in_while_condition:
-            cond = self.operand_stack.pop()
-            self.type_stack.pop()
-            self.quadruples.append(
-                Quadruple(OPCODES["GOTOF"], cond, None, None)
-            )
-            self.jump_stack.append(len(self.quadruples) - 1)
-            self.in_while_condition = False
+    def emit_gotof(self, cond):
+        # GOTOF con destino pendiente; regresa su índice para el backpatch
+        self.quadruples.append(Quadruple(OPCODES["GOTOF"], cond, None, None))
+        self.temp_manager.release(cond)
+        return len(self.quadruples) - 1
 
     # ============================================================
     # ASIGNACIÓN
     # ============================================================
     def exitAssignStmt(self, ctx):
+        # expr dejó valor en operand_stack
+        self.emit_assign(ctx.ID().getText(), *self.pop_operand())
+
+    def emit_assign(self, name, expr_addr, expr_type):
         """
         ID = expr;
-        expr dejó valor en operand_stack
         """
-        name = ctx.ID().getText()
         vinfo = self.vartab.lookup(name)
 
-        expr_addr = self.operand_stack.pop()
-        expr_type = self.type_stack.pop()
-
         self.cube.check_assign(vinfo.var_type, expr_type)
 
         self.quadruples.append(
@@ -433,30 +455,40 @@ class PatitoSemanticListener(PatitoListener):
             self.quadruples.append(Quadruple(OPCODES["RET"], expr_addr, None, None))
             self.funcdir.mark_return(name)
 
+        self.temp_manager.release(expr_addr)
+
     # ============================================================
     # PRINT
     # ============================================================
     def exitPrintStmt(self, ctx):
+        count = len(ctx.printArgList().expr()) if ctx.printArgList() else 0
+        self.emit_print(self.pop_print_args(count))
+
+    def pop_print_args(self, count):
         """
-        print(expr, expr,...)
         Se evalúan todas las expr antes, así que
-        operand_stack ya contiene direcciones
+        operand_stack ya contiene direcciones.
         """
-        if ctx.printArgList():
-            count = len(ctx.printArgList().expr())
-            if len(self.operand_stack) < count:
-                raise SemanticError("Argumentos de print no evaluados correctamente")
+        if len(self.operand_stack) < count:
+            raise SemanticError("Argumentos de print no evaluados correctamente")
+        return [addr for addr, _ in self.pop_operands(count)]
 
-            addrs = []
-            for _ in range(count):
-                addrs.append(self.operand_stack.pop())
-                self.type_stack.pop()
-
-            # pila invierte orden → revertir
-            for addr in reversed(addrs):
+    def emit_print(self, addrs):
+        """
+        print(expr, expr,...)
+        Cada argumento menos el último genera PRINTA (se queda en la misma
+        línea); el último genera PRINT, que termina la línea.
+        """
+        if addrs:
+            for addr in addrs[:-1]:
                 self.quadruples.append(
-                    Quadruple(OPCODES["PRINT"], addr, None, None)
+                    Quadruple(OPCODES["PRINTA"], addr, None, None)
                 )
+            self.quadruples.append(
+                Quadruple(OPCODES["PRINT"], addrs[-1], None, None)
+            )
+            for addr in addrs:
+                self.temp_manager.release(addr)
         else:
             self.quadruples.append(
                 Quadruple(OPCODES["PRINT"], None, None, None)
@@ -466,22 +498,28 @@ class PatitoSemanticListener(PatitoListener):
     # LLAMADA A FUNCIÓN COMO EXPRESIÓN O STATEMENT
     # ============================================================
     def exitFuncCall(self, ctx):
+        arg_count = len(ctx.argList().expr()) if ctx.argList() else 0
+        is_stmt_call = isinstance(ctx.parentCtx, PatitoParser.FuncCallStmtContext)
+        result = self.emit_call(ctx.ID().getText(), self.pop_operands(arg_count), is_stmt_call)
+        if result is not None:
+            self.push_operand(*result)
+
+    def emit_call(self, fname, args, is_stmt_call):
         """
+        args: [(addr, tipo)] de los argumentos ya evaluados, en orden.
         Genera:
           ERA fname
           PARAM (...)
           GOSUB fname, start
           = return_addr, temp
+        Regresa (temp, tipo) si la llamada es parte de una expresión.
         """
-        fname = ctx.ID().getText()
         finfo = self.funcdir.lookup_function(fname)
 
         # Crear AR de llamada
         self.quadruples.append(Quadruple(OPCODES["ERA"], None, None, fname))
 
-        # Extraer args
-        arg_exprs = ctx.argList().expr() if ctx.argList() else []
-        arg_count = len(arg_exprs)
+        arg_count = len(args)
         expected_count = len(finfo["params"])
 
         if arg_count != expected_count:
@@ -490,14 +528,8 @@ class PatitoSemanticListener(PatitoListener):
                 f"esperado {expected_count}, recibido {arg_count}"
             )
 
-        if arg_count:
-            arg_addrs = self.operand_stack[-arg_count:]
-            arg_types = self.type_stack[-arg_count:]
-        else:
-            arg_addrs, arg_types = [], []
-
         # PARAM
-        for idx, (addr, ty) in enumerate(zip(arg_addrs, arg_types)):
+        for idx, (addr, ty) in enumerate(args):
             expected = finfo["params"][idx]["type"]
             self.cube.check_assign(expected, ty)
             target_addr = finfo["params"][idx]["address"]
@@ -505,10 +537,9 @@ class PatitoSemanticListener(PatitoListener):
                 Quadruple(OPCODES["PARAM"], addr, None, target_addr)
             )
 
-        # limpiar args de pilas
-        for _ in range(arg_count):
-            self.operand_stack.pop()
-            self.type_stack.pop()
+        # liberar temporales de los args (del último al primero)
+        for addr, _ in reversed(args):
+            self.temp_manager.release(addr)
 
         # Llamada efectiva
         if finfo["start"] is None:
@@ -519,9 +550,6 @@ class PatitoSemanticListener(PatitoListener):
         )
 
         # Manejo de return
-        parent = ctx.parentCtx
-        is_stmt_call = isinstance(parent, PatitoParser.FuncCallStmtContext)
-
         if finfo["ret"] != "void":
             _, temp_addr = self.temp_manager.new_temp(finfo["ret"])
             ret_addr = finfo["return_addr"]
@@ -530,24 +558,19 @@ class PatitoSemanticListener(PatitoListener):
             )
             # si es parte de expresión
             if not is_stmt_call:
-                self.operand_stack.append(temp_addr)
-                self.type_stack.append(finfo["ret"])
+                return temp_addr, finfo["ret"]
+            self.temp_manager.release(temp_addr)
         else:
             # función void NO puede estar en expr
             if not is_stmt_call:
                 raise SemanticError(
                     f"La función '{fname}' es void y no puede usarse en expresiones"
                 )
+        return None
 
     # ============================================================
     # IF
     # ============================================================
-    def enterIfStmt(self, ctx):
-        """
-        Siguiente expr será condición
-        """
-        self.in_if_condition = True
-
     def exitIfStmt(self, ctx):
         """
         Lógica principal en exitBlock
@@ -569,40 +592,51 @@ class PatitoSemanticListener(PatitoListener):
 
             # THEN
             if ctx == blocks[0]:
-                if parent.ELSE():
-                    false_jump = self.jump_stack.pop()
-                    # Saltar ELSE
-                    self.quadruples.append(
-                        Quadruple(OPCODES["GOTO"], None, None, None)
-                    )
-                    end_jump = len(self.quadruples) - 1
-                    self.jump_stack.append(end_jump)
-
-                    # GOTOF → inicio ELSE
-                    self.quadruples[false_jump].res = len(self.quadruples)
-                else:
-                    # IF sin else
-                    if self.jump_stack:
-                        false_jump = self.jump_stack.pop()
-                        self.quadruples[false_jump].res = len(self.quadruples)
+                self.end_then_block(parent.ELSE() is not None)
 
             # ELSE
             elif len(blocks) > 1 and ctx == blocks[1]:
-                if self.jump_stack:
-                    end_jump = self.jump_stack.pop()
-                    self.quadruples[end_jump].res = len(self.quadruples)
+                self.end_else_block()
+
+    def end_then_block(self, has_else):
+        if has_else:
+            false_jump = self.jump_stack.pop()
+            # Saltar ELSE
+            self.quadruples.append(
+                Quadruple(OPCODES["GOTO"], None, None, None)
+            )
+            end_jump = len(self.quadruples) - 1
+            self.jump_stack.append(end_jump)
+
+            # GOTOF → inicio ELSE
+            self.quadruples[false_jump].res = len(self.quadruples)
+        else:
+            # IF sin else
+            if self.jump_stack:
+                false_jump = self.jump_stack.pop()
+                self.quadruples[false_jump].res = len(self.quadruples)
+
+    def end_else_block(self):
+        if self.jump_stack:
+            end_jump = self.jump_stack.pop()
+            self.quadruples[end_jump].res = len(self.quadruples)
 
     # ============================================================
     # WHILE
     # ============================================================
     def enterWhileStmt(self, ctx):
+        self.begin_while()
+
+    def begin_while(self):
         """
         Registrar índice del inicio de la condición
         """
         self.while_start_stack.append(len(self.quadruples))
-        self.in_while_condition = True
 
     def exitWhileStmt(self, ctx):
+        self.end_while()
+
+    def end_while(self):
         """
         1. GOTO → inicio condición
         2. Backpatch GOTOF → salida
@@ -621,18 +655,17 @@ class PatitoSemanticListener(PatitoListener):
     # UNARIOS
     # ============================================================
     def exitUnarySign(self, ctx):
+        sign = ctx.getChild(0).getText()
+        self.push_operand(*self.emit_unary(sign, *self.pop_operand()))
+
+    def emit_unary(self, sign, operand_addr, operand_type):
         """
         +x → sin efecto
         -x → generar 0 - x
+        Regresa (addr, tipo) del resultado.
         """
-        sign = ctx.getChild(0).getText()
-        operand_addr = self.operand_stack.pop()
-        operand_type = self.type_stack.pop()
-
         if sign == '+':
-            self.operand_stack.append(operand_addr)
-            self.type_stack.append(operand_type)
-            return
+            return operand_addr, operand_type
 
         if operand_type not in ("int", "float"):
             raise SemanticError(f"No se puede aplicar signo a tipo {operand_type}")
@@ -640,80 +673,31 @@ class PatitoSemanticListener(PatitoListener):
         zero_val = 0.0 if operand_type == "float" else 0
         zero_addr = self.get_or_add_constant(zero_val, operand_type)
 
-        _, temp_addr = self.temp_manager.new_temp(operand_type)
-        self.quadruples.append(
-            Quadruple(OPCODES["-"], zero_addr, operand_addr, temp_addr)
-        )
-
-        self.operand_stack.append(temp_addr)
-        self.type_stack.append(operand_type)
+        temp_addr, _ = self.emit_binary("-", zero_addr, operand_type, operand_addr, operand_type)
+        return temp_addr, operand_type
 
     # ============================================================
-    # CONDICIÓN SIN OP RELACIONAL (expr simple)
+    # VALOR DE UNA EXPRESIÓN SIN OP RELACIONAL
     # ============================================================
     def exitToAdd(self, ctx):
         """
-        expr sin relop
-        Puede ser condición de IF/WHILE a GOTOF
-        """
-        if not (self.in_if_condition or self.in_while_condition):
-            if self.operand_stack:
-                self.expr_value[ctx] = (self.operand_stack[-1], self.type_stack[-1])
-            return
-
-        # Detección del contexto padre real
-        stmt_ctx = None
-        parent_expr = None
-        if isinstance(ctx.parentCtx, (PatitoParser.IfStmtContext, PatitoParser.WhileStmtContext)):
-            stmt_ctx = ctx.parentCtx
-            parent_expr = ctx
-        elif isinstance(ctx.parentCtx, PatitoParser.ExprContext):
-            parent_expr = ctx.parentCtx
-            if isinstance(parent_expr.parentCtx, (PatitoParser.IfStmtContext, PatitoParser.WhileStmtContext)):
-                stmt_ctx = parent_expr.parentCtx
-
-            if parent_expr.relop():
-                if self.operand_stack:
-                    self.expr_value[ctx] = (self.operand_stack[-1], self.type_stack[-1])
-                return
-
-        if stmt_ctx is None:
-            if self.operand_stack:
-                self.expr_value[ctx] = (self.operand_stack[-1], self.type_stack[-1])
-            return
-
-        # Validar que este expr es realmente el condicional
-        if isinstance(stmt_ctx, PatitoParser.IfStmtContext):
-            if stmt_ctx.expr() != parent_expr:
-                return
-        else:
-            if stmt_ctx.expr() != parent_expr:
-                return
-
-        # Generar GOTOF directo
-        cond_addr = self.operand_stack.pop()
-        self.type_stack.pop()
-
-        self.quadruples.append(Quadruple(OPCODES["GOTOF"], cond_addr, None, None))
-        self.jump_stack.append(len(self.quadruples) - 1)
-
-        # Reset banderas
-        if isinstance(stmt_ctx, PatitoParser.IfStmtContext):
-            self.in_if_condition = False
-        else:
-            self.in_while_condition = False
-
-        self.expr_value[parent_expr] = (self.quadruples[-1].left, "int")
+        expr sin relop: su valor queda para exitRelExpr
+        """
+        if self.operand_stack:
+            self.expr_value[ctx] = (self.operand_stack[-1], self.type_stack[-1])
 
     # ============================================================
     # RETURN
     # ============================================================
     def exitReturnStmt(self, ctx):
+        # expr dejó valor en operand_stack
+        self.emit_return(*self.pop_operand())
+
+    def emit_return(self, expr_addr, expr_type):
         """
         return(expr)
-        1. expr en pila
-        2. mover a return_addr
-        3. emitir RET
+        1. mover expr a return_addr
+        2. emitir RET
         """
         if self.funcdir.current_function == "global":
             raise SemanticError("Un return solo puede aparecer dentro de una función")
@@ -722,13 +706,11 @@ class PatitoSemanticListener(PatitoListener):
         if finfo["ret"] == "void":
             raise SemanticError("Una función void no puede retornar un valor")
 
-        expr_addr = self.operand_stack.pop()
-        expr_type = self.type_stack.pop()
-
         self.cube.check_assign(finfo["ret"], expr_type)
 
         self.quadruples.append(
             Quadruple(OPCODES["="], expr_addr, None, finfo["return_addr"])
         )
         self.quadruples.append(Quadruple(OPCODES["RET"], expr_addr, None, None))
+        self.temp_manager.release(expr_addr)
         self.funcdir.mark_return(self.funcdir.current_function)
@@ -1,13 +1,46 @@
 class TempManager:
+    """
+    Temporales con listas libres por tipo.
+
+    El listener libera cada temporal en cuanto lo consume (release) y
+    new_temp reutiliza primero una dirección libre del mismo tipo, así que un
+    marco necesita tantas casillas temporales como la expresión más profunda
+    de su función, no como el programa completo. Al iniciar cada función (y
+    el main) reset() vuelve a empezar desde la base de los segmentos: cada
+    activación tiene sus propios temporales.
+    """
+
     def __init__(self, memory):
         self.memory = memory
         self.counter = 0
         self.addr_to_name = {}
+        # dirección -> tipo, y tipo -> direcciones libres
+        self.types = {}
+        self.free = {}
+        self.in_use = set()
 
     def new_temp(self, vtype):
-        # Genera un temporal y guarda un alias legible para debug
-        addr = self.memory.alloc_temp(vtype)
-        name = f"t{self.counter}"
-        self.counter += 1
-        self.addr_to_name[addr] = name
-        return name, addr
+        # Genera (o reutiliza) un temporal; el alias de debug es uno por dirección
+        free = self.free.get(vtype)
+        if free:
+            addr = free.pop()
+        else:
+            addr = self.memory.alloc_temp(vtype)
+            self.types[addr] = vtype
+            if addr not in self.addr_to_name:
+                self.addr_to_name[addr] = f"t{self.counter}"
+                self.counter += 1
+        self.in_use.add(addr)
+        return self.addr_to_name[addr], addr
+
+    def release(self, addr):
+        # El valor ya se leyó: la dirección queda libre. Variables y
+        # constantes (o un temporal ya liberado) se ignoran
+        if addr in self.in_use:
+            self.in_use.remove(addr)
+            self.free.setdefault(self.types[addr], []).append(addr)
+
+    def reset(self):
+        self.in_use.clear()
+        self.free.clear()
+        self.memory.reset_temps()
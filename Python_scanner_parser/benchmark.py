@@ -0,0 +1,797 @@
+"""
+Micro-benchmarks de la Máquina Virtual de Patito.
+
+Uso:
+    python benchmark.py memory      # motor de memoria dict vs flat
+    python benchmark.py dispatch    # if / tabla / enlazado / closures / python
+    python benchmark.py warm        # compilar+ejecutar vs Program reutilizado
+    python benchmark.py cache       # compilar vs cargar de CompileCache (y entrada corrupta)
+    python benchmark.py ptc         # compilar vs cargar .ptc (y archivos corruptos)
+    python benchmark.py frames      # marcos de activación con y sin pool
+    python benchmark.py opt         # cuádruplos generados/ejecutados por nivel -O
+    python benchmark.py parse       # parser ANTLR: LL completo vs SLL y luego LL
+    python benchmark.py lexer       # PatitoLexer (ANTLR) vs fast_lexer.FastLexer
+    python benchmark.py frontend    # árbol ANTLR + listener vs descent_parser (tiempo y memoria)
+    python benchmark.py visitor     # PatitoSemanticListener vs PatitoCodeGenerator sobre el árbol
+    python benchmark.py units       # árbol de todo el archivo vs una función a la vez (memoria)
+"""
+import contextlib
+import gc
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+
+from PatitoLexer import PatitoLexer
+from PatitoSemanticListener import PatitoSemanticListener
+from code_generator import PatitoCodeGenerator
+from compile_cache import ENTRY_SUFFIX, CompileCache
+from fast_lexer import FastLexer
+from virtual_machine import VirtualMachine
+import compiler
+import ptc
+import py_backend
+
+
+# Programa con ciclo cerrado al estilo de sumaHasta (tests/test_3.txt)
+SUMA_HASTA = """
+program BenchSuma;
+var
+    total, i : int;
+
+int sumaHasta(n : int)
+var
+    acc : int;
+{
+    acc = 0;
+    while (n > 0) do {
+        acc = acc + n;
+        n = n - 1;
+    };
+    return(acc);
+};
+
+main
+{
+    i = 0;
+    total = 0;
+    while (i < %(reps)d) do {
+        total = total + sumaHasta(%(n)d);
+        i = i + 1;
+    };
+    print(total);
+}
+end
+"""
+
+# Recursión profunda: cada nivel deja un marco vivo hasta regresar
+CUENTA_REC = """
+program BenchRec;
+var
+    total, i : int;
+
+int cuenta(n : int)
+{
+    if (n < 1) {
+        return(0);
+    };
+    return(1 + cuenta(n - 1));
+};
+
+main
+{
+    i = 0;
+    total = 0;
+    while (i < %(reps)d) do {
+        total = total + cuenta(%(depth)d);
+        i = i + 1;
+    };
+    print(total);
+}
+end
+"""
+
+# Misma cuenta con acumulador: la llamada recursiva queda en posición de cola
+COLA_REC = """
+program BenchCola;
+var
+    total, i : int;
+
+int cuenta(n : int, acc : int)
+{
+    if (n < 1) {
+        return(acc);
+    };
+    return(cuenta(n - 1, acc + 1));
+};
+
+main
+{
+    i = 0;
+    total = 0;
+    while (i < %(reps)d) do {
+        total = total + cuenta(%(depth)d, 0);
+        i = i + 1;
+    };
+    print(total);
+}
+end
+"""
+
+# Subexpresiones repetidas en el cuerpo de un ciclo (numeración de valores)
+SUBEXPRESIONES = """
+program BenchCSE;
+var
+    i, a, b, par : int;
+
+main
+{
+    i = 0;
+    a = 0;
+    b = 0;
+    par = 0;
+    while (i < %(reps)d) do {
+        a = a + (i - 1) * (i - 1) + i %% 7;
+        b = b + (i - 1) * 2 + i %% 7;
+        if (i %% 2 == 0) {
+            par = par + i %% 7;
+        };
+        i = i + 1;
+    };
+    print(a, b, par);
+}
+end
+"""
+
+# Cálculos que no cambian entre vueltas de un ciclo (se sacan del ciclo)
+INVARIANTES = """
+program BenchLICM;
+var
+    i, j, limite, acc : int;
+
+main
+{
+    i = 0;
+    acc = 0;
+    limite = 50;
+    while (i < %(reps)d) do {
+        j = 0;
+        while (j < limite / 10) do {
+            acc = acc + limite * 2 - (limite - 1) * 3 + j;
+            j = j + 1;
+        };
+        i = i + 1;
+    };
+    print(acc);
+}
+end
+"""
+
+# Multiplicaciones por la variable del ciclo, módulo entre potencias de 2 e
+# identidades (reducción de fuerza en -O3)
+FUERZA = """
+program BenchFuerza;
+var
+    i, base, acc : int;
+
+main
+{
+    i = 0;
+    base = 3;
+    acc = 0;
+    while (i < %(reps)d) do {
+        acc = acc + i * 8 + (i * 12) %% 16 + base * 1 - -(-base) + 0;
+        i = i + 1;
+    };
+    print(acc);
+}
+end
+"""
+
+# Funciones pequeñas llamadas en cada vuelta (se expanden en línea en -O2)
+LLAMADAS = """
+program BenchLlamadas;
+var
+    i, total : int;
+
+int cuadrado(x : int)
+{
+    return(x * x);
+};
+
+int mayor(a : int, b : int)
+{
+    if (a > b) {
+        return(a);
+    };
+    return(b);
+};
+
+main
+{
+    i = 0;
+    total = 0;
+    while (i < %(reps)d) do {
+        total = total + mayor(cuadrado(i) %% 97, 40);
+        i = i + 1;
+    };
+    print(total);
+}
+end
+"""
+
+# Expresiones con muchas constantes (se pliegan en -O1)
+CONSTANTES = """
+program BenchConst;
+var
+    i, acc : int;
+    x : float;
+
+main
+{
+    i = 0;
+    acc = 0;
+    x = 0.0;
+    while (i < %(reps)d) do {
+        acc = acc + (60 * 60 * 24) %% 1000 - -3 + 2 * (4 + 5);
+        x = x + 1.5 * 2.0 / 4.0;
+        i = i + 1;
+    };
+    print(acc, x);
+}
+end
+"""
+
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")
+
+
+def read_test(name):
+    with open(os.path.join(TESTS_DIR, name), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def compile_source(source, opt_level=compiler.DEFAULT_OPT_LEVEL):
+    # Frontend completo: lexer -> parser -> listener semántico (+ optimización)
+    program = compiler.compile_source(source, opt_level=opt_level)
+    return program.quadruples, program.constants
+
+
+def time_vm(quads, constants, repeat=3, **vm_options):
+    """
+    Mejor tiempo de `repeat` corridas completas; regresa (segundos, salida).
+    """
+    best = None
+    output = ""
+    for _ in range(repeat):
+        buffer = io.StringIO()
+        vm = VirtualMachine(quads, constants, **vm_options)
+        with contextlib.redirect_stdout(buffer):
+            start = time.perf_counter()
+            vm.run()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = buffer.getvalue()
+    return best, output
+
+
+class CountingVM(VirtualMachine):
+    # Cuenta cuádruplos ejecutados usando la ruta de referencia
+    def _execute_quad(self, quad):
+        self.executed += 1
+        return super()._execute_quad(quad)
+
+
+def count_instructions(quads, constants):
+    vm = CountingVM(quads, constants, engine="reference")
+    vm.executed = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        vm.run()
+    return vm.executed
+
+
+def bench_memory():
+    quads, constants = compile_source(SUMA_HASTA % {"reps": 40, "n": 500})
+    results = {}
+    for engine in ("dict", "flat"):
+        results[engine] = time_vm(quads, constants, memory=engine)
+        print(f"memory={engine:<5} {results[engine][0]:.3f}s")
+    if results["dict"][1] != results["flat"][1]:
+        raise SystemExit("Las salidas de los motores de memoria no coinciden")
+    print(f"speedup flat/dict: {results['dict'][0] / results['flat'][0]:.2f}x")
+
+
+DISPATCH_CONFIGS = [
+    ("dict", "reference"),
+    ("dict", "table"),
+    ("flat", "reference"),
+    ("flat", "table"),
+    ("flat", "linked"),
+    ("flat", "closure"),
+    (None, "python"),
+]
+
+
+def bench_dispatch():
+    # fib(20) recursivo de tests/test_1.txt, el ciclo de sumaHasta y recursión
+    # más profunda que el límite de Python (py_backend usa llamadas nativas)
+    workloads = [
+        ("fib", read_test("test_1.txt")),
+        ("sumaHasta", SUMA_HASTA % {"reps": 40, "n": 500}),
+        ("cuenta", CUENTA_REC % {"reps": 1, "depth": 3000}),
+        ("cola", COLA_REC % {"reps": 1, "depth": 100000}),
+    ]
+    for label, source in workloads:
+        quads, constants = compile_source(source)
+        executed = count_instructions(quads, constants)
+        print(f"[{label}] cuadruplos ejecutados: {executed}")
+        outputs = set()
+        baseline = None
+        for memory, engine in DISPATCH_CONFIGS:
+            elapsed, output = time_vm(quads, constants, memory=memory, engine=engine)
+            outputs.add(output)
+            baseline = baseline or elapsed
+            print(
+                f"memory={memory or '-':<5} engine={engine:<10} {elapsed:.3f}s "
+                f"{executed / elapsed:>12,.0f} instr/s  {baseline / elapsed:5.2f}x"
+            )
+        if len(outputs) != 1:
+            raise SystemExit("Las salidas de los motores de despacho no coinciden")
+    check_recursion_limit()
+
+
+class _LimitRecorder(io.StringIO):
+    # Anota el límite de recursión cada vez que la VM escribe
+    def __init__(self):
+        super().__init__()
+        self.limits = set()
+
+    def write(self, text):
+        self.limits.add(sys.getrecursionlimit())
+        return super().write(text)
+
+
+def check_recursion_limit():
+    # engine="python" sube el límite de recursión de todo el proceso mientras
+    # corre (py_backend.RECURSION_LIMIT) y debe restaurarlo al terminar
+    before = sys.getrecursionlimit()
+    recorder = _LimitRecorder()
+    compiler.compile_source(read_test("test_1.txt")).run(stdout=recorder, engine="python", buffer_size=1)
+    after = sys.getrecursionlimit()
+    during = max(before, py_backend.RECURSION_LIMIT)
+    if recorder.limits != {during} or after != before:
+        raise SystemExit(
+            f"Límite de recursión con engine=python: antes {before}, "
+            f"durante {sorted(recorder.limits)}, después {after}"
+        )
+    print(f"límite de recursión: {before} -> {during} durante engine=python -> {after}")
+
+
+def bench_warm(runs=200):
+    # Programas de tests/ como los correría un worker: frontend completo en
+    # cada corrida vs un Program ya compilado con salida a un buffer
+    sources = [read_test(name) for name in sorted(os.listdir(TESTS_DIR)) if name.endswith(".txt")]
+
+    start = time.perf_counter()
+    for i in range(runs):
+        compiler.compile_source(sources[i % len(sources)]).run(stdout=io.StringIO())
+    cold = time.perf_counter() - start
+
+    programs = [compiler.compile_source(source) for source in sources]
+    for engine in ("table", "closure", "python"):
+        start = time.perf_counter()
+        for i in range(runs):
+            programs[i % len(programs)].run(stdout=io.StringIO(), engine=engine)
+        warm = time.perf_counter() - start
+        print(
+            f"engine={engine:<8} frio {runs / cold:8.1f} prog/s  "
+            f"caliente {runs / warm:8.1f} prog/s  {cold / warm:5.1f}x"
+        )
+
+
+def bench_cache(runs=200):
+    # Compilar tests/test_1.txt cada vez contra cargarlo de la caché; luego
+    # corrompe la entrada guardada y verifica que cuente como fallo y se recompile
+    source = read_test("test_1.txt")
+    expected = io.StringIO()
+    compiler.compile_source(source).run(stdout=expected)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompileCache(directory)
+        start = time.perf_counter()
+        for _ in range(runs):
+            compiler.compile_source(source)
+        cold = time.perf_counter() - start
+
+        compiler.compile_source(source, cache)
+        start = time.perf_counter()
+        for _ in range(runs):
+            compiler.compile_source(source, cache)
+        warm = time.perf_counter() - start
+        print(
+            f"compilar {runs / cold:8.1f} prog/s  "
+            f"caché {runs / warm:8.1f} prog/s  {cold / warm:5.1f}x  ({cache.stats})"
+        )
+
+        # UTF-8 inválido en el primer string de la tabla
+        (name,) = [name for name in os.listdir(directory) if name.endswith(ENTRY_SUFFIX)]
+        with open(os.path.join(directory, name), "r+b") as fh:
+            fh.seek(ptc.HEADER.size)
+            (length,) = ptc.U32.unpack(fh.read(ptc.U32.size))
+            fh.write(b"\xff" * min(length, 20))
+
+        misses, stores = cache.stats.misses, cache.stats.stores
+        output = io.StringIO()
+        compiler.compile_source(source, cache).run(stdout=output)
+        if (cache.stats.misses, cache.stats.stores) != (misses + 1, stores + 1):
+            raise SystemExit("La entrada corrupta de la caché no se recompiló")
+        if output.getvalue() != expected.getvalue():
+            raise SystemExit("La salida después de recompilar no coincide")
+        print(f"entrada corrupta: descartada y recompilada ({cache.stats})")
+
+
+def bench_ptc(runs=200, corruptions=2000):
+    # Compilar tests/test_3.txt cada vez contra cargar su .ptc; luego cambia
+    # bytes al azar del archivo y falla si ptc.load lanza algo que no sea
+    # PtcFormatError (el archivo puede seguir siendo válido)
+    source = read_test("test_3.txt")
+    data = ptc.dumps(compiler.compile_source(source))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "programa.ptc")
+        with open(path, "wb") as fh:
+            fh.write(data)
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            compiler.compile_source(source)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(runs):
+            ptc.load(path)
+        warm = time.perf_counter() - start
+        print(f"compilar {runs / cold:8.1f} prog/s  .ptc {runs / warm:8.1f} prog/s  {cold / warm:5.1f}x")
+
+        rng = random.Random(0)
+        rejected = 0
+        for _ in range(corruptions):
+            corrupt = bytearray(data)
+            for _ in range(3):
+                corrupt[rng.randrange(len(corrupt))] = rng.randrange(256)
+            with open(path, "wb") as fh:
+                fh.write(corrupt)
+            try:
+                ptc.load(path)
+            except ptc.PtcFormatError:
+                rejected += 1
+            except Exception as err:
+                raise SystemExit(f"Un .ptc corrupto lanzó {type(err).__name__}: {err}")
+        print(f"corruptos: {rejected}/{corruptions} rechazados con PtcFormatError, el resto cargó")
+
+
+def measure_frames(quads, constants, **vm_options):
+    """
+    Una corrida: (segundos, marcos creados, recolecciones del gc, pico de
+    memoria en bytes, salida).
+    """
+    buffer = io.StringIO()
+    vm = VirtualMachine(quads, constants, stdout=buffer, **vm_options)
+    gc.collect()
+    before = sum(stat["collections"] for stat in gc.get_stats())
+    tracemalloc.start()
+    start = time.perf_counter()
+    vm.run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - before
+    return elapsed, vm.memory.frames_allocated, collections, peak, buffer.getvalue()
+
+
+FRAME_CONFIGS = [
+    ("dict", None, False),  # los dict ya son dispersos
+    ("dict", None, True),
+    ("flat", False, False),
+    ("flat", True, False),
+    ("flat", True, True),
+]
+
+FRAME_LABELS = {None: "-", False: "completos", True: "medidos"}
+
+
+def bench_frames():
+    # fib(20) (muchas llamadas cortas) y recursión profunda; tracemalloc hace
+    # más lentas todas las corridas, los tiempos solo sirven para comparar
+    workloads = [
+        ("fib", read_test("test_1.txt")),
+        ("cuenta", CUENTA_REC % {"reps": 20, "depth": 400}),
+    ]
+    for label, source in workloads:
+        quads, constants = compile_source(source)
+        print(f"[{label}]")
+        outputs = set()
+        for memory, sized, pooled in FRAME_CONFIGS:
+            options = {"memory": memory, "pool_frames": pooled}
+            if sized is False:
+                options["frame_sizes"] = {}  # marcos de SEGMENT_SIZE casillas
+            elapsed, frames, collections, peak, output = measure_frames(
+                quads, constants, **options
+            )
+            outputs.add(output)
+            print(
+                f"memory={memory:<5} marcos {FRAME_LABELS[sized]:<9} "
+                f"pool={'si' if pooled else 'no':<3} {elapsed:.3f}s "
+                f"creados={frames:<7} gc={collections:<5} pico={peak / 1024:8,.0f} KiB"
+            )
+        if len(outputs) != 1:
+            raise SystemExit("Las salidas con y sin pool no coinciden")
+
+
+def bench_opt():
+    # Mismo programa en cada nivel de optimización: tamaño, cuádruplos
+    # ejecutados y tiempo con la VM por defecto
+    workloads = [
+        ("fib", read_test("test_1.txt")),
+        ("sumaHasta", SUMA_HASTA % {"reps": 40, "n": 500}),
+        ("constantes", CONSTANTES % {"reps": 2000}),
+        ("subexpresiones", SUBEXPRESIONES % {"reps": 2000}),
+        ("invariantes", INVARIANTES % {"reps": 400}),
+        ("fuerza", FUERZA % {"reps": 3000}),
+        ("llamadas", LLAMADAS % {"reps": 3000}),
+        ("cola", COLA_REC % {"reps": 20, "depth": 400}),
+    ]
+    for label, source in workloads:
+        print(f"[{label}]")
+        outputs = set()
+        for level in compiler.OPT_LEVELS:
+            quads, constants = compile_source(source, opt_level=level)
+            executed = count_instructions(quads, constants)
+            elapsed, output = time_vm(quads, constants)
+            outputs.add(output)
+            print(
+                f"-O{level} cuadruplos={len(quads):<5} ejecutados={executed:<9} {elapsed:.3f}s"
+            )
+        if len(outputs) != 1:
+            raise SystemExit("Las salidas de los niveles de optimización no coinciden")
+
+
+def expression_source(statements):
+    """
+    Programa generado con `statements` asignaciones e if/else sobre
+    expresiones anidadas (paréntesis y los cuatro operadores), el caso que
+    más le cuesta a la predicción de expr/addExpr/multExpr.
+    """
+    return "\n".join(
+        ["program BenchParse;", "var", "    a, b, c : float;", "main", "{"]
+        + expression_statements(statements)
+        + ["}", "end", ""]
+    )
+
+
+def expression_statements(statements, first=0):
+    # Líneas de expression_source sobre las variables flotantes a, b y c
+    ops = ("+", "-", "*", "/")
+    lines = []
+    for i in range(first, first + statements):
+        a, b, c, d = (ops[(i + k) % 4] for k in range(4))
+        term = f"(a {a} {i % 7 + 1}) {b} (b {c} c)"
+        lines.append(f"    a = ({term}) {d} ({term}) {a} c;")
+        lines.append(
+            f"    if ({term} > b {c} {i % 5 + 1}) {{ b = {term}; }} else {{ c = ({term}) {b} a; }};"
+        )
+    return lines
+
+
+def functions_source(functions, statements=10):
+    """
+    Programa con `functions` funciones del mismo tamaño (cada una con
+    `statements` asignaciones e if/else de expression_source) y un main que
+    las llama a todas: el archivo crece, la unidad más grande no.
+    """
+    lines = ["program BenchUnits;", "var", "    total : float;"]
+    for f in range(functions):
+        lines += [f"float f{f}(a : float)", "var", "    b, c : float;", "{", "    b = a; c = 1.5;"]
+        lines += expression_statements(statements, first=f)
+        lines += ["    return(a);", "};"]
+    lines += ["main", "{", "    total = 0.0;"]
+    lines += [f"    total = total + f{f}({f % 9 + 1}.0);" for f in range(functions)]
+    lines += ["    print(total);", "}", "end", ""]
+    return "\n".join(lines)
+
+
+def bench_parse(repeat=3):
+    # Solo lexer + parser (sin listener): mejor de `repeat` corridas por modo
+    for statements in (100, 400, 1600):
+        source = expression_source(statements)
+        times = {}
+        for sll_first in (False, True):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compiler.parse_source(source, sll_first=sll_first)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[sll_first] = best
+        print(
+            f"sentencias={statements * 2:<5} LL {times[False]:.3f}s  "
+            f"SLL+LL {times[True]:.3f}s  {times[False] / times[True]:.2f}x"
+        )
+
+
+def token_list(lexer):
+    # (tipo, texto, línea, columna, inicio, fin) de todos los tokens hasta EOF
+    stream = CommonTokenStream(lexer)
+    stream.fill()
+    return [(t.type, t.text, t.line, t.column, t.start, t.stop) for t in stream.tokens]
+
+
+def bench_lexer(repeat=3):
+    # Solo tokenizar; ambos lexers deben dar exactamente los mismos tokens
+    lexers = [
+        ("antlr", lambda source: PatitoLexer(InputStream(source))),
+        ("fast", FastLexer),
+    ]
+    for statements in (400, 1600, 6400):
+        source = expression_source(statements)
+        times = {}
+        tokens = {}
+        for label, make in lexers:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                tokens[label] = token_list(make(source))
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[label] = best
+        if tokens["antlr"] != tokens["fast"]:
+            raise SystemExit("Los tokens de PatitoLexer y FastLexer no coinciden")
+        print(
+            f"lineas={source.count(chr(10)):<6} tokens={len(tokens['fast']):<7} "
+            f"antlr {times['antlr']:.3f}s  fast {times['fast']:.3f}s  "
+            f"{times['antlr'] / times['fast']:.1f}x"
+        )
+
+
+def bench_frontend(repeat=3):
+    """
+    Texto -> cuádruplos (-O1) con cada frontend: mejor tiempo de `repeat`
+    corridas y pico de memoria (tracemalloc, en una corrida aparte). Los dos
+    usan FastLexer, así que solo se compara el parser.
+    """
+    for statements in (100, 400, 1600):
+        source = expression_source(statements)
+        times = {}
+        peaks = {}
+        quads = {}
+        for frontend in ("listener", "descent"):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                program = compiler.compile_source(source, frontend=frontend, fast_lexer=True)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[frontend] = best
+            quads[frontend] = [(q.op, q.left, q.right, q.res) for q in program.quadruples]
+
+            del program
+            gc.collect()
+            tracemalloc.start()
+            compiler.compile_source(source, frontend=frontend, fast_lexer=True)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks[frontend] = peak
+        if quads["listener"] != quads["descent"]:
+            raise SystemExit("Los cuádruplos de los frontends no coinciden")
+        print(
+            f"sentencias={statements * 2:<5} "
+            f"listener {times['listener']:.3f}s {peaks['listener'] / 2**20:6.1f}MiB  "
+            f"descent {times['descent']:.3f}s {peaks['descent'] / 2**20:6.1f}MiB  "
+            f"{times['listener'] / times['descent']:.1f}x tiempo "
+            f"{peaks['listener'] / peaks['descent']:.1f}x memoria"
+        )
+
+
+def bench_units(repeat=3):
+    """
+    Pico de memoria (tracemalloc) y tiempo de texto -> cuádruplos con el
+    árbol completo (listener) y por unidades (units), con cada vez más
+    funciones del mismo tamaño.
+    """
+    for functions in (50, 150, 300):
+        source = functions_source(functions)
+        times = {}
+        peaks = {}
+        quads = {}
+        for frontend in ("listener", "units"):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                program = compiler.compile_source(source, frontend=frontend)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[frontend] = best
+            quads[frontend] = [(q.op, q.left, q.right, q.res) for q in program.quadruples]
+
+            del program
+            gc.collect()
+            tracemalloc.start()
+            compiler.compile_source(source, frontend=frontend)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks[frontend] = peak
+        if quads["listener"] != quads["units"]:
+            raise SystemExit("Los cuádruplos de los frontends no coinciden")
+        print(
+            f"funciones={functions:<4} "
+            f"listener {times['listener']:.3f}s {peaks['listener'] / 2**20:6.1f}MiB  "
+            f"units {times['units']:.3f}s {peaks['units'] / 2**20:6.1f}MiB  "
+            f"{peaks['listener'] / peaks['units']:.1f}x memoria"
+        )
+
+
+def bench_visitor(repeat=3):
+    # Solo generación de código: los dos recorren el mismo árbol ya parseado
+    def walk_listener(tree):
+        listener = PatitoSemanticListener()
+        ParseTreeWalker().walk(listener, tree)
+        return listener
+
+    def visit(tree):
+        return PatitoCodeGenerator().generate(tree)
+
+    for statements in (100, 400, 1600):
+        tree = compiler.parse_source(expression_source(statements))
+        times = {}
+        quads = {}
+        for label, generate in (("listener", walk_listener), ("visitor", visit)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = generate(tree)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[label] = best
+            quads[label] = [(q.op, q.left, q.right, q.res) for q in result.quadruples]
+        if quads["listener"] != quads["visitor"]:
+            raise SystemExit("Los cuádruplos del listener y del visitor no coinciden")
+        rate = {label: statements * 2 / elapsed for label, elapsed in times.items()}
+        print(
+            f"sentencias={statements * 2:<5} "
+            f"listener {times['listener']:.3f}s ({rate['listener']:,.0f}/s)  "
+            f"visitor {times['visitor']:.3f}s ({rate['visitor']:,.0f}/s)  "
+            f"{times['listener'] / times['visitor']:.1f}x"
+        )
+
+
+BENCHMARKS = {
+    "memory": bench_memory,
+    "dispatch": bench_dispatch,
+    "warm": bench_warm,
+    "cache": bench_cache,
+    "ptc": bench_ptc,
+    "frames": bench_frames,
+    "opt": bench_opt,
+    "parse": bench_parse,
+    "lexer": bench_lexer,
+    "frontend": bench_frontend,
+    "visitor": bench_visitor,
+    "units": bench_units,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Benchmark desconocido: {name} (opciones: {', '.join(BENCHMARKS)})")
+            return
+        print(f"=== {name} ===")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Utilidades de análisis sobre la lista de cuádruplos.
+
+Todo se deriva de los cuádruplos mismos (los GOSUB conocen el nombre y el
+inicio de cada función llamada), así que sirve igual para la salida del
+listener, para un programa cargado de archivo o para cuádruplos optimizados.
+"""
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from opcodes import OPCODES
+from quads import Quadruple
+from virtual_memory import SEGMENT_LAYOUT, SEGMENT_SIZE
+
+
+GOTO = OPCODES["GOTO"]
+GOTOF = OPCODES["GOTOF"]
+ERA = OPCODES["ERA"]
+PARAM = OPCODES["PARAM"]
+GOSUB = OPCODES["GOSUB"]
+RET = OPCODES["RET"]
+ENDFUNC = OPCODES["ENDFUNC"]
+TAILCALL = OPCODES["TAILCALL"]
+ASSIGN = OPCODES["="]
+PRINT = OPCODES["PRINT"]
+PRINTA = OPCODES["PRINTA"]
+
+BINARY_OPS = {
+    OPCODES[sym] for sym in ("+", "-", "*", "/", "%", "&", ">", "<", "!=", "==")
+}
+
+_SEGMENTS_BY_KIND: Dict[str, Set[int]] = {}
+_SEGMENTS_BY_TYPE: Dict[str, Set[int]] = {}
+for _name, (_start, _) in SEGMENT_LAYOUT.items():
+    _kind, _type = _name.split("_")
+    _SEGMENTS_BY_KIND.setdefault(_kind, set()).add(_start // SEGMENT_SIZE)
+    _SEGMENTS_BY_TYPE.setdefault(_type, set()).add(_start // SEGMENT_SIZE)
+
+
+def is_temp(addr) -> bool:
+    return isinstance(addr, int) and addr // SEGMENT_SIZE in _SEGMENTS_BY_KIND["temp"]
+
+
+def is_global(addr) -> bool:
+    return isinstance(addr, int) and addr // SEGMENT_SIZE in _SEGMENTS_BY_KIND["glob"]
+
+
+def is_local(addr) -> bool:
+    return isinstance(addr, int) and addr // SEGMENT_SIZE in _SEGMENTS_BY_KIND["loc"]
+
+
+def is_int(addr) -> bool:
+    # El cubo semántico solo deja guardar int en un segmento *_int (un
+    # float sí puede guardar un int: `x = 1` no convierte)
+    return isinstance(addr, int) and addr // SEGMENT_SIZE in _SEGMENTS_BY_TYPE["int"]
+
+# (GOTOF<, a, b, destino) salta si NO se cumple a < b
+BRANCH_COMPARE = {OPCODES["GOTOF" + sym]: OPCODES[sym] for sym in (">", "<", "!=", "==")}
+# Saltos condicionales y todos los saltos, con destino en quad.res
+COND_JUMP_OPS = {GOTOF} | set(BRANCH_COMPARE)
+JUMP_OPS = {GOTO} | COND_JUMP_OPS
+# Llamadas: (GOSUB, nombre, _, inicio); TAILCALL no regresa a la función actual
+CALL_OPS = {GOSUB, TAILCALL}
+# Cuádruplos cuyo quad.res es un índice de cuádruplo (se renumeran al compactar)
+TARGET_OPS = JUMP_OPS | CALL_OPS
+# Instrucciones tras las cuales no se continúa al siguiente cuádruplo
+TERMINATOR_OPS = {GOTO, RET, ENDFUNC, TAILCALL}
+
+
+class FunctionRange:
+    """
+    Rango [start, end) de cuádruplos de una función (o del main).
+    `params` son las direcciones de parámetros en el orden de los PARAM.
+    """
+
+    def __init__(self, name: str, start: int, end: int, params: Optional[List[int]] = None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.params = params or []
+
+    def __repr__(self):
+        return f"FunctionRange({self.name}, {self.start}, {self.end})"
+
+
+def data_operands(q) -> List[int]:
+    """
+    Direcciones de datos que usa el cuádruplo en el marco donde se ejecuta.
+    El destino de PARAM no se incluye: pertenece al marco de la función llamada.
+    """
+    if q.op in BINARY_OPS:
+        return [q.left, q.right, q.res]
+    if q.op in BRANCH_COMPARE:
+        return [q.left, q.right]
+    if q.op == ASSIGN:
+        return [q.left, q.res]
+    if q.op in (GOTOF, PARAM):
+        return [q.left]
+    if q.op in (PRINT, PRINTA) and q.left is not None:
+        return [q.left]
+    return []
+
+
+def uses(q) -> List[int]:
+    # Direcciones que el cuádruplo lee (el operando de RET es solo informativo)
+    if q.op in BINARY_OPS or q.op in BRANCH_COMPARE:
+        return [q.left, q.right]
+    if q.op in (ASSIGN, GOTOF, PARAM):
+        return [q.left]
+    if q.op in (PRINT, PRINTA) and q.left is not None:
+        return [q.left]
+    return []
+
+
+def defs(q) -> List[int]:
+    # Direcciones que el cuádruplo escribe en el marco actual
+    if q.op in BINARY_OPS or q.op == ASSIGN:
+        return [q.res]
+    return []
+
+
+def function_entries(quads: List) -> Dict[str, int]:
+    # nombre -> inicio, según los GOSUB (y TAILCALL) del programa
+    return {q.left: q.res for q in quads if q.op in CALL_OPS}
+
+
+def function_params(quads: List) -> Dict[str, List[int]]:
+    """
+    nombre -> direcciones de parámetros, en el orden en que se emiten los PARAM
+    entre ERA y GOSUB (el listener los emite en el orden de la declaración).
+    """
+    params: Dict[str, List[int]] = {}
+    pending: List[Tuple[str, List[int]]] = []
+    for q in quads:
+        if q.op == ERA:
+            pending.append((q.res, []))
+        elif q.op == PARAM and pending:
+            pending[-1][1].append(q.res)
+        elif q.op in CALL_OPS and pending:
+            name, addrs = pending.pop()
+            params.setdefault(name, addrs)
+    return params
+
+
+def main_start(quads: List, entries: Optional[Dict[str, int]] = None) -> int:
+    """
+    Índice donde inicia el main: destino del GOTO inicial si salta las funciones.
+    """
+    if entries is None:
+        entries = function_entries(quads)
+    if quads and quads[0].op == GOTO and quads[0].res is not None:
+        target = quads[0].res
+        if target > 0 and all(start < target for start in entries.values()):
+            return target
+    return 0
+
+
+def function_ranges(quads: List) -> List[FunctionRange]:
+    """
+    Rangos de cada función llamada y del main (último elemento, nombre None).
+    Las funciones están contiguas entre el GOTO inicial y el main, así que
+    cada una termina donde empieza la siguiente.
+    """
+    entries = function_entries(quads)
+    params = function_params(quads)
+    main = main_start(quads, entries)
+    starts = sorted(set(entries.values()) | {main})
+    names = {start: name for name, start in entries.items()}
+
+    ranges = []
+    for idx, start in enumerate(starts):
+        if start == main:
+            continue
+        end = starts[idx + 1] if idx + 1 < len(starts) else len(quads)
+        name = names[start]
+        ranges.append(FunctionRange(name, start, end, params.get(name, [])))
+    ranges.append(FunctionRange(None, main, len(quads)))
+    return ranges
+
+
+def frame_extents(quads: List, segments) -> Dict[Optional[str], Dict[int, int]]:
+    """
+    Casillas que usa el marco de cada función (None = main) en los segmentos
+    indicados: nombre -> {indice de segmento: offset máximo + 1}.
+    Incluye los destinos de PARAM que escriben los llamadores.
+    """
+    extents: Dict[Optional[str], Dict[int, int]] = {}
+
+    def touch(name, addr):
+        idx = addr // SEGMENT_SIZE
+        if idx in segments:
+            sizes = extents.setdefault(name, {})
+            sizes[idx] = max(sizes.get(idx, 0), addr % SEGMENT_SIZE + 1)
+
+    pending: List[str] = []
+    for frange in function_ranges(quads):
+        extents.setdefault(frange.name, {})
+        for q in quads[frange.start:frange.end]:
+            for addr in data_operands(q):
+                if isinstance(addr, int):
+                    touch(frange.name, addr)
+            if q.op == ERA:
+                pending.append(q.res)
+            elif q.op == PARAM and pending:
+                touch(pending[-1], q.res)
+            elif q.op in CALL_OPS and pending:
+                pending.pop()
+    return extents
+
+
+def successors(quads: List, index: int) -> List[int]:
+    """
+    Cuádruplos que pueden ejecutarse después de quads[index] en la misma
+    función (GOSUB continúa en el siguiente al regresar; TAILCALL no).
+    """
+    q = quads[index]
+    if q.op == GOTO:
+        return [q.res]
+    if q.op in (RET, ENDFUNC, TAILCALL):
+        return []
+    if q.op in COND_JUMP_OPS:
+        return [index + 1, q.res]
+    return [index + 1]
+
+
+def block_ids(quads: List) -> List[int]:
+    """
+    Número de bloque básico de cada cuádruplo. Un bloque empieza en el
+    cuádruplo 0, en cada destino de salto o de GOSUB y después de cada salto,
+    RET, ENDFUNC o TAILCALL.
+    """
+    leaders = {0}
+    for index, q in enumerate(quads):
+        if q.op in TARGET_OPS and isinstance(q.res, int):
+            leaders.add(q.res)
+        if q.op in JUMP_OPS or q.op in TERMINATOR_OPS:
+            leaders.add(index + 1)
+    ids = []
+    block = -1
+    for index in range(len(quads)):
+        if index in leaders:
+            block += 1
+        ids.append(block)
+    return ids
+
+
+class BlockGraph:
+    """
+    Bloques básicos y sus aristas: ranges[b] = (inicio, fin) del bloque b,
+    succ[b] / pred[b] = bloques siguientes / anteriores en la misma función.
+    """
+
+    def __init__(self, quads: List):
+        self.ids = block_ids(quads)
+        ranges: List[List[int]] = []
+        for index, block in enumerate(self.ids):
+            if block == len(ranges):
+                ranges.append([index, index + 1])
+            else:
+                ranges[block][1] = index + 1
+        self.ranges = [(start, end) for start, end in ranges]
+        self.succ: List[List[int]] = []
+        self.pred: List[List[int]] = [[] for _ in ranges]
+        for block, (_, end) in enumerate(self.ranges):
+            targets = []
+            for s in successors(quads, end - 1):
+                if isinstance(s, int) and s < len(quads) and self.ids[s] not in targets:
+                    targets.append(self.ids[s])
+                    self.pred[self.ids[s]].append(block)
+            self.succ.append(targets)
+
+    def __len__(self):
+        return len(self.ranges)
+
+
+def dominators(quads: List, graph: Optional[BlockGraph] = None) -> List[Optional[int]]:
+    """
+    Dominador inmediato de cada bloque (None en el inicio del programa, en el
+    inicio de cada función y en bloques inalcanzables). Un bloque domina a
+    otro si todo camino desde el inicio de la función pasa por él.
+    """
+    if graph is None:
+        graph = BlockGraph(quads)
+    roots = {0} | {graph.ids[start] for start in function_entries(quads).values() if start < len(quads)}
+    dom: List[Optional[Set[int]]] = [None] * len(graph)
+    for root in roots:
+        if root < len(graph):
+            dom[root] = {root}
+
+    # None = todavía "todos los bloques"
+    changed = True
+    while changed:
+        changed = False
+        for block in range(len(graph)):
+            if block in roots:
+                continue
+            known = [dom[p] for p in graph.pred[block] if dom[p] is not None]
+            if not known:
+                continue
+            new = set.intersection(*known) | {block}
+            if new != dom[block]:
+                dom[block] = new
+                changed = True
+
+    idom: List[Optional[int]] = []
+    for block, blocks in enumerate(dom):
+        strict = (blocks or set()) - {block}
+        # el más cercano es el que tiene más dominadores propios
+        idom.append(max(strict, key=lambda d: len(dom[d])) if strict else None)
+    return idom
+
+
+class Loop:
+    """
+    Ciclo natural: `header` es el índice del primer cuádruplo de la cabecera
+    (p. ej. la condición de un while) e `indices` los cuádruplos del ciclo,
+    cabecera incluida.
+    """
+
+    def __init__(self, header: int, indices: Set[int]):
+        self.header = header
+        self.indices = indices
+
+    def __repr__(self):
+        return f"Loop({self.header}, {len(self.indices)} cuádruplos)"
+
+
+def natural_loops(quads: List) -> List[Loop]:
+    """
+    Ciclos naturales: cada salto hacia un bloque que domina al que salta (el
+    GOTO al final de un while) cierra un ciclo con los bloques que llegan a
+    él sin pasar por la cabecera. Los ciclos con la misma cabecera se unen;
+    se regresan de menor a mayor (los internos primero).
+    """
+    graph = BlockGraph(quads)
+    idom = dominators(quads, graph)
+
+    def dominates(a, b):
+        while b is not None:
+            if a == b:
+                return True
+            b = idom[b]
+        return False
+
+    bodies: Dict[int, Set[int]] = {}
+    for block in range(len(graph)):
+        for header in graph.succ[block]:
+            if not dominates(header, block):
+                continue
+            body = bodies.setdefault(header, {header})
+            work = [block]
+            while work:
+                b = work.pop()
+                if b not in body:
+                    body.add(b)
+                    work.extend(graph.pred[b])
+
+    loops = []
+    for header, body in bodies.items():
+        indices: Set[int] = set()
+        for b in body:
+            start, end = graph.ranges[b]
+            indices.update(range(start, end))
+        loops.append(Loop(graph.ranges[header][0], indices))
+    loops.sort(key=lambda loop: len(loop.indices))
+    return loops
+
+
+def live_temps(quads: List) -> List[Set[int]]:
+    """
+    Temporales vivos después de cada cuádruplo: los que algún camino de la
+    misma función vuelve a leer antes de escribirlos. Los temporales se
+    reutilizan entre sentencias, así que una misma dirección puede tener
+    varias definiciones; esto dice cuál valor sigue haciendo falta.
+    """
+    return live_addresses(quads, is_temp)
+
+
+def live_addresses(quads: List, tracked: Callable[[int], bool]) -> List[Set[int]]:
+    # Como live_temps, para las direcciones que cumplen `tracked`
+    graph = BlockGraph(quads)
+    ranges, succ = graph.ranges, graph.succ
+
+    # lecturas antes de cualquier escritura (gen) y escrituras (kill) por bloque
+    gen: List[Set[int]] = []
+    kill: List[Set[int]] = []
+    for start, end in ranges:
+        read: Set[int] = set()
+        written: Set[int] = set()
+        for q in quads[start:end]:
+            read.update(a for a in uses(q) if tracked(a) and a not in written)
+            written.update(a for a in defs(q) if tracked(a))
+        gen.append(read)
+        kill.append(written)
+
+    live_in: List[Set[int]] = [set() for _ in ranges]
+    live_out: List[Set[int]] = [set() for _ in ranges]
+    changed = True
+    while changed:
+        changed = False
+        for block in reversed(range(len(ranges))):
+            out: Set[int] = set()
+            for s in succ[block]:
+                out |= live_in[s]
+            new_in = gen[block] | (out - kill[block])
+            if out != live_out[block] or new_in != live_in[block]:
+                live_out[block] = out
+                live_in[block] = new_in
+                changed = True
+
+    after: List[Set[int]] = [set() for _ in quads]
+    for block, (start, end) in enumerate(ranges):
+        live = set(live_out[block])
+        for index in range(end - 1, start - 1, -1):
+            after[index] = set(live)
+            q = quads[index]
+            live.difference_update(defs(q))
+            live.update(a for a in uses(q) if tracked(a))
+    return after
+
+
+def reachable(quads: List) -> Set[int]:
+    """
+    Índices alcanzables desde el cuádruplo 0 (el GOTO al main) siguiendo
+    saltos y entrando a las funciones de los GOSUB alcanzables.
+    """
+    seen: Set[int] = set()
+    work = [0] if quads else []
+    while work:
+        index = work.pop()
+        if index in seen or index >= len(quads):
+            continue
+        seen.add(index)
+        work.extend(successors(quads, index))
+        if quads[index].op in CALL_OPS:
+            work.append(quads[index].res)
+    return seen
+
+
+def relink(quads: List, keep) -> Tuple[List, List[int]]:
+    """
+    Compacta los cuádruplos dejando solo los índices en `keep` y renumera los
+    destinos de saltos y GOSUB. Regresa (cuádruplos nuevos, remap), donde
+    remap[i] es el nuevo índice de i o, si i se eliminó, del primer
+    cuádruplo conservado después de i (len(remap) == len(quads) + 1).
+    """
+    remap: List[int] = []
+    count = 0
+    for index in range(len(quads)):
+        remap.append(count)
+        if index in keep:
+            count += 1
+    remap.append(count)
+
+    new_quads = []
+    for index, q in enumerate(quads):
+        if index not in keep:
+            continue
+        res = q.res
+        if q.op in TARGET_OPS and isinstance(res, int):
+            res = remap[res]
+        new_quads.append(Quadruple(q.op, q.left, q.right, res))
+    return new_quads, remap
@@ -0,0 +1,239 @@
+"""
+Motor de ejecución que compila cada cuádruplo a un closure de Python.
+
+Cada closure ya tiene capturados sus operandos (buffer global, indice de
+segmento del marco o valor constante) y el siguiente ip, y regresa el ip a
+ejecutar después. Las variantes por operador y forma de operandos se generan
+una sola vez al importar el módulo, así que un `+` entre dos locales int queda
+como `s[ls][lo] + s[rs][ro]` sin llamadas a operator ni a memory.load.
+
+La VM solo hace:
+    while ip < end:
+        ip = code[ip]()
+"""
+from typing import Callable, Dict, List, Optional
+
+from execution_memory import SEGMENT_NAMES
+from linker import LinkError, Linker, OPCODE_NAMES
+from opcodes import OPCODES
+
+
+BINARY_SYMBOLS = {
+    OPCODES["+"]: "+",
+    OPCODES["-"]: "-",
+    OPCODES["*"]: "*",
+    OPCODES["/"]: "/",
+    OPCODES["%"]: "%",
+    OPCODES["&"]: "&",
+    OPCODES[">"]: ">",
+    OPCODES["<"]: "<",
+    OPCODES["!="]: "!=",
+    OPCODES["=="]: "==",
+}
+
+# GOTOF fusionado con su comparación: salta si no se cumple la comparación
+BRANCH_SYMBOLS = {OPCODES["GOTOF" + sym]: sym for sym in (">", "<", "!=", "==")}
+
+# Formas de operando:
+#   "k" constante inlinada        -> l
+#   "g" buffer compartido (global) -> l[lo]
+#   "f" segmento del marco activo  -> s[l][lo]
+_READ = {"k": "{v}", "g": "{v}[{o}]", "f": "s[{v}][{o}]"}
+
+
+def _read(kind: str, var: str, off: str) -> str:
+    return _READ[kind].format(v=var, o=off)
+
+
+def _build_factory(name: str, body: str, frame: bool) -> Callable:
+    # Genera factory(mem, l, lo, r, ro, d, do, nxt) -> closure sin argumentos
+    lines = [
+        "def factory(mem, l, lo, r, ro, d, do, nxt):",
+        "    def step():",
+    ]
+    if frame:
+        lines.append("        s = mem.segments")
+    lines.extend("        " + line for line in body.splitlines())
+    lines.append("    return step")
+    namespace: Dict[str, object] = {}
+    exec(compile("\n".join(lines), f"<closure {name}>", "exec"), namespace)
+    return namespace["factory"]
+
+
+def _factories():
+    factories = {}
+    kinds = ("k", "g", "f")
+    for op, sym in BINARY_SYMBOLS.items():
+        for lk in kinds:
+            for rk in kinds:
+                for dk in ("g", "f"):
+                    expr = f"{_read(lk, 'l', 'lo')} {sym} {_read(rk, 'r', 'ro')}"
+                    body = f"{_read(dk, 'd', 'do')} = {expr}\nreturn nxt"
+                    frame = "f" in (lk, rk, dk)
+                    factories[(op, lk, rk, dk)] = _build_factory(sym, body, frame)
+    for op, sym in BRANCH_SYMBOLS.items():
+        for lk in kinds:
+            for rk in kinds:
+                cond = f"{_read(lk, 'l', 'lo')} {sym} {_read(rk, 'r', 'ro')}"
+                body = f"if not ({cond}):\n    return d\nreturn nxt"
+                factories[(op, lk, rk)] = _build_factory("GOTOF" + sym, body, "f" in (lk, rk))
+    for lk in kinds:
+        for dk in ("g", "f"):
+            body = f"{_read(dk, 'd', 'do')} = {_read(lk, 'l', 'lo')}\nreturn nxt"
+            factories[("=", lk, dk)] = _build_factory("=", body, "f" in (lk, dk))
+        body = f"if not {_read(lk, 'l', 'lo')}:\n    return d\nreturn nxt"
+        factories[("GOTOF", lk)] = _build_factory("GOTOF", body, lk == "f")
+        body = f"mem.output.line({_read(lk, 'l', 'lo')})\nreturn nxt"
+        factories[("PRINT", lk)] = _build_factory("PRINT", body, lk == "f")
+        body = f"mem.output.arg({_read(lk, 'l', 'lo')})\nreturn nxt"
+        factories[("PRINTA", lk)] = _build_factory("PRINTA", body, lk == "f")
+        body = (
+            "ar = mem.pending_activation\n"
+            "if not ar:\n"
+            "    raise RuntimeError('No hay activacion preparada para PARAM')\n"
+            f"ar.segments[d][do] = {_read(lk, 'l', 'lo')}\n"
+            "return nxt"
+        )
+        factories[("PARAM", lk)] = _build_factory("PARAM", body, lk == "f")
+    return factories
+
+
+FACTORIES = _factories()
+
+
+class ClosureCompiler:
+    def __init__(self, memory, constants: Optional[Dict[int, object]] = None):
+        # memory debe ser FlatExecutionMemory: los globales se capturan directo
+        self.memory = memory
+        self.linker = Linker(constants)
+
+    def operand(self, addr):
+        seg, off = self.linker.operand(addr)
+        return self._shape(seg, off)
+
+    def target(self, addr):
+        seg, off = self.linker.target(addr)
+        return self._shape(seg, off)
+
+    def _shape(self, seg, off):
+        if seg is None:
+            return "k", off, None
+        if SEGMENT_NAMES[seg].startswith("glob_"):
+            return "g", self.memory.shared[seg], off
+        return "f", seg, off
+
+    def compile_quad(self, index: int, quad) -> Callable:
+        op = quad.op
+        mem = self.memory
+        nxt = index + 1
+
+        if op in BINARY_SYMBOLS:
+            lk, l, lo = self.operand(quad.left)
+            rk, r, ro = self.operand(quad.right)
+            dk, d, do = self.target(quad.res)
+            return FACTORIES[(op, lk, rk, dk)](mem, l, lo, r, ro, d, do, nxt)
+
+        if op == OPCODES["="]:
+            lk, l, lo = self.operand(quad.left)
+            dk, d, do = self.target(quad.res)
+            return FACTORIES[("=", lk, dk)](mem, l, lo, None, None, d, do, nxt)
+
+        if op == OPCODES["GOTO"]:
+            target = quad.res
+            return lambda: target
+
+        if op == OPCODES["GOTOF"]:
+            lk, l, lo = self.operand(quad.left)
+            return FACTORIES[("GOTOF", lk)](mem, l, lo, None, None, quad.res, None, nxt)
+
+        if op in BRANCH_SYMBOLS:
+            lk, l, lo = self.operand(quad.left)
+            rk, r, ro = self.operand(quad.right)
+            return FACTORIES[(op, lk, rk)](mem, l, lo, r, ro, quad.res, None, nxt)
+
+        if op == OPCODES["PRINT"]:
+            if quad.left is None:
+                lk, l, lo = "k", "", None
+            else:
+                lk, l, lo = self.operand(quad.left)
+            return FACTORIES[("PRINT", lk)](mem, l, lo, None, None, None, None, nxt)
+
+        if op == OPCODES["PRINTA"]:
+            lk, l, lo = self.operand(quad.left)
+            return FACTORIES[("PRINTA", lk)](mem, l, lo, None, None, None, None, nxt)
+
+        if op == OPCODES["ERA"]:
+            tag = str(quad.res) if quad.res is not None else "call"
+            prepare = mem.prepare_activation
+
+            def era():
+                prepare(tag)
+                return nxt
+
+            return era
+
+        if op == OPCODES["PARAM"]:
+            lk, l, lo = self.operand(quad.left)
+            _, d, do = self.target(quad.res)
+            return FACTORIES[("PARAM", lk)](mem, l, lo, None, None, d, do, nxt)
+
+        if op == OPCODES["GOSUB"]:
+            target = quad.res
+
+            def gosub():
+                ar = mem.pending_activation
+                if not ar:
+                    raise RuntimeError("No hay activacion preparada para hacer push")
+                ar.return_ip = nxt
+                mem.push_prepared_activation()
+                return target
+
+            return gosub
+
+        if op == OPCODES["TAILCALL"]:
+            target = quad.res
+            replace = mem.replace_activation
+
+            def tailcall():
+                ar = mem.current_activation
+                if ar is None or ar.return_ip is None:
+                    raise RuntimeError("TAILCALL sin direccion de retorno")
+                replace()
+                return target
+
+            return tailcall
+
+        if op in (OPCODES["RET"], OPCODES["ENDFUNC"]):
+            name = OPCODE_NAMES[op]
+
+            def ret():
+                ar = mem.current_activation
+                if ar is None or ar.return_ip is None:
+                    raise RuntimeError(f"{name} sin direccion de retorno")
+                mem.pop_activation()
+                return ar.return_ip
+
+            return ret
+
+        return _failing(NotImplementedError(f"Opcode no soportado: {OPCODE_NAMES.get(op, op)}"))
+
+    def compile(self, quadruples: List) -> List[Callable]:
+        code = []
+        for index, quad in enumerate(quadruples):
+            try:
+                code.append(self.compile_quad(index, quad))
+            except LinkError as err:
+                code.append(_failing(RuntimeError(str(err))))
+        return code
+
+
+def _failing(error: Exception) -> Callable:
+    # El error se reporta solo si el cuádruplo llega a ejecutarse
+    def fail():
+        raise error
+
+    return fail
+
+
+def compile_closures(quadruples: List, memory, constants: Optional[Dict[int, object]] = None):
+    return ClosureCompiler(memory, constants).compile(quadruples)
@@ -0,0 +1,221 @@
+"""
+Generador de código con visitor, alternativa a recorrer el árbol con
+PatitoSemanticListener + ParseTreeWalker.
+
+El walker entra y sale de cada nodo del árbol: terminales, paréntesis y las
+reglas envoltorio de una sola alternativa (toAdd -> toMult -> toUnary ->
+toAtom por cada hoja de una expresión). Como exitX no regresa nada, el
+listener pasa los operandos por operand_stack y expr_value, y toma la
+condición de un if/while del tope de la pila al entrar a su bloque.
+
+Aquí cada visitX de una expresión regresa directo su (addr, tipo): los
+operandos son variables locales de Python, no hay pilas ni expr_value, y
+la condición de un if/while es simplemente el valor de su expr. Los
+envoltorios y los paréntesis se saltan sin visitarlos y los terminales no se
+visitan nunca. La verificación semántica y la emisión son los mismos
+métodos sin ctx de PatitoSemanticListener (emit_binary, emit_call,
+emit_assign, ...), así que los cuádruplos son los del listener.
+
+PatitoParser se generó sin -visitor (sus contextos no tienen accept), así que
+visit() despacha por la clase del contexto.
+"""
+from antlr4 import TerminalNode
+
+from PatitoParser import PatitoParser
+from PatitoSemanticListener import PatitoSemanticListener
+from PatitoVisitor import PatitoVisitor
+from opcodes import OPCODES
+from quads import Quadruple
+
+
+P = PatitoParser
+
+# expr -> addExpr -> multExpr -> unaryExpr -> atom sin operador
+WRAPPERS = (P.ToAddContext, P.ToMultContext, P.ToUnaryContext, P.ToAtomContext)
+
+# Contexto -> método que lo visita
+VISIT_METHODS = {
+    P.ProgramContext: "visitProgram",
+    P.VarDeclContext: "visitVarDecl",
+    P.FuncDeclContext: "visitFuncDecl",
+    P.BlockContext: "visitBlock",
+    P.AssignStmtContext: "visitAssignStmt",
+    P.IfStmtContext: "visitIfStmt",
+    P.WhileStmtContext: "visitWhileStmt",
+    P.PrintStmtContext: "visitPrintStmt",
+    P.FuncCallStmtContext: "visitFuncCallStmt",
+    P.ReturnStmtContext: "visitReturnStmt",
+    P.FuncCallContext: "visitFuncCall",
+    P.RelExprContext: "visitRelExpr",
+    P.AddOpContext: "visitAddOp",
+    P.MultOpContext: "visitMultOp",
+    P.UnarySignContext: "visitUnarySign",
+    P.AtomContext: "visitAtom",
+}
+
+# Constantes literales: tipo de token -> (conversión, tipo de Patito)
+LITERALS = {
+    P.CTE_INT: (int, "int"),
+    P.CTE_FLOAT: (float, "float"),
+    P.TRUE: (lambda _: True, "bool"),
+    P.FALSE: (lambda _: False, "bool"),
+    P.STRING: (str, "string"),
+}
+
+
+class PatitoCodeGenerator(PatitoVisitor):
+    """
+    generator = PatitoCodeGenerator()
+    listener = generator.generate(parse_source(texto))
+
+    Regresa el PatitoSemanticListener con las tablas y los cuádruplos (lo
+    que espera Program.from_listener); SemanticError se propaga igual.
+    """
+
+    def __init__(self, listener: PatitoSemanticListener = None):
+        self.sem = listener if listener is not None else PatitoSemanticListener()
+        self._methods = {ctx_type: getattr(self, name) for ctx_type, name in VISIT_METHODS.items()}
+
+    def generate(self, tree) -> PatitoSemanticListener:
+        self.visit(tree)
+        return self.sem
+
+    def visit(self, ctx):
+        return self._methods[type(ctx)](ctx)
+
+    def value(self, ctx):
+        # (addr, tipo) de una expresión, sin pasar por los envoltorios
+        while isinstance(ctx, WRAPPERS):
+            ctx = ctx.getChild(0)
+        return self._methods[type(ctx)](ctx)
+
+    # ------------------------------------------------------------
+    # Programa y declaraciones
+    # ------------------------------------------------------------
+    def visitProgram(self, ctx):
+        sem = self.sem
+        sem.begin_program()
+        if ctx.globalVarSection():
+            for decl in ctx.globalVarSection().varDecl():
+                self.visitVarDecl(decl)
+        for section in ctx.functionSection():
+            self.visitFuncDecl(section.funcDecl())
+        sem.begin_main()
+        self.visitBlock(ctx.block())
+
+    def visitVarDecl(self, ctx):
+        self.sem.declare_vars([x.getText() for x in ctx.idList().ID()], ctx.type_().getText())
+
+    def visitFuncDecl(self, ctx):
+        sem = self.sem
+        fname = ctx.ID().getText()
+        params = []
+        if ctx.paramList():
+            params = [(p.ID().getText(), p.type_().getText()) for p in ctx.paramList().param()]
+        sem.declare_function(fname, ctx.type_().getText(), params)
+
+        if ctx.funcVarSection():
+            for decl in ctx.funcVarSection().varDecl():
+                self.visitVarDecl(decl)
+        if ctx.block():
+            sem.begin_function_body(fname)
+            self.visitBlock(ctx.block())
+        sem.end_function(fname)
+
+    # ------------------------------------------------------------
+    # Estatutos
+    # ------------------------------------------------------------
+    def visitBlock(self, ctx):
+        methods = self._methods
+        for stmt in ctx.stmt():
+            # stmt tiene un solo hijo: el estatuto concreto
+            node = stmt.getChild(0)
+            methods[type(node)](node)
+
+    def visitAssignStmt(self, ctx):
+        self.sem.emit_assign(ctx.ID().getText(), *self.value(ctx.expr()))
+
+    def visitIfStmt(self, ctx):
+        sem = self.sem
+        quads = sem.quadruples
+        cond, _ = self.value(ctx.expr())
+        false_jump = sem.emit_gotof(cond)
+        blocks = ctx.block()
+        self.visitBlock(blocks[0])
+
+        if len(blocks) > 1:
+            # Saltar ELSE; GOTOF → inicio ELSE
+            quads.append(Quadruple(OPCODES["GOTO"], None, None, None))
+            end_jump = len(quads) - 1
+            quads[false_jump].res = len(quads)
+            self.visitBlock(blocks[1])
+            quads[end_jump].res = len(quads)
+        else:
+            quads[false_jump].res = len(quads)
+
+    def visitWhileStmt(self, ctx):
+        sem = self.sem
+        quads = sem.quadruples
+        start = len(quads)
+        cond, _ = self.value(ctx.expr())
+        false_jump = sem.emit_gotof(cond)
+        self.visitBlock(ctx.block())
+        quads.append(Quadruple(OPCODES["GOTO"], None, None, start))
+        quads[false_jump].res = len(quads)
+
+    def visitPrintStmt(self, ctx):
+        args = ctx.printArgList()
+        addrs = [self.value(expr)[0] for expr in args.expr()] if args else []
+        self.sem.emit_print(addrs)
+
+    def visitFuncCallStmt(self, ctx):
+        self._call(ctx.funcCall(), is_stmt_call=True)
+
+    def visitReturnStmt(self, ctx):
+        self.sem.emit_return(*self.value(ctx.expr()))
+
+    # ------------------------------------------------------------
+    # Expresiones: regresan (addr, tipo)
+    # ------------------------------------------------------------
+    def visitFuncCall(self, ctx):
+        return self._call(ctx, is_stmt_call=False)
+
+    def _call(self, ctx, is_stmt_call):
+        args = ctx.argList()
+        values = [self.value(expr) for expr in args.expr()] if args else []
+        return self.sem.emit_call(ctx.ID().getText(), values, is_stmt_call)
+
+    def visitRelExpr(self, ctx):
+        # expr relop expr
+        left = self.value(ctx.getChild(0))
+        right = self.value(ctx.getChild(2))
+        return self.sem.emit_binary(ctx.getChild(1).getText(), *left, *right)
+
+    def visitAddOp(self, ctx):
+        # addExpr (+|-) multExpr
+        left = self.value(ctx.getChild(0))
+        right = self.value(ctx.getChild(2))
+        return self.sem.emit_binary(ctx.getChild(1).getText(), *left, *right)
+
+    def visitMultOp(self, ctx):
+        # multExpr (*|/|%) unaryExpr
+        left = self.value(ctx.getChild(0))
+        right = self.value(ctx.getChild(2))
+        return self.sem.emit_binary(ctx.getChild(1).getText(), *left, *right)
+
+    def visitUnarySign(self, ctx):
+        return self.sem.emit_unary(ctx.getChild(0).getText(), *self.value(ctx.getChild(1)))
+
+    def visitAtom(self, ctx):
+        first = ctx.getChild(0)
+        if not isinstance(first, TerminalNode):
+            return self._call(first, is_stmt_call=False)
+
+        token = first.symbol
+        if token.type == P.LPAREN:
+            return self.value(ctx.getChild(1))
+        if token.type == P.ID:
+            vinfo = self.sem.vartab.lookup(token.text)
+            return vinfo.address, vinfo.var_type
+        convert, vtype = LITERALS[token.type]
+        return self.sem.get_or_add_constant(convert(token.text), vtype), vtype
@@ -0,0 +1,141 @@
+"""
+Caché en disco de programas compilados, indexada por hash del fuente.
+
+La llave es sha256(versión del compilador + versión de .ptc + opciones +
+texto fuente); el artefacto guardado es el .ptc completo (cuádruplos,
+constantes, directorio de funciones y tabla de símbolos). Un acierto evita
+por completo ANTLR y el listener semántico.
+
+El tamaño total se acota con desalojo LRU: cada acierto actualiza el mtime
+del archivo y al escribir se borran los más viejos hasta quedar bajo el límite.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+import ptc
+from program import Program
+
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PATITO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "patito")
+)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+ENTRY_SUFFIX = ".ptc"
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (
+            f"hits={self.hits} misses={self.misses} "
+            f"stores={self.stores} evictions={self.evictions}"
+        )
+
+
+class CompileCache:
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        os.makedirs(directory, exist_ok=True)
+
+    # ------------------------------------------------------------
+    # Llaves
+    # ------------------------------------------------------------
+    @staticmethod
+    def key(source: str, compiler_version: str, options: str = "") -> str:
+        digest = hashlib.sha256()
+        for part in (compiler_version, str(ptc.FORMAT_VERSION), options):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    # ------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------
+    def get(self, key: str) -> Optional[Program]:
+        path = self.path_for(key)
+        try:
+            program = ptc.load(path)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        except (OSError, ptc.PtcFormatError):
+            # Entrada corrupta o de otra versión: se descarta y se recompila
+            # (ptc.load reporta todo archivo mal formado como PtcFormatError;
+            # otros errores son fallas del cargador y no se esconden)
+            self._remove(path)
+            self.stats.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU: el acierto cuenta como uso reciente
+        except OSError:
+            pass
+        self.stats.hits += 1
+        return program
+
+    def put(self, key: str, program: Program):
+        data = ptc.dumps(program)
+        # Escritura atómica: otro proceso nunca ve un archivo a medias
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, self.path_for(key))
+        except OSError:
+            self._remove(tmp)
+            raise
+        self.stats.stores += 1
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                self.stats.evictions += 1
+
+    def size(self) -> int:
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX):
+                try:
+                    total += os.path.getsize(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        return total
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,322 @@
+import contextlib
+import io
+
+from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ConsoleErrorListener, ErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+
+from PatitoLexer import PatitoLexer
+from PatitoParser import PatitoParser
+from PatitoSemanticListener import PatitoSemanticListener
+from compile_cache import CompileCache
+from code_generator import PatitoCodeGenerator
+from descent_parser import DescentParser
+from fast_lexer import FastLexer
+from opcodes import OPCODES
+from optimizer import PASSES, optimize
+from program import Program
+
+
+# Cambiar cuando cambie el código generado: invalida la caché de compilación
+COMPILER_VERSION = "16"
+
+# Niveles de optimización:
+#   0 -> cuádruplos tal cual los genera el listener
+#   1 -> plegado de constantes al generar
+#   2 -> además, pasadas de optimizer.py sobre los cuádruplos
+#   3 -> además, reducción de fuerza y simplificación algebraica
+OPT_LEVELS = (0, 1, 2, 3)
+DEFAULT_OPT_LEVEL = 1
+
+# Frontends (texto -> listener con cuádruplos):
+#   listener -> PatitoParser arma el árbol y ParseTreeWalker lo recorre
+#   visitor  -> mismo árbol, code_generator.PatitoCodeGenerator lo visita
+#   descent  -> descent_parser.DescentParser, una pasada sin árbol
+#   units    -> listener, pero parseando y soltando una unidad a la vez
+FRONTENDS = ("listener", "visitor", "descent", "units")
+DEFAULT_FRONTEND = "listener"
+
+
+class PatitoErrorListener(ErrorListener):
+    def __init__(self):
+        super().__init__()
+        self.errors = []
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.errors.append(f"[Sintaxis] línea {line}:{column} → {msg}")
+
+
+class PatitoSyntaxError(Exception):
+    # Agrupa todos los errores de sintaxis reportados por el parser
+    def __init__(self, errors):
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+class DeferredErrorListener(ErrorListener):
+    # Guarda los errores para reportarlos después a otro listener
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.calls.append((recognizer, offendingSymbol, line, column, msg, e))
+
+    def replay(self, listener):
+        for call in self.calls:
+            listener.syntaxError(*call)
+
+
+class UnitTokenStream(CommonTokenStream):
+    """
+    CommonTokenStream que suelta los tokens ya consumidos. Solo se llama
+    entre unidades, cuando el parser no está dentro de ninguna regla ni
+    va a regresar a un token anterior.
+    """
+
+    def release_consumed(self):
+        if self.index <= 0:
+            return
+        del self.tokens[:self.index]
+        for index, token in enumerate(self.tokens):
+            token.tokenIndex = index
+        self.index = 0
+
+
+def read_source(path):
+    with open(path, encoding="utf-8") as fh:
+        return fh.read()
+
+
+def make_lexer(source, fast_lexer: bool = False):
+    # PatitoLexer (generado por ANTLR) o fast_lexer.FastLexer: los mismos
+    # tokens, sin simular el ATN carácter por carácter
+    return FastLexer(source) if fast_lexer else PatitoLexer(InputStream(source))
+
+
+def parse_source(source, sll_first: bool = True, fast_lexer: bool = False):
+    """
+    Árbol de `program` para el texto de un programa; lanza PatitoSyntaxError.
+
+    Los tokens los produce PatitoLexer; con fast_lexer=True, FastLexer.
+
+    Con `sll_first` se intenta primero la predicción SLL (más barata: no
+    sigue el contexto completo de cada regla) con BailErrorStrategy, que
+    aborta en el primer error en lugar de recuperarse. Solo si falla se
+    vuelve a parsear con LL completo y PatitoErrorListener: así un programa
+    válido paga una sola pasada SLL y los errores se reportan igual que
+    antes. SLL puede rechazar entradas válidas, nunca aceptar inválidas.
+    """
+    lexer = make_lexer(source, fast_lexer)
+    token_stream = CommonTokenStream(lexer)
+    parser = PatitoParser(token_stream)
+    parser.removeErrorListeners()
+
+    if sll_first:
+        parser._interp.predictionMode = PredictionMode.SLL
+        parser._errHandler = BailErrorStrategy()
+        try:
+            return parser.program()
+        except ParseCancellationException:
+            # segunda etapa desde el primer token (el lexer no se repite)
+            parser._errHandler = DefaultErrorStrategy()
+            parser.reset()
+            parser._interp.predictionMode = PredictionMode.LL
+
+    # sintaxis: registrar errores personalizados
+    syn_err = PatitoErrorListener()
+    parser.addErrorListener(syn_err)
+
+    tree = parser.program()
+    if syn_err.errors:
+        raise PatitoSyntaxError(syn_err.errors)
+    return tree
+
+
+def analyze_descent(source, sem_listener):
+    """
+    Parsea y analiza en una sola pasada con DescentParser (sin árbol);
+    regresa el mismo listener lleno. Lanza PatitoSyntaxError con el primer
+    error de sintaxis o SemanticError.
+    """
+    parser = DescentParser(source, sem_listener)
+    parser.removeErrorListeners()
+    syn_err = PatitoErrorListener()
+    parser.addErrorListener(syn_err)
+    try:
+        return parser.program()
+    except ParseCancellationException:
+        raise PatitoSyntaxError(syn_err.errors) from None
+
+
+def analyze_units(source, sem_listener, sll_first: bool = True, fast_lexer: bool = False):
+    """
+    Compila por unidades: las variables globales, cada funcDecl y el bloque
+    del main se parsean por separado (parser.funcDecl(), parser.block()) y
+    se recorren con el listener en cuanto terminan; después se sueltan su
+    subárbol, sus tokens y sus entradas de expr_value. Con el frontend
+    listener el árbol de todo el archivo vive hasta el final; aquí la
+    memoria del compilador depende de la unidad más grande (además de lo que
+    se genera: cuádruplos, constantes y tablas).
+
+    Genera lo mismo que el frontend listener y reporta los mismos errores:
+    si alguna unidad tiene un error de sintaxis se vuelve a parsear el
+    archivo completo con parse_source, y un error semántico solo se lanza
+    cuando el resto del archivo parseó sin errores.
+    """
+    lexer_errors = DeferredErrorListener()
+    lexer = make_lexer(source, fast_lexer)
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(lexer_errors)
+    stream = UnitTokenStream(lexer)
+    parser = PatitoParser(stream)
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    walker = ParseTreeWalker()
+    failure = None
+    # semantics.py imprime el error antes de lanzarlo; se guarda para
+    # imprimirlo solo si el resto del archivo no tiene errores de sintaxis
+    failure_output = io.StringIO()
+
+    def parse_unit(rule):
+        # SLL y, si falla, LL; ambos abortan en el primer error
+        stream.release_consumed()
+        start = stream.index
+        if sll_first:
+            parser._interp.predictionMode = PredictionMode.SLL
+            try:
+                return rule()
+            except ParseCancellationException:
+                stream.seek(start)
+        parser._interp.predictionMode = PredictionMode.LL
+        return rule()
+
+    def analyze(tree, before=None):
+        # Tras el primer error semántico solo se sigue revisando la sintaxis
+        nonlocal failure, failure_output
+        if failure is not None:
+            return
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                if before is not None:
+                    before()
+                walker.walk(sem_listener, tree)
+        except Exception as err:
+            failure = err
+            failure_output = output
+        else:
+            print(output.getvalue(), end="")
+        sem_listener.expr_value.clear()
+
+    def expect(ttype):
+        # Tokens de `program` que no pertenecen a ninguna unidad
+        if stream.LA(1) != ttype:
+            raise ParseCancellationException("token fuera de lugar")
+        if ttype != PatitoParser.EOF:
+            stream.consume()
+
+    try:
+        sem_listener.begin_program()
+        expect(PatitoParser.PROGRAM)
+        expect(PatitoParser.ID)
+        expect(PatitoParser.SEMI)
+        if stream.LA(1) == PatitoParser.VAR:
+            analyze(parse_unit(parser.globalVarSection))
+        while stream.LA(1) in (PatitoParser.INT, PatitoParser.FLOAT, PatitoParser.BOOL, PatitoParser.VOID):
+            analyze(parse_unit(parser.funcDecl))
+        expect(PatitoParser.MAIN)
+        # el bloque se parsea suelto: el listener no ve que su padre es program
+        analyze(parse_unit(parser.block), before=sem_listener.begin_main)
+        expect(PatitoParser.END)
+        expect(PatitoParser.EOF)
+    except ParseCancellationException:
+        # mismos mensajes (y errores léxicos) que al parsear todo junto
+        parse_source(source, fast_lexer=fast_lexer)
+        raise PatitoSyntaxError(["[Sintaxis] error de sintaxis"]) from None
+
+    lexer_errors.replay(ConsoleErrorListener.INSTANCE)
+    if failure is not None:
+        print(failure_output.getvalue(), end="")
+        raise failure
+    return sem_listener
+
+
+def _compile(source, opt_level=DEFAULT_OPT_LEVEL, frontend=DEFAULT_FRONTEND, fast_lexer=False):
+    if opt_level not in OPT_LEVELS:
+        raise ValueError(f"Nivel de optimización desconocido: {opt_level}")
+    if frontend not in FRONTENDS:
+        raise ValueError(f"Frontend desconocido: {frontend}")
+
+    # semántica (SemanticError se propaga al llamador)
+    sem_listener = PatitoSemanticListener(fold_constants=opt_level >= 1)
+    if frontend == "descent":
+        analyze_descent(source, sem_listener)
+    elif frontend == "visitor":
+        PatitoCodeGenerator(sem_listener).generate(parse_source(source, fast_lexer=fast_lexer))
+    elif frontend == "units":
+        analyze_units(source, sem_listener, fast_lexer=fast_lexer)
+    else:
+        tree = parse_source(source, fast_lexer=fast_lexer)
+        ParseTreeWalker().walk(sem_listener, tree)
+    program = Program.from_listener(sem_listener)
+    if opt_level >= 2:
+        program = optimize(program, opt_level)
+    return program
+
+
+def _cache_options(opt_level):
+    """
+    Parte de la llave de caché que depende de las opciones. Incluye las
+    pasadas del optimizador que corren en ese nivel y la tabla de opcodes:
+    agregar o reordenar una pasada, o agregar un opcode, invalida las
+    entradas aunque se olvide subir COMPILER_VERSION.
+    """
+    passes = [run_pass.__name__ for level in sorted(PASSES) if level <= opt_level for run_pass in PASSES[level]]
+    opcodes = ",".join(f"{name}={code}" for name, code in sorted(OPCODES.items()))
+    return f"O{opt_level}:" + ",".join(passes) + ":" + opcodes
+
+
+def compile_source(
+    source,
+    cache: CompileCache = None,
+    opt_level: int = DEFAULT_OPT_LEVEL,
+    frontend: str = DEFAULT_FRONTEND,
+    fast_lexer: bool = False,
+):
+    """
+    Compila el texto de un programa y regresa un Program reutilizable.
+    Lanza PatitoSyntaxError o SemanticError; no imprime nada.
+
+    `fast_lexer` usa fast_lexer.FastLexer en lugar de PatitoLexer en los
+    frontends listener, visitor y units (descent siempre usa FastLexer).
+    Los tokens son los mismos, así que no cambia el Program ni la llave de
+    la caché.
+
+    Con `cache`, un fuente ya visto (mismo texto, versión del compilador y
+    nivel de optimización) se carga del disco sin pasar por ANTLR. Todos los
+    frontends generan el mismo Program, así que comparten entrada.
+    """
+    if cache is None:
+        return _compile(source, opt_level, frontend, fast_lexer)
+
+    key = cache.key(source, COMPILER_VERSION, _cache_options(opt_level))
+    program = cache.get(key)
+    if program is not None:
+        return program
+
+    program = _compile(source, opt_level, frontend, fast_lexer)
+    cache.put(key, program)
+    return program
+
+
+def compile_file(
+    path,
+    cache: CompileCache = None,
+    opt_level: int = DEFAULT_OPT_LEVEL,
+    frontend: str = DEFAULT_FRONTEND,
+    fast_lexer: bool = False,
+):
+    return compile_source(read_source(path), cache, opt_level, frontend, fast_lexer)
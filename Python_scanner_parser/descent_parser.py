@@ -0,0 +1,372 @@
+"""
+Parser descendente recursivo de Patito, alternativa a PatitoParser + walker.
+
+PatitoParser construye el árbol completo (un contexto por regla, incluso
+para cada nivel expr/addExpr/multExpr/unaryExpr/atom de una hoja) y después
+ParseTreeWalker lo recorre llamando al listener. Aquí cada regla de
+Patito.g4 es un método que consume tokens de fast_lexer.FastLexer conforme
+los necesita y, en el mismo paso, llama a los métodos sin ctx de
+PatitoSemanticListener en el orden en que el walker llamaría a los enterX /
+exitX. No queda árbol ni lista de tokens: la memoria depende del anidamiento,
+no del tamaño del programa.
+
+Las expresiones se parsean por precedencia (Pratt): un solo método con el
+poder de enlace de cada operador binario en lugar de un método por nivel.
+    relop (> < != ==)  1   izquierda, el más débil
+    + -                2   izquierda
+    * / %              3   izquierda
+    + - unarios            más fuerte que cualquier binario
+
+Para el mismo programa válido genera los mismos cuádruplos, constantes y
+direcciones que el listener, incluidos los operandos que exitRelExpr toma de
+expr_value (lo que exitToAdd dejó en el tope de la pila).
+Diferencias: se detiene en el primer error de sintaxis (no se recupera como
+ANTLR) y, como analiza conforme lee, un error semántico anterior a un error
+de sintaxis se reporta antes que éste.
+"""
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.Errors import ParseCancellationException
+
+from PatitoParser import PatitoParser
+from PatitoSemanticListener import PatitoSemanticListener
+from fast_lexer import FastLexer
+
+
+P = PatitoParser
+
+# Poder de enlace de los operadores binarios
+BINDING_POWER = {
+    P.GT: 1, P.LT: 1, P.NE: 1, P.EQ: 1,
+    P.PLUS: 2, P.MINUS: 2,
+    P.TIMES: 3, P.DIV: 3, P.MOD: 3,
+}
+RELATIONAL_POWER = 1
+
+TYPE_TOKENS = (P.INT, P.FLOAT, P.BOOL, P.VOID)
+STMT_TOKENS = (P.ID, P.IF, P.WHILE, P.PRINT, P.RETURN)
+EXPR_TOKENS = (P.TRUE, P.FALSE, P.PLUS, P.MINUS, P.LPAREN, P.CTE_FLOAT, P.CTE_INT, P.STRING, P.ID)
+
+
+def _display(ttype):
+    # Como ANTLR en sus mensajes: 'literal' o nombre simbólico
+    if ttype == P.EOF:
+        return "<EOF>"
+    literal = P.literalNames[ttype] if ttype < len(P.literalNames) else "<INVALID>"
+    return literal if literal != "<INVALID>" else P.symbolicNames[ttype]
+
+
+def _display_set(ttypes):
+    if len(ttypes) == 1:
+        return _display(ttypes[0])
+    return "{" + ", ".join(_display(t) for t in sorted(ttypes)) + "}"
+
+
+class DescentParser:
+    """
+    parser = DescentParser(texto)
+    listener = parser.program()   # PatitoSemanticListener ya lleno
+
+    Los errores de sintaxis se reportan a los error listeners (como los de
+    ANTLR: syntaxError(recognizer, token, línea, columna, msg, e)) y
+    detienen el parseo con ParseCancellationException.
+    """
+
+    def __init__(self, source: str, listener: PatitoSemanticListener = None):
+        self.source = source
+        self.sem = listener if listener is not None else PatitoSemanticListener()
+        self._lexer = FastLexer(source)
+        self._listeners = [ConsoleErrorListener.INSTANCE]
+        self.token = self._lexer.nextToken()
+        self._lookahead = None
+        self._last = None
+
+    def addErrorListener(self, listener):
+        self._listeners.append(listener)
+
+    def removeErrorListeners(self):
+        self._listeners = []
+
+    # ------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------
+    def _advance(self):
+        token = self.token
+        self._last = token
+        if self._lookahead is not None:
+            self.token, self._lookahead = self._lookahead, None
+        else:
+            self.token = self._lexer.nextToken()
+        return token
+
+    def _peek(self):
+        # Segundo token: distingue `ID (` (llamada) de `ID =` / ID solo
+        if self._lookahead is None:
+            self._lookahead = self._lexer.nextToken()
+        return self._lookahead
+
+    def _expect(self, ttype):
+        if self.token.type != ttype:
+            self._mismatch((ttype,))
+        return self._advance()
+
+    def _mismatch(self, expected):
+        self._error(f"mismatched input '{self.token.text}' expecting {_display_set(expected)}")
+
+    def _error(self, msg):
+        token = self.token
+        for listener in self._listeners:
+            listener.syntaxError(self, token, token.line, token.column, msg, None)
+        raise ParseCancellationException(msg)
+
+    def _text(self, start, stop):
+        # Como ctx.getText(): tokens pegados, sin espacios ni comentarios
+        lexer = FastLexer(self.source[start:stop + 1])
+        lexer.removeErrorListeners()
+        parts = []
+        token = lexer.nextToken()
+        while token.type != P.EOF:
+            parts.append(token.text)
+            token = lexer.nextToken()
+        return "".join(parts)
+
+    # ------------------------------------------------------------
+    # Programa y declaraciones
+    # ------------------------------------------------------------
+    def program(self) -> PatitoSemanticListener:
+        sem = self.sem
+        sem.begin_program()
+        self._expect(P.PROGRAM)
+        self._expect(P.ID)
+        self._expect(P.SEMI)
+
+        if self.token.type == P.VAR:
+            self._var_section()
+
+        while self.token.type in TYPE_TOKENS:
+            self._func_decl()
+
+        self._expect(P.MAIN)
+        sem.begin_main()
+        self._block()
+        self._expect(P.END)
+        self._expect(P.EOF)
+        return sem
+
+    def _var_section(self):
+        # VAR varDecl+
+        self._advance()
+        self._var_decl()
+        while self.token.type == P.ID:
+            self._var_decl()
+
+    def _var_decl(self):
+        names = [self._expect(P.ID).text]
+        while self.token.type == P.COMMA:
+            self._advance()
+            names.append(self._expect(P.ID).text)
+        self._expect(P.COLON)
+        vtype = self._type()
+        self._expect(P.SEMI)
+        self.sem.declare_vars(names, vtype)
+
+    def _type(self):
+        if self.token.type not in TYPE_TOKENS:
+            self._mismatch(TYPE_TOKENS)
+        return self._advance().text
+
+    def _func_decl(self):
+        sem = self.sem
+        ret_type = self._type()
+        fname = self._expect(P.ID).text
+        self._expect(P.LPAREN)
+        params = []
+        if self.token.type == P.ID:
+            params.append(self._param())
+            while self.token.type == P.COMMA:
+                self._advance()
+                params.append(self._param())
+        self._expect(P.RPAREN)
+        sem.declare_function(fname, ret_type, params)
+
+        if self.token.type == P.VAR:
+            self._var_section()
+        if self.token.type == P.LBRACE:
+            sem.begin_function_body(fname)
+            self._block()
+        self._expect(P.SEMI)
+        sem.end_function(fname)
+
+    def _param(self):
+        name = self._expect(P.ID).text
+        self._expect(P.COLON)
+        return name, self._type()
+
+    # ------------------------------------------------------------
+    # Estatutos
+    # ------------------------------------------------------------
+    def _block(self):
+        self._expect(P.LBRACE)
+        while self.token.type != P.RBRACE:
+            self._statement()
+        self._advance()
+
+    def _statement(self):
+        ttype = self.token.type
+        if ttype == P.ID:
+            if self._peek().type == P.LPAREN:
+                self._func_call(is_stmt_call=True)
+                self._expect(P.SEMI)
+            else:
+                self._assign()
+        elif ttype == P.IF:
+            self._if()
+        elif ttype == P.WHILE:
+            self._while()
+        elif ttype == P.PRINT:
+            self._print()
+        elif ttype == P.RETURN:
+            self._return()
+        else:
+            self._mismatch((P.RBRACE,) + STMT_TOKENS)
+
+    def _assign(self):
+        name = self._advance().text
+        self._expect(P.ASSIGN)
+        self._expression()
+        self._expect(P.SEMI)
+        self.sem.emit_assign(name, *self.sem.pop_operand())
+
+    def _condition(self):
+        # ( expr ) de if/while: GOTOF sobre la condición completa (enterBlock)
+        self._expect(P.LPAREN)
+        self._expression()
+        self._expect(P.RPAREN)
+        self.sem.emit_condition_jump()
+
+    def _if(self):
+        sem = self.sem
+        self._advance()
+        self._condition()
+        self._block()
+        has_else = self.token.type == P.ELSE
+        sem.end_then_block(has_else)
+        if has_else:
+            self._advance()
+            self._block()
+            sem.end_else_block()
+        self._expect(P.SEMI)
+
+    def _while(self):
+        sem = self.sem
+        self._advance()
+        sem.begin_while()
+        self._condition()
+        self._expect(P.DO)
+        self._block()
+        self._expect(P.SEMI)
+        sem.end_while()
+
+    def _print(self):
+        self._advance()
+        self._expect(P.LPAREN)
+        count = 0
+        if self.token.type != P.RPAREN:
+            count = self._arguments()
+        self._expect(P.RPAREN)
+        self._expect(P.SEMI)
+        self.sem.emit_print(self.sem.pop_print_args(count))
+
+    def _return(self):
+        self._advance()
+        self._expect(P.LPAREN)
+        self._expression()
+        self._expect(P.RPAREN)
+        self._expect(P.SEMI)
+        self.sem.emit_return(*self.sem.pop_operand())
+
+    def _func_call(self, is_stmt_call):
+        fname = self._advance().text
+        self._expect(P.LPAREN)
+        count = 0
+        if self.token.type != P.RPAREN:
+            count = self._arguments()
+        self._expect(P.RPAREN)
+        sem = self.sem
+        result = sem.emit_call(fname, sem.pop_operands(count), is_stmt_call)
+        if result is not None:
+            sem.push_operand(*result)
+
+    def _arguments(self):
+        # expr (, expr)* -> cuántas quedaron en la pila
+        self._expression()
+        count = 1
+        while self.token.type == P.COMMA:
+            self._advance()
+            self._expression()
+            count += 1
+        return count
+
+    # ------------------------------------------------------------
+    # Expresiones
+    # ------------------------------------------------------------
+    def _top(self):
+        # Lo que exitToAdd guardaría en expr_value al terminar un operando
+        sem = self.sem
+        if not sem.operand_stack:
+            return None
+        return sem.operand_stack[-1], sem.type_stack[-1]
+
+    def _expression(self, min_power=1):
+        """
+        Operadores binarios con poder >= min_power; regresa el (addr, tipo)
+        que exitRelExpr recibiría de esta expresión como operando.
+        """
+        sem = self.sem
+        start = self.token.start
+        self._unary()
+        value = self._top()
+        while True:
+            power = BINDING_POWER.get(self.token.type)
+            if power is None or power < min_power:
+                return value
+            op = self._advance().text
+            right = self._expression(power + 1)
+            if power == RELATIONAL_POWER:
+                value = sem.emit_relational(
+                    op, value, right, lambda: self._text(start, self._last.stop)
+                )
+            else:
+                sem.apply_binary(op)
+                value = self._top()
+
+    def _unary(self):
+        if self.token.type in (P.PLUS, P.MINUS):
+            sign = self._advance().text
+            self._unary()
+            sem = self.sem
+            sem.push_operand(*sem.emit_unary(sign, *sem.pop_operand()))
+        else:
+            self._atom()
+
+    def _atom(self):
+        sem = self.sem
+        ttype = self.token.type
+        if ttype == P.LPAREN:
+            self._advance()
+            self._expression()
+            self._expect(P.RPAREN)
+        elif ttype == P.ID:
+            if self._peek().type == P.LPAREN:
+                self._func_call(is_stmt_call=False)
+            else:
+                sem.push_variable(self._advance().text)
+        elif ttype == P.CTE_INT:
+            sem.push_constant(int(self._advance().text), "int")
+        elif ttype == P.CTE_FLOAT:
+            sem.push_constant(float(self._advance().text), "float")
+        elif ttype in (P.TRUE, P.FALSE):
+            sem.push_constant(self._advance().type == P.TRUE, "bool")
+        elif ttype == P.STRING:
+            sem.push_constant(self._advance().text, "string")
+        else:
+            self._mismatch(EXPR_TOKENS)
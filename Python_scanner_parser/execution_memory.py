@@ -1,6 +1,7 @@
 from typing import Dict, List, Optional
 
-from virtual_memory import SEGMENT_LAYOUT
+from cfg import frame_extents
+from virtual_memory import SEGMENT_LAYOUT, SEGMENT_SIZE
 
 
 class MemoryWindow:
@@ -52,8 +53,16 @@ class ActivationRecord:
             if name.startswith("temp_")
         }
 
+        self._windows = list(self.locals.values()) + list(self.temps.values())
+
     def windows(self) -> List[MemoryWindow]:
-        return list(self.locals.values()) + list(self.temps.values())
+        return self._windows
+
+    def reset(self, tag: str):
+        # Reuso desde el pool: se vacían las ventanas en lugar de recrearlas
+        self.tag = tag
+        for win in self._windows:
+            win._data.clear()
 
 
 class ExecutionMemory:
@@ -62,9 +71,17 @@ class ExecutionMemory:
     - Segmentos globales (persisten toda la corrida)
     - Segmentos de constantes (solo lectura)
     - Segmentos locales/temporales por activacion de funcion
+
+    Los marcos que regresan de una llamada se guardan en un pool y se reusan
+    en el siguiente ERA (pool_frames=False crea uno nuevo en cada llamada).
     """
 
-    def __init__(self, constants: Optional[Dict[int, object]] = None):
+    def __init__(
+        self,
+        constants: Optional[Dict[int, object]] = None,
+        frame_sizes: Optional[Dict[str, Dict[int, int]]] = None,
+        pool_frames: bool = True,
+    ):
         self.layout = SEGMENT_LAYOUT
         self.globals = {
             name: MemoryWindow(name, start, size)
@@ -79,6 +96,9 @@ class ExecutionMemory:
         self.call_stack: List[ActivationRecord] = []
         self.current_activation: Optional[ActivationRecord] = None
         self.pending_activation: Optional[ActivationRecord] = None
+        # frame_sizes solo aplica a la memoria plana: los dict ya son dispersos
+        self.pool: Optional[List[ActivationRecord]] = [] if pool_frames else None
+        self.frames_allocated = 0
 
         if constants:
             self._load_constants(constants)
@@ -86,16 +106,24 @@ class ExecutionMemory:
     # ------------------------------------------------------------
     # Manejo de activaciones
     # ------------------------------------------------------------
+    def _new_activation(self, tag: str) -> ActivationRecord:
+        if self.pool:
+            ar = self.pool.pop()
+            ar.reset(tag)
+            return ar
+        self.frames_allocated += 1
+        return ActivationRecord(tag)
+
     def push_activation(self, tag: str = "call"):
         # Crea y activa un nuevo marco de ejecución (función)
-        ar = ActivationRecord(tag)
+        ar = self._new_activation(tag)
         self.call_stack.append(ar)
         self.current_activation = ar
         return ar
 
     def prepare_activation(self, tag: str = "call"):
         # Reserva un marco antes de evaluarse los PARAM
-        self.pending_activation = ActivationRecord(tag)
+        self.pending_activation = self._new_activation(tag)
         return self.pending_activation
 
     def push_prepared_activation(self):
@@ -109,9 +137,18 @@ class ExecutionMemory:
     def pop_activation(self):
         if not self.call_stack:
             raise RuntimeError("Pila de activaciones vacia")
-        self.call_stack.pop()
+        ar = self.call_stack.pop()
+        if self.pool is not None:
+            self.pool.append(ar)
         self.current_activation = self.call_stack[-1] if self.call_stack else None
 
+    def replace_activation(self):
+        # TAILCALL: el marco preparado toma el lugar del actual en la pila
+        if not self.pending_activation:
+            raise RuntimeError("No hay activacion preparada para hacer push")
+        self.pop_activation()
+        return self.push_prepared_activation()
+
     # ------------------------------------------------------------
     # Lectura / escritura
     # ------------------------------------------------------------
@@ -120,7 +157,7 @@ class ExecutionMemory:
         if addr not in win._data:
             if win.name.startswith("const_"):
                 raise RuntimeError(f"Direccion {addr} no inicializada en {win.name}")
-            default = self._default_for_segment(win.name)
+            default = default_for_segment(win.name)
             win.store(addr, default)
         return win.load(addr)
 
@@ -164,17 +201,6 @@ class ExecutionMemory:
 
         raise RuntimeError(f"Direccion {addr} fuera del mapa de memoria")
 
-    def _default_for_segment(self, segment_name: str):
-        if segment_name.endswith("int"):
-            return 0
-        if segment_name.endswith("float"):
-            return 0.0
-        if segment_name.endswith("bool"):
-            return False
-        if segment_name.endswith("string"):
-            return ""
-        return None
-
     def _load_constants(self, constants: Dict[int, object]):
         """
         Recibe un diccionario direccion -> valor y los guarda en el segmento
@@ -201,3 +227,276 @@ class ExecutionMemory:
                 "temps": {k: v.snapshot() for k, v in self.current_activation.temps.items()},
             },
         }
+
+
+# ================================================================
+# Motor de memoria plano (buffers indexados por segmento)
+# ================================================================
+
+# Cada segmento empieza en un múltiplo de SEGMENT_SIZE, así que
+# addr // SEGMENT_SIZE identifica el segmento y addr % SEGMENT_SIZE el offset.
+SEGMENT_INDEX: Dict[str, int] = {}
+for _name, (_start, _size) in SEGMENT_LAYOUT.items():
+    if _start % SEGMENT_SIZE or _size != SEGMENT_SIZE:
+        raise RuntimeError(f"Segmento {_name} no alineado a {SEGMENT_SIZE}")
+    SEGMENT_INDEX[_name] = _start // SEGMENT_SIZE
+
+SEGMENT_NAMES: Dict[int, str] = {idx: name for name, idx in SEGMENT_INDEX.items()}
+SEGMENT_COUNT = max(SEGMENT_INDEX.values()) + 1
+
+
+def default_for_segment(segment_name: str):
+    if segment_name.endswith("int"):
+        return 0
+    if segment_name.endswith("float"):
+        return 0.0
+    if segment_name.endswith("bool"):
+        return False
+    if segment_name.endswith("string"):
+        return ""
+    return None
+
+
+FRAME_SEGMENTS = {
+    idx for name, idx in SEGMENT_INDEX.items() if name.startswith(("loc_", "temp_"))
+}
+FULL_FRAME = {idx: SEGMENT_SIZE for idx in FRAME_SEGMENTS}
+
+
+def frame_sizes(quadruples: List) -> Dict[str, Dict[int, int]]:
+    """
+    Tag del marco (nombre de la función o "main") -> casillas que usa en cada
+    segmento local/temporal, según los cuádruplos del programa.
+    """
+    sizes = {}
+    for name, extents in frame_extents(quadruples, FRAME_SEGMENTS).items():
+        sizes["main" if name is None else name] = {
+            idx: extents.get(idx, 0) for idx in FRAME_SEGMENTS
+        }
+    return sizes
+
+
+class FlatActivationRecord:
+    """
+    Marco de activacion con un buffer (lista) preasignado por segmento local/temporal.
+    `segments` es la tabla completa indice -> buffer: los indices globales y de
+    constantes apuntan a los buffers compartidos de FlatExecutionMemory.
+
+    `sizes` indica cuantas casillas reservar por segmento (por defecto el
+    segmento completo); `initial` guarda el contenido inicial para reset().
+    """
+
+    def __init__(self, shared: List, tag: str = "anon", sizes: Optional[Dict[int, int]] = None):
+        self.tag = tag
+        # ip de regreso (lo usan los motores enlazados en lugar de return_ips)
+        self.return_ip: Optional[int] = None
+        self.segments = list(shared)
+        self.initial = []
+        for idx, size in (sizes or FULL_FRAME).items():
+            buf = [default_for_segment(SEGMENT_NAMES[idx])] * size
+            self.segments[idx] = buf
+            if size:
+                self.initial.append((buf, list(buf)))
+
+    def reset(self):
+        # Reuso desde el pool: restaura los defaults sin crear listas nuevas
+        self.return_ip = None
+        for buf, initial in self.initial:
+            buf[:] = initial
+
+
+class FlatExecutionMemory:
+    """
+    Alternativa a ExecutionMemory con la misma interfaz (load/store/activaciones).
+
+    En lugar de un dict por ventana y una busqueda lineal entre ventanas, cada
+    segmento de SEGMENT_LAYOUT es una lista preasignada y la direccion se resuelve
+    en O(1): segments[addr // SEGMENT_SIZE][addr % SEGMENT_SIZE].
+    Se usan listas (y no array('q')/array('d')) porque la VM conserva el tipo
+    Python del valor: un int asignado a un float no se convierte y los int no
+    tienen limite de 64 bits.
+
+    Con `frame_sizes` (ver frame_sizes()) cada marco reserva solo las casillas
+    que usa su función en lugar de SEGMENT_SIZE por segmento. Los marcos que
+    regresan de una llamada se guardan en un pool por función y se reusan en
+    el siguiente ERA a la misma función (pool_frames=False lo desactiva).
+    """
+
+    def __init__(
+        self,
+        constants: Optional[Dict[int, object]] = None,
+        frame_sizes: Optional[Dict[str, Dict[int, int]]] = None,
+        pool_frames: bool = True,
+    ):
+        self.layout = SEGMENT_LAYOUT
+        shared: List = [None] * SEGMENT_COUNT
+        for name, idx in SEGMENT_INDEX.items():
+            if name.startswith("glob_"):
+                shared[idx] = [default_for_segment(name)] * SEGMENT_SIZE
+            elif name.startswith("const_"):
+                shared[idx] = []
+        self.shared = shared
+        # Segmentos de solo lectura (constantes) por indice
+        self.read_only = [
+            SEGMENT_NAMES.get(idx, "").startswith("const_") for idx in range(SEGMENT_COUNT)
+        ]
+
+        self.call_stack: List[FlatActivationRecord] = []
+        self.current_activation: Optional[FlatActivationRecord] = None
+        self.pending_activation: Optional[FlatActivationRecord] = None
+        self.segments: List = shared
+        self.frame_sizes = frame_sizes or {}
+        self.pools: Optional[Dict[str, List[FlatActivationRecord]]] = {} if pool_frames else None
+        self.frames_allocated = 0
+        # OutputSink de PRINT para los motores enlazados (lo asigna la VM)
+        self.output = None
+
+        if constants:
+            self._load_constants(constants)
+
+    # ------------------------------------------------------------
+    # Manejo de activaciones
+    # ------------------------------------------------------------
+    def _activate(self, ar: Optional[FlatActivationRecord]):
+        self.current_activation = ar
+        self.segments = ar.segments if ar else self.shared
+
+    def _new_activation(self, tag: str) -> FlatActivationRecord:
+        if self.pools is not None:
+            pool = self.pools.get(tag)
+            if pool:
+                ar = pool.pop()
+                ar.reset()
+                return ar
+        self.frames_allocated += 1
+        return FlatActivationRecord(self.shared, tag, self.frame_sizes.get(tag))
+
+    def push_activation(self, tag: str = "call"):
+        ar = self._new_activation(tag)
+        self.call_stack.append(ar)
+        self._activate(ar)
+        return ar
+
+    def prepare_activation(self, tag: str = "call"):
+        self.pending_activation = self._new_activation(tag)
+        return self.pending_activation
+
+    def push_prepared_activation(self):
+        if not self.pending_activation:
+            raise RuntimeError("No hay activacion preparada para hacer push")
+        self.call_stack.append(self.pending_activation)
+        self._activate(self.pending_activation)
+        self.pending_activation = None
+        return self.current_activation
+
+    def pop_activation(self):
+        if not self.call_stack:
+            raise RuntimeError("Pila de activaciones vacia")
+        ar = self.call_stack.pop()
+        if self.pools is not None:
+            self.pools.setdefault(ar.tag, []).append(ar)
+        self._activate(self.call_stack[-1] if self.call_stack else None)
+
+    def replace_activation(self):
+        # TAILCALL: el marco preparado toma el lugar (y el ip de regreso)
+        # del actual en la pila
+        ar = self.pending_activation
+        if not ar:
+            raise RuntimeError("No hay activacion preparada para hacer push")
+        if self.current_activation is not None:
+            ar.return_ip = self.current_activation.return_ip
+        self.pop_activation()
+        return self.push_prepared_activation()
+
+    # ------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------
+    def load(self, addr: int):
+        try:
+            return self.segments[addr // SEGMENT_SIZE][addr % SEGMENT_SIZE]
+        except (IndexError, TypeError):
+            raise RuntimeError(self._bad_address(addr, self.segments)) from None
+
+    def store(self, addr: int, value):
+        self._store_in(self.current_activation, addr, value)
+
+    def store_pending(self, addr: int, value):
+        if not self.pending_activation:
+            raise RuntimeError("No hay activacion preparada para PARAM")
+        self._store_in(self.pending_activation, addr, value)
+
+    # ------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------
+    def resolve(self, addr: int):
+        """
+        Regresa (indice de segmento, offset) de una direccion valida.
+        """
+        idx = addr // SEGMENT_SIZE
+        if idx not in SEGMENT_NAMES:
+            raise RuntimeError(f"Direccion {addr} fuera del mapa de memoria")
+        return idx, addr % SEGMENT_SIZE
+
+    def _store_in(self, activation, addr: int, value):
+        idx = addr // SEGMENT_SIZE
+        # Los segmentos locales/temporales salen del marco, el resto es compartido
+        table = activation.segments if activation else self.shared
+        try:
+            if self.read_only[idx]:
+                raise IndexError
+            table[idx][addr % SEGMENT_SIZE] = value
+        except (IndexError, TypeError):
+            # Igual que ExecutionMemory: las constantes no son escribibles
+            raise RuntimeError(f"Direccion {addr} fuera del mapa de memoria") from None
+
+    def _bad_address(self, addr: int, table) -> str:
+        idx = addr // SEGMENT_SIZE
+        name = SEGMENT_NAMES.get(idx)
+        if name is None or table[idx] is None:
+            return f"Direccion {addr} fuera del mapa de memoria"
+        return f"Direccion {addr} no inicializada en {name}"
+
+    def _load_constants(self, constants: Dict[int, object]):
+        for addr, value in constants.items():
+            idx, offset = self.resolve(addr)
+            if not SEGMENT_NAMES[idx].startswith("const_"):
+                raise RuntimeError(f"La direccion {addr} no pertenece al segmento de constantes")
+            buf = self.shared[idx]
+            if len(buf) <= offset:
+                buf.extend([None] * (offset + 1 - len(buf)))
+            buf[offset] = value
+
+    def snapshot(self):
+        """
+        Igual que ExecutionMemory.snapshot: omite las casillas sin valor propio.
+        """
+        def dump(table, prefix):
+            out = {}
+            for name, idx in SEGMENT_INDEX.items():
+                if name.startswith(prefix):
+                    start = idx * SEGMENT_SIZE
+                    default = default_for_segment(name)
+                    out[name] = {
+                        start + off: v
+                        for off, v in enumerate(table[idx])
+                        if v is not None and (prefix == "const_" or v != default)
+                    }
+            return out
+
+        return {
+            "globals": dump(self.shared, "glob_"),
+            "constants": dump(self.shared, "const_"),
+            "activation": None
+            if not self.current_activation
+            else {
+                "tag": self.current_activation.tag,
+                "locals": dump(self.current_activation.segments, "loc_"),
+                "temps": dump(self.current_activation.segments, "temp_"),
+            },
+        }
+
+
+MEMORY_ENGINES = {
+    "dict": ExecutionMemory,
+    "flat": FlatExecutionMemory,
+}
@@ -0,0 +1,138 @@
+"""
+Lexer de Patito escrito a mano, alternativa a PatitoLexer (generado por ANTLR).
+
+PatitoLexer simula el ATN de la gramática carácter por carácter en Python;
+aquí una sola expresión regular reconoce cada token (el ciclo interno lo
+hace el motor de `re`) y las palabras clave se separan de ID con un
+diccionario. Produce los mismos tokens que PatitoLexer (tipos de
+Patito.tokens, texto, línea, columna e índices de carácter), así que se
+conecta igual a un CommonTokenStream:
+
+    parser = PatitoParser(CommonTokenStream(FastLexer(texto)))
+
+ANTLR toma el token más largo y, a igual longitud, la regla declarada
+primero (las palabras clave antes que ID); el orden de las alternativas de
+TOKEN_RE da el mismo resultado para las reglas de Patito.g4. Los errores
+léxicos se reportan a los error listeners con el mensaje de ANTLR
+("token recognition error at: ...") y se recupera igual que él: se descarta
+lo que se alcanzó a leer (un "!" sin "=", un string sin cerrar) junto con el
+carácter que no encajó.
+"""
+import re
+
+from antlr4.CommonTokenFactory import CommonTokenFactory
+from antlr4.Token import CommonToken, Token
+from antlr4.error.ErrorListener import ConsoleErrorListener
+
+from PatitoLexer import PatitoLexer
+
+
+# Texto literal -> tipo de token ('program' -> PROGRAM, '==' -> EQ, ...)
+LITERALS = {
+    name[1:-1]: ttype
+    for ttype, name in enumerate(PatitoLexer.literalNames)
+    if name.startswith("'")
+}
+
+_SYMBOLS = sorted((text for text in LITERALS if not text[0].isalpha()), key=len, reverse=True)
+
+TOKEN_RE = re.compile(
+    r"(?P<WS>[ \t\r\n]+)"
+    r"|(?P<LINE_COMMENT>//[^\r\n]*)"
+    r"|(?P<BLOCK_COMMENT>/\*.*?\*/)"
+    r"|(?P<CTE_FLOAT>[0-9]+\.[0-9]+)"
+    r"|(?P<CTE_INT>[0-9]+)"
+    r'|(?P<STRING>"(?:[^"\\]|\\.)*")'
+    r"|(?P<ID>[a-zA-Z][a-zA-Z_0-9]*)"
+    r"|(?P<SYMBOL>" + "|".join(re.escape(text) for text in _SYMBOLS) + ")",
+    re.DOTALL,
+)
+
+# Reglas con `-> skip` en Patito.g4
+_SKIP = {"WS", "LINE_COMMENT", "BLOCK_COMMENT"}
+
+_TYPES = {name: getattr(PatitoLexer, name) for name in ("CTE_FLOAT", "CTE_INT", "STRING")}
+
+
+def _error_display(text: str) -> str:
+    # Como Lexer.getErrorDisplay de ANTLR
+    return text.replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r")
+
+
+class FastLexer:
+    """
+    Fuente de tokens para CommonTokenStream (nextToken). Los tokens se
+    generan conforme el stream los pide; al terminar regresa EOF siempre.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        # posición del token actual (CommonToken la toma de su fuente)
+        self.line = 1
+        self.column = 0
+        self._factory = CommonTokenFactory.DEFAULT
+        self._listeners = [ConsoleErrorListener.INSTANCE]
+        self._tokens = self._scan()
+
+    def addErrorListener(self, listener):
+        self._listeners.append(listener)
+
+    def removeErrorListeners(self):
+        self._listeners = []
+
+    def nextToken(self) -> Token:
+        return next(self._tokens)
+
+    def _scan(self):
+        text = self.text
+        size = len(text)
+        match = TOKEN_RE.match
+        source = (self, None)
+        pos = 0
+        line = 1
+        line_start = 0
+        while pos < size:
+            m = match(text, pos)
+            if m is None:
+                end = self._recognition_error(pos, line, pos - line_start)
+            else:
+                kind = m.lastgroup
+                end = m.end()
+                if kind not in _SKIP:
+                    value = m.group()
+                    if kind == "ID":
+                        ttype = LITERALS.get(value, PatitoLexer.ID)
+                    elif kind == "SYMBOL":
+                        ttype = LITERALS[value]
+                    else:
+                        ttype = _TYPES[kind]
+                    self.line, self.column = line, pos - line_start
+                    token = CommonToken(source, ttype, Token.DEFAULT_CHANNEL, pos, end - 1)
+                    token.text = value
+                    yield token
+            # espacios, comentarios, strings y errores pueden cruzar líneas
+            newlines = text.count("\n", pos, end)
+            if newlines:
+                line += newlines
+                line_start = text.rindex("\n", pos, end) + 1
+            pos = end
+
+        self.line, self.column = line, size - line_start
+        while True:
+            eof = CommonToken(source, Token.EOF, Token.DEFAULT_CHANNEL, size, size - 1)
+            eof.text = "<EOF>"
+            yield eof
+
+    def _recognition_error(self, pos: int, line: int, column: int) -> int:
+        # Regresa dónde se sigue leyendo
+        text = self.text
+        if text[pos] == '"':
+            stop = len(text)
+        elif text[pos] == "!":
+            stop = min(pos + 2, len(text))
+        else:
+            stop = pos + 1
+        msg = "token recognition error at: '" + _error_display(text[pos:stop]) + "'"
+        for listener in self._listeners:
+            listener.syntaxError(self, None, line, column, msg, None)
+        return stop
@@ -0,0 +1,31 @@
+"""
+Evaluación en tiempo de compilación de operaciones entre constantes.
+
+Usa las mismas funciones que la VM (linker.BINARY_FUNCS), así que el valor
+plegado es exactamente el que se calcularía al ejecutar. No se pliega lo que
+fallaría en ejecución (división o módulo entre cero): ese error se conserva
+para tiempo de ejecución.
+"""
+import math
+
+from linker import BINARY_FUNCS
+from opcodes import OPCODES
+
+
+# Resultado de fold_binary cuando la operación debe quedarse en runtime
+NOT_FOLDABLE = object()
+
+_ZERO_DIVISORS = {OPCODES["/"], OPCODES["%"]}
+
+
+def fold_binary(opcode: int, left, right):
+    fn = BINARY_FUNCS.get(opcode)
+    if fn is None:
+        return NOT_FOLDABLE
+    if opcode in _ZERO_DIVISORS and right == 0:
+        return NOT_FOLDABLE
+    value = fn(left, right)
+    # -0.0 y 0.0 comparten entrada en la tabla de constantes (0.0 == -0.0)
+    if isinstance(value, float) and value == 0 and math.copysign(1.0, value) < 0:
+        return NOT_FOLDABLE
+    return value
@@ -0,0 +1,295 @@
+"""
+Enlazado ("quad linking") de cuádruplos antes de ejecutarlos.
+
+Una vez que PatitoSemanticListener.quadruples es final, todas las direcciones
+son conocidas. link() decodifica cada cuádruplo una sola vez a una tupla
+
+    (handler, a_seg, a_off, b_seg, b_off, c_seg, c_off)
+
+donde cada operando ya es (indice de segmento, offset) de FlatExecutionMemory
+y las constantes van inlinadas (seg = None, off = valor). El handler se elige
+según el opcode y la forma de los operandos, así que en ejecución no hay
+consultas a quad.op/quad.left ni resolución de ventanas.
+
+Todos los handlers reciben (mem, a_seg, a_off, b_seg, b_off, c_seg, c_off)
+y regresan el siguiente ip o None para avanzar uno.
+"""
+import functools
+import operator
+from typing import Callable, Dict, List, Optional, Tuple
+
+from execution_memory import SEGMENT_NAMES
+from opcodes import OPCODES
+from virtual_memory import SEGMENT_SIZE
+
+
+OPCODE_NAMES = {v: k for k, v in OPCODES.items()}
+
+BINARY_FUNCS: Dict[int, Callable] = {
+    OPCODES["+"]: operator.add,
+    OPCODES["-"]: operator.sub,
+    OPCODES["*"]: operator.mul,
+    OPCODES["/"]: operator.truediv,
+    OPCODES["%"]: operator.mod,
+    OPCODES["&"]: operator.and_,
+    OPCODES[">"]: operator.gt,
+    OPCODES["<"]: operator.lt,
+    OPCODES["!="]: operator.ne,
+    OPCODES["=="]: operator.eq,
+}
+
+# GOTOF fusionado con su comparación: (GOTOF<, a, b, destino) salta si no a < b
+BRANCH_FUNCS: Dict[int, Callable] = {
+    OPCODES["GOTOF" + sym]: BINARY_FUNCS[OPCODES[sym]] for sym in (">", "<", "!=", "==")
+}
+
+
+class LinkError(Exception):
+    pass
+
+
+# ------------------------------------------------------------
+# Handlers
+# ------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def _binary_handler(fn: Callable, left_const: bool, right_const: bool) -> Callable:
+    # Una variante por forma de operandos: memoria/memoria, constante/memoria, ...
+    if left_const and right_const:
+        def handler(mem, ls, lo, rs, ro, ds, do):
+            mem.segments[ds][do] = fn(lo, ro)
+    elif left_const:
+        def handler(mem, ls, lo, rs, ro, ds, do):
+            s = mem.segments
+            s[ds][do] = fn(lo, s[rs][ro])
+    elif right_const:
+        def handler(mem, ls, lo, rs, ro, ds, do):
+            s = mem.segments
+            s[ds][do] = fn(s[ls][lo], ro)
+    else:
+        def handler(mem, ls, lo, rs, ro, ds, do):
+            s = mem.segments
+            s[ds][do] = fn(s[ls][lo], s[rs][ro])
+    return handler
+
+
+@functools.lru_cache(maxsize=None)
+def _branch_handler(fn: Callable, left_const: bool, right_const: bool) -> Callable:
+    # Igual que _binary_handler, pero el resultado decide el salto
+    if left_const:
+        def handler(mem, ls, lo, rs, ro, ds, target):
+            if not fn(lo, mem.segments[rs][ro]):
+                return target
+            return None
+    elif right_const:
+        def handler(mem, ls, lo, rs, ro, ds, target):
+            if not fn(mem.segments[ls][lo], ro):
+                return target
+            return None
+    else:
+        def handler(mem, ls, lo, rs, ro, ds, target):
+            s = mem.segments
+            if not fn(s[ls][lo], s[rs][ro]):
+                return target
+            return None
+    return handler
+
+
+def _assign_mem(mem, ls, lo, rs, ro, ds, do):
+    s = mem.segments
+    s[ds][do] = s[ls][lo]
+
+
+def _assign_const(mem, ls, lo, rs, ro, ds, do):
+    mem.segments[ds][do] = lo
+
+
+def _goto(mem, ls, lo, rs, ro, ds, target):
+    return target
+
+
+def _nop(mem, ls, lo, rs, ro, ds, do):
+    return None
+
+
+def _gotof_mem(mem, ls, lo, rs, ro, ds, target):
+    if not mem.segments[ls][lo]:
+        return target
+    return None
+
+
+def _gotof_const(mem, ls, lo, rs, ro, ds, target):
+    if not lo:
+        return target
+    return None
+
+
+def _print_mem(mem, ls, lo, rs, ro, ds, do):
+    mem.output.line(mem.segments[ls][lo])
+
+
+def _print_const(mem, ls, lo, rs, ro, ds, do):
+    # lo ya es el valor (o "" para print() sin argumentos)
+    mem.output.line(lo)
+
+
+def _print_arg_mem(mem, ls, lo, rs, ro, ds, do):
+    mem.output.arg(mem.segments[ls][lo])
+
+
+def _print_arg_const(mem, ls, lo, rs, ro, ds, do):
+    mem.output.arg(lo)
+
+
+def _era(mem, ls, lo, rs, ro, ds, tag):
+    mem.prepare_activation(tag)
+
+
+def _param_mem(mem, ls, lo, rs, ro, ds, do):
+    if not mem.pending_activation:
+        raise RuntimeError("No hay activacion preparada para PARAM")
+    mem.pending_activation.segments[ds][do] = mem.segments[ls][lo]
+
+
+def _param_const(mem, ls, lo, rs, ro, ds, do):
+    if not mem.pending_activation:
+        raise RuntimeError("No hay activacion preparada para PARAM")
+    mem.pending_activation.segments[ds][do] = lo
+
+
+def _gosub(mem, ls, lo, rs, return_ip, ds, target):
+    if not mem.pending_activation:
+        raise RuntimeError("No hay activacion preparada para hacer push")
+    mem.pending_activation.return_ip = return_ip
+    mem.push_prepared_activation()
+    return target
+
+
+def _tailcall(mem, ls, lo, rs, ro, ds, target):
+    ar = mem.current_activation
+    if ar is None or ar.return_ip is None:
+        raise RuntimeError("TAILCALL sin direccion de retorno")
+    mem.replace_activation()
+    return target
+
+
+def _return(mem, ls, lo, rs, ro, ds, name):
+    ar = mem.current_activation
+    if ar is None or ar.return_ip is None:
+        raise RuntimeError(f"{name} sin direccion de retorno")
+    mem.pop_activation()
+    return ar.return_ip
+
+
+def _fail(mem, ls, error, rs, ro, ds, do):
+    # Errores detectados al enlazar se reportan solo si el cuádruplo se ejecuta
+    raise error
+
+
+# ------------------------------------------------------------
+# Enlazado
+# ------------------------------------------------------------
+class Linker:
+    def __init__(self, constants: Optional[Dict[int, object]] = None):
+        self.constants = constants or {}
+
+    def operand(self, addr) -> Tuple[Optional[int], object]:
+        """
+        (seg, off) para direcciones de memoria; (None, valor) para constantes.
+        """
+        if addr in self.constants:
+            return None, self.constants[addr]
+        seg = self._segment(addr)
+        if SEGMENT_NAMES[seg].startswith("const_"):
+            raise LinkError(f"Direccion {addr} no inicializada en {SEGMENT_NAMES[seg]}")
+        return seg, addr % SEGMENT_SIZE
+
+    def target(self, addr) -> Tuple[int, int]:
+        seg = self._segment(addr)
+        if SEGMENT_NAMES[seg].startswith("const_"):
+            raise LinkError(f"Direccion {addr} fuera del mapa de memoria")
+        return seg, addr % SEGMENT_SIZE
+
+    def _segment(self, addr) -> int:
+        if not isinstance(addr, int) or addr // SEGMENT_SIZE not in SEGMENT_NAMES:
+            raise LinkError(f"Direccion {addr} fuera del mapa de memoria")
+        return addr // SEGMENT_SIZE
+
+    def link_quad(self, index: int, quad) -> tuple:
+        op = quad.op
+
+        if op in BINARY_FUNCS:
+            ls, lo = self.operand(quad.left)
+            rs, ro = self.operand(quad.right)
+            ds, do = self.target(quad.res)
+            handler = _binary_handler(BINARY_FUNCS[op], ls is None, rs is None)
+            return handler, ls, lo, rs, ro, ds, do
+
+        if op == OPCODES["="]:
+            ls, lo = self.operand(quad.left)
+            ds, do = self.target(quad.res)
+            return (_assign_const if ls is None else _assign_mem), ls, lo, None, None, ds, do
+
+        if op == OPCODES["GOTO"]:
+            return _goto, None, None, None, None, None, quad.res
+
+        if op == OPCODES["GOTOF"]:
+            ls, lo = self.operand(quad.left)
+            return (_gotof_const if ls is None else _gotof_mem), ls, lo, None, None, None, quad.res
+
+        if op in BRANCH_FUNCS:
+            ls, lo = self.operand(quad.left)
+            rs, ro = self.operand(quad.right)
+            if ls is None and rs is None:
+                # Ambas constantes: el salto se decide aquí, una sola vez
+                if BRANCH_FUNCS[op](lo, ro):
+                    return _nop, None, None, None, None, None, None
+                return _goto, None, None, None, None, None, quad.res
+            handler = _branch_handler(BRANCH_FUNCS[op], ls is None, rs is None)
+            return handler, ls, lo, rs, ro, None, quad.res
+
+        if op == OPCODES["PRINT"]:
+            if quad.left is None:
+                return _print_const, None, "", None, None, None, None
+            ls, lo = self.operand(quad.left)
+            return (_print_const if ls is None else _print_mem), ls, lo, None, None, None, None
+
+        if op == OPCODES["PRINTA"]:
+            ls, lo = self.operand(quad.left)
+            return (_print_arg_const if ls is None else _print_arg_mem), ls, lo, None, None, None, None
+
+        if op == OPCODES["ERA"]:
+            tag = str(quad.res) if quad.res is not None else "call"
+            return _era, None, None, None, None, None, tag
+
+        if op == OPCODES["PARAM"]:
+            ls, lo = self.operand(quad.left)
+            ds, do = self.target(quad.res)
+            return (_param_const if ls is None else _param_mem), ls, lo, None, None, ds, do
+
+        if op == OPCODES["GOSUB"]:
+            return _gosub, None, None, None, index + 1, None, quad.res
+
+        if op == OPCODES["TAILCALL"]:
+            return _tailcall, None, None, None, None, None, quad.res
+
+        if op == OPCODES["RET"]:
+            return _return, None, None, None, None, None, "RET"
+
+        if op == OPCODES["ENDFUNC"]:
+            return _return, None, None, None, None, None, "ENDFUNC"
+
+        error = NotImplementedError(f"Opcode no soportado: {OPCODE_NAMES.get(op, op)}")
+        return _fail, None, error, None, None, None, None
+
+    def link(self, quadruples: List) -> List[tuple]:
+        linked = []
+        for index, quad in enumerate(quadruples):
+            try:
+                linked.append(self.link_quad(index, quad))
+            except LinkError as err:
+                linked.append((_fail, None, RuntimeError(str(err)), None, None, None, None))
+        return linked
+
+
+def link(quadruples: List, constants: Optional[Dict[int, object]] = None) -> List[tuple]:
+    return Linker(constants).link(quadruples)
@@ -1,85 +1,109 @@
+import argparse
+import os
 import sys
-from antlr4 import *
-from PatitoLexer import PatitoLexer
-from PatitoParser import PatitoParser
-from PatitoSemanticListener import PatitoSemanticListener
-from antlr4.error.ErrorListener import ErrorListener
-from semantics import SemanticError
 from virtual_machine import VirtualMachine
-from opcodes import OPCODES
+from compiler import (
+    DEFAULT_FRONTEND,
+    DEFAULT_OPT_LEVEL,
+    FRONTENDS,
+    OPT_LEVELS,
+    PatitoSyntaxError,
+    compile_file,
+)
+from semantics import SemanticError
+from compile_cache import CompileCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+import ptc
 
-class PatitoErrorListener(ErrorListener):
-    def __init__(self):
-        super().__init__()
-        self.errors = []
+def execute(program, engine="table", memory=None):
+    # Ejecución en Máquina Virtual
+    print("\n=== EJECUCIÓN EN MÁQUINA VIRTUAL ===")
+    try:
+        program.run(engine=engine, memory=memory)
+    except Exception as exc:
+        print(f"Fallo en ejecución de VM: {exc}")
 
-    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-        self.errors.append(f"[Sintaxis] línea {line}:{column} → {msg}")
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Compilador y Máquina Virtual de Patito",
+        usage="python main.py archivo_prueba.txt | --compile archivo.txt [-o archivo.ptc] | archivo.ptc",
+    )
+    parser.add_argument("archivo", help="fuente de Patito o programa compilado .ptc")
+    parser.add_argument("--compile", action="store_true",
+                        help="solo compilar y guardar el programa en formato .ptc")
+    parser.add_argument("-o", "--output", help="ruta del .ptc generado (por defecto archivo.ptc)")
+    parser.add_argument("--engine", default="table", choices=VirtualMachine.ENGINES,
+                        help="motor de ejecución de la VM")
+    parser.add_argument("--memory", choices=("dict", "flat"),
+                        help="motor de memoria de la VM")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR, metavar="DIR",
+                        help=f"reusar compilaciones previas del mismo fuente (por defecto {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES, metavar="BYTES",
+                        help="tamaño máximo de la caché antes de desalojar (LRU)")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="reportar aciertos/fallos de la caché de compilación")
+    parser.add_argument("-O", "--opt-level", type=int, default=DEFAULT_OPT_LEVEL, choices=OPT_LEVELS,
+                        help=f"nivel de optimización (por defecto {DEFAULT_OPT_LEVEL})")
+    parser.add_argument("--frontend", default=DEFAULT_FRONTEND, choices=FRONTENDS,
+                        help="listener o visitor (sobre el árbol de ANTLR), descent (una pasada "
+                             "sin árbol) o units (el árbol de una función a la vez)")
+    parser.add_argument("--fast-lexer", action="store_true",
+                        help="tokenizar con fast_lexer.FastLexer en lugar de PatitoLexer "
+                             "(frontends listener, visitor y units)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="no imprimir los cuádruplos generados")
+    return parser
 
 def main():
     if len(sys.argv) < 2:
         print("Uso requerido: python main.py archivo_prueba.txt")
         return
 
-    input_stream = FileStream(sys.argv[1], encoding='utf-8')
+    args = build_arg_parser().parse_args()
 
-    lexer = PatitoLexer(input_stream)
-    token_stream = CommonTokenStream(lexer)
-    parser = PatitoParser(token_stream)
-
-    # sintaxis: registrar errores personalizados
-    syn_err = PatitoErrorListener()
-    parser.removeErrorListeners()
-    parser.addErrorListener(syn_err)
-
-    tree = parser.program()
-
-    # mostrar errores de sintaxis antes de continuar
-    if syn_err.errors:
-        print("Errores de sintaxis:")
-        for e in syn_err.errors:
-            print("  ", e)
+    # Programa ya compilado: solo se paga la VM
+    with open(args.archivo, "rb") as fh:
+        compiled = ptc.is_ptc(fh.read(len(ptc.MAGIC)))
+    if compiled:
+        if args.compile:
+            print("El archivo ya está compilado")
+            return
+        try:
+            program = ptc.load(args.archivo)
+        except ptc.PtcFormatError as err:
+            print(f"Error al cargar {args.archivo}: {err}")
+            return
+        try:
+            program.run(engine=args.engine, memory=args.memory)
+        except Exception as exc:
+            print(f"Fallo en ejecución de VM: {exc}")
         return
 
-    # semántica
-    sem_listener = PatitoSemanticListener()
-    walker = ParseTreeWalker()
+    cache = CompileCache(args.cache, args.cache_size) if args.cache else None
+    program = None
     try:
-        walker.walk(sem_listener, tree)
-        print("\n Análisis sintáctico y semántico completado.")
+        program = compile_file(args.archivo, cache, args.opt_level, args.frontend, args.fast_lexer)
+    except PatitoSyntaxError as err:
+        print("Errores de sintaxis:")
+        for e in err.errors:
+            print("  ", e)
     except SemanticError as se:
         print("\n Error semántico:", se)
+    else:
+        print("\n Análisis sintáctico y semántico completado.")
+    if cache is not None and args.cache_stats:
+        print(f"\n Caché de compilación ({cache.directory}): {cache.stats}, {cache.size()} bytes")
+    if program is None:
         return
 
-    # Cuádruplos generados
-    print("\n=== CUADRUPLOS GENERADOS ===")
-    for i, q in enumerate(sem_listener.quadruples):
-        print(f"{i:03}  {q}")
-
-    # Cuádruplos amigables con nombres y opcodes
-    print("\n=== CUADRUPLOS (para efectos del DEBUGING) ===")
-    op_names = {v: k for k, v in OPCODES.items()}
-    symbols = sem_listener.build_symbol_table()
-
-    def pretty(addr):
-        if addr is None:
-            return None
-        return symbols.get(addr, addr)
-
-    for i, q in enumerate(sem_listener.quadruples):
-        op = op_names.get(q.op, q.op)
-        l = pretty(q.left)
-        r = pretty(q.right)
-        res = pretty(q.res)
-        print(f"{i:03}  ({op}, {l}, {r}, {res})")
+    if args.compile:
+        output = args.output or os.path.splitext(args.archivo)[0] + ".ptc"
+        ptc.dump(program, output)
+        print(f"\n Programa compilado en {output}")
+        return
 
-    # Ejecución en Máquina Virtual
-    print("\n=== EJECUCIÓN EN MÁQUINA VIRTUAL ===")
-    try:
-        vm = VirtualMachine(sem_listener.quadruples, sem_listener.constants)
-        vm.run()
-    except Exception as exc:
-        print(f"Fallo en ejecución de VM: {exc}")
+    if not args.quiet:
+        program.dump_quads()
+    execute(program, engine=args.engine, memory=args.memory)
 
 if __name__ == "__main__":
     main()
@@ -8,13 +8,24 @@ OPCODES = {
     "!=": 20,
     "==": 21,
     "%": 22,
+    # Solo lo genera el optimizador (x % 2^k -> x & (2^k - 1) con x int)
+    "&": 23,
     "=": 13,
     "GOTOF": 50,
     "GOTO": 51,
+    # GOTOF fusionado con la comparación (optimizer.merge_compare_branches)
+    "GOTOF>": 52,
+    "GOTOF<": 53,
+    "GOTOF!=": 54,
+    "GOTOF==": 55,
     "ERA": 70,
     "PARAM": 71,
     "GOSUB": 72,
     "RET": 73,
     "ENDFUNC": 74,
+    # Solo lo genera el optimizador: GOSUB en posición de cola, el marco
+    # nuevo reemplaza al actual y regresa a donde iba a regresar éste
+    "TAILCALL": 75,
     "PRINT": 60,
+    "PRINTA": 61,
 }
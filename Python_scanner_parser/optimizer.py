@@ -0,0 +1,1276 @@
+"""
+Optimizaciones sobre el programa ya generado (lista de cuádruplos).
+
+Se aplican después del listener, sobre un Program, así que sirven igual para
+cualquier frontend. Cada pasada recibe la lista de cuádruplos y la tabla de
+constantes y regresa la lista nueva; las que eliminan cuádruplos compactan la
+lista con cfg.relink, que renumera los destinos de los saltos, y optimize()
+actualiza el inicio de cada función en el directorio de funciones.
+
+Niveles (compiler.OPT_LEVELS):
+    0, 1 -> sin pasadas aquí (el nivel 1 solo pliega constantes en el listener)
+    2    -> funciones pequeñas expandidas en línea, llamadas de cola (a sí
+            misma como ciclo, a otra función con TAILCALL), saltos condicionales
+            sobre constantes, código inalcanzable,
+            funciones nunca llamadas, GOTO al siguiente cuádruplo, propagación
+            de constantes y de copias, subexpresiones comunes (numeración de valores),
+            escritura directa del resultado en la variable asignada,
+            cálculos invariantes de los ciclos movidos antes del ciclo
+            y mirilla (peephole) de saltos: cadenas GOTO -> GOTO y
+            comparación + GOTOF fusionados en un solo salto condicional
+    3    -> además, reducción de fuerza de variables de inducción y
+            simplificación algebraica (x * 1, x * 2 -> x + x, x % 2^k -> x & m)
+
+Los temporales del listener se leen en la misma sentencia que los escribe,
+pero la misma dirección se reutiliza en la sentencia siguiente (listas libres
+de TempManager); las pasadas que los eliminan usan cfg.live_temps para saber
+si el valor de un temporal se vuelve a leer. Al inicio, split_temps da una
+dirección propia a cada definición (así un resultado no se pierde porque la
+siguiente sentencia reutilizó su temporal) y al final allocate_temps vuelve
+a compactarlos por función.
+"""
+import itertools
+from typing import Dict, List, Optional, Set
+
+from cfg import (
+    ASSIGN,
+    BINARY_OPS,
+    BRANCH_COMPARE,
+    CALL_OPS,
+    ENDFUNC,
+    ERA,
+    GOSUB,
+    GOTO,
+    GOTOF,
+    JUMP_OPS,
+    PARAM,
+    RET,
+    TAILCALL,
+    TARGET_OPS,
+    BlockGraph,
+    Loop,
+    block_ids,
+    defs,
+    dominators,
+    frame_extents,
+    function_params,
+    function_ranges,
+    is_global,
+    is_int,
+    is_local,
+    is_temp,
+    live_addresses,
+    live_temps,
+    natural_loops,
+    reachable,
+    relink,
+    uses,
+)
+from folding import NOT_FOLDABLE, fold_binary
+from opcodes import OPCODES
+from program import Program
+from quads import Quadruple
+from virtual_memory import SEGMENT_LAYOUT, SEGMENT_SIZE
+
+
+def fold_branches(quads: List, constants: Dict[int, object]) -> List:
+    """
+    GOTOF sobre una constante: si es falsa se vuelve GOTO, si es verdadera se
+    elimina (el flujo siempre continúa). El listener genera estos saltos
+    cuando la condición de un if/while se plegó a constante; los saltos
+    fusionados (GOTOF<, ...) quedan entre dos constantes cuando -O3 simplifica
+    o propaga sus operandos.
+    """
+    keep = set(range(len(quads)))
+    folded = []
+    for index, q in enumerate(quads):
+        condition = NOT_FOLDABLE
+        if q.op == GOTOF and q.left in constants:
+            condition = constants[q.left]
+        elif q.op in BRANCH_COMPARE and q.left in constants and q.right in constants:
+            condition = fold_binary(BRANCH_COMPARE[q.op], constants[q.left], constants[q.right])
+        if condition is not NOT_FOLDABLE:
+            if condition:
+                keep.discard(index)
+                folded.append(q)
+                continue
+            q = Quadruple(GOTO, None, None, q.res)
+        folded.append(q)
+    if len(keep) == len(quads):
+        return folded
+    return relink(folded, keep)[0]
+
+
+def remove_unreachable(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Elimina cuádruplos que nunca se ejecutan: código después de un RET o de
+    un GOTO dentro de un bloque y funciones que no se llaman desde el main
+    (directa o indirectamente).
+    """
+    keep = reachable(quads)
+    if len(keep) == len(quads):
+        return quads
+    return relink(quads, keep)[0]
+
+
+def remove_jumps_to_next(quads: List, constants: Dict[int, object]) -> List:
+    # GOTO al cuádruplo siguiente (p. ej. el salto sobre un else vacío)
+    keep = {
+        index for index, q in enumerate(quads) if not (q.op == GOTO and q.res == index + 1)
+    }
+    while len(keep) < len(quads):
+        quads = relink(quads, keep)[0]
+        keep = {
+            index for index, q in enumerate(quads) if not (q.op == GOTO and q.res == index + 1)
+        }
+    return quads
+
+
+# ------------------------------------------------------------
+# Mirilla (peephole) de saltos
+# ------------------------------------------------------------
+# comparación -> salto condicional fusionado
+BRANCH_OPCODES = {compare: branch for branch, compare in BRANCH_COMPARE.items()}
+
+
+def thread_jumps(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Un salto cuyo destino es un GOTO salta directo al destino final de la
+    cadena (p. ej. el GOTO al final de un if-else anidado dentro de otro).
+    """
+    threaded = []
+    for q in quads:
+        if q.op in JUMP_OPS and isinstance(q.res, int):
+            target = q.res
+            seen = set()
+            while target < len(quads) and quads[target].op == GOTO and target not in seen:
+                seen.add(target)
+                target = quads[target].res
+            q = Quadruple(q.op, q.left, q.right, target)
+        threaded.append(q)
+    return threaded
+
+
+def merge_compare_branches(quads: List, constants: Dict[int, object]) -> List:
+    """
+    (<, a, b, t) (GOTOF, t, _, L) -> (GOTOF<, a, b, L) cuando t ya no se lee
+    después del GOTOF. Un cuádruplo menos por cada if/while con comparación.
+    """
+    quads = list(quads)
+    blocks = block_ids(quads)
+    live = live_temps(quads)
+    removed: Set[int] = set()
+    for j in range(1, len(quads)):
+        q = quads[j]
+        compare = quads[j - 1]
+        if q.op != GOTOF or compare.op not in BRANCH_OPCODES or compare.res != q.left:
+            continue
+        # Un salto directo al GOTOF leería otra definición de t
+        temp = q.left
+        if not is_temp(temp) or temp in live[j] or blocks[j] != blocks[j - 1]:
+            continue
+        quads[j] = Quadruple(BRANCH_OPCODES[compare.op], compare.left, compare.right, q.res)
+        removed.add(j - 1)
+
+    if not removed:
+        return quads
+    # Un salto al cuádruplo de la comparación queda en el salto fusionado
+    return relink(quads, set(range(len(quads))) - removed)[0]
+
+
+# ------------------------------------------------------------
+# Copias y temporales
+# ------------------------------------------------------------
+def _function_of(quads: List) -> List[int]:
+    # índice de cuádruplo -> número de función (rango de cfg.function_ranges)
+    owner = [0] * len(quads)
+    for number, frange in enumerate(function_ranges(quads)):
+        for index in range(frange.start, frange.end):
+            owner[index] = number
+    return owner
+
+
+def _rename(q, mapping: Dict[int, int], writes: bool = True) -> Quadruple:
+    # Renombra las direcciones que lee q (incluye el operando de RET) y, con
+    # writes, la que escribe; el destino de PARAM es del marco llamado
+    def name(addr, renamed):
+        return mapping.get(addr, addr) if renamed and isinstance(addr, int) else addr
+
+    reads = uses(q)
+    left = name(q.left, q.left in reads or q.op == RET)
+    right = name(q.right, q.right in reads)
+    res = name(q.res, writes and q.res in defs(q))
+    return Quadruple(q.op, left, right, res)
+
+
+def split_temps(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Cada definición de un temporal pasa a una dirección nueva (dentro de su
+    función), junto con las lecturas que alcanza en el mismo bloque. Un valor
+    que sigue vivo al salir del bloque conserva su dirección, igual que
+    cuando el segmento ya no tiene lugar.
+    """
+    quads = list(quads)
+    graph = BlockGraph(quads)
+    live = live_temps(quads)
+    owner = _function_of(quads)
+
+    # función -> segmento -> siguiente offset libre
+    free: Dict[int, Dict[int, int]] = {}
+    for index, q in enumerate(quads):
+        for addr in uses(q) + defs(q):
+            if is_temp(addr):
+                segs = free.setdefault(owner[index], {})
+                seg = addr // SEGMENT_SIZE
+                segs[seg] = max(segs.get(seg, 0), addr % SEGMENT_SIZE + 1)
+
+    for start, end in graph.ranges:
+        mapping: Dict[int, int] = {}
+        for index in range(start, end):
+            q = _rename(quads[index], mapping, writes=False)
+            for temp in defs(q):
+                if not is_temp(temp):
+                    continue
+                mapping.pop(temp, None)
+                segs = free[owner[index]]
+                seg = temp // SEGMENT_SIZE
+                if segs[seg] >= SEGMENT_SIZE:
+                    continue
+                redefined = any(temp in defs(quads[k]) for k in range(index + 1, end))
+                if redefined or temp not in live[end - 1]:
+                    mapping[temp] = seg * SEGMENT_SIZE + segs[seg]
+                    segs[seg] += 1
+                    q = Quadruple(q.op, q.left, q.right, mapping[temp])
+            quads[index] = q
+    return quads
+
+
+def allocate_temps(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Reasigna los temporales de cada función por barrido lineal: dos
+    temporales comparten dirección si sus intervalos de vida no se tocan,
+    así que el marco vuelve a necesitar pocas casillas temporales.
+    """
+    quads = list(quads)
+    live = live_temps(quads)
+    for frange in function_ranges(quads):
+        # temporal -> [primer punto, último punto]; el punto 2i es antes de
+        # ejecutar i (lecturas) y 2i + 1 después (escritura, vivo a la salida)
+        spans: Dict[int, List[int]] = {}
+
+        def touch(addr, point):
+            span = spans.setdefault(addr, [point, point])
+            span[0] = min(span[0], point)
+            span[1] = max(span[1], point)
+
+        for index in range(frange.start, frange.end):
+            q = quads[index]
+            for addr in uses(q) + ([q.left] if q.op == RET else []):
+                if is_temp(addr):
+                    touch(addr, 2 * index)
+            for addr in defs(q) + list(live[index]):
+                if is_temp(addr):
+                    touch(addr, 2 * index + 1)
+
+        # por segmento: intervalos activos (fin, dirección), direcciones
+        # libres y cuántas se han usado
+        active: Dict[int, List] = {}
+        released: Dict[int, List[int]] = {}
+        used: Dict[int, int] = {}
+        mapping: Dict[int, int] = {}
+        for addr, (first, last) in sorted(spans.items(), key=lambda item: (item[1][0], item[0])):
+            seg = addr // SEGMENT_SIZE
+            still = []
+            for end, slot in active.get(seg, []):
+                if end < first:
+                    released.setdefault(seg, []).append(slot)
+                else:
+                    still.append((end, slot))
+            pool = released.get(seg)
+            if pool:
+                slot = min(pool)
+                pool.remove(slot)
+            else:
+                slot = seg * SEGMENT_SIZE + used.get(seg, 0)
+                used[seg] = used.get(seg, 0) + 1
+            active[seg] = still + [(last, slot)]
+            mapping[addr] = slot
+
+        for index in range(frange.start, frange.end):
+            quads[index] = _rename(quads[index], mapping)
+    return quads
+
+
+def _replace_use(q, old: int, new) -> Quadruple:
+    # Cambia las lecturas de `old` por `new` (incluye el operando de RET)
+    left = new if q.left == old and (old in uses(q) or q.op == RET) else q.left
+    right = new if q.right == old and old in uses(q) and q.op in BINARY_OPS else q.right
+    return Quadruple(q.op, left, right, q.res)
+
+
+def _clobbers(q, addr) -> bool:
+    # ¿q escribe addr? Una llamada puede escribir cualquier global
+    return addr in defs(q) or (q.op in CALL_OPS and is_global(addr))
+
+
+def propagate_copies(quads: List, constants: Dict[int, object]) -> List:
+    """
+    (=, s, _, t) con t temporal: las lecturas de t que siguen en el mismo
+    bloque leen s directamente mientras ni s ni t se vuelvan a escribir. Si t
+    se queda sin lecturas, remove_dead_temps elimina la copia.
+    Caso típico: (=, ret_f, _, t) tras un GOSUB seguido de (+, t, 1, t2).
+    """
+    quads = list(quads)
+    blocks = block_ids(quads)
+    for index, q in enumerate(quads):
+        if q.op != ASSIGN or not is_temp(q.res):
+            continue
+        source, temp = q.left, q.res
+        for k in range(index + 1, len(quads)):
+            if blocks[k] != blocks[index]:
+                break
+            quads[k] = _replace_use(quads[k], temp, source)
+            if _clobbers(quads[k], source) or temp in defs(quads[k]):
+                break
+    return quads
+
+
+def forward_results(quads: List, constants: Dict[int, object]) -> List:
+    """
+    (op, a, b, t) ... (=, t, _, x) -> (op, a, b, x) cuando t ya no se lee
+    después de la copia, la copia es la única lectura de esa definición y
+    entre ambos nada lee ni escribe x. Cubre `x = a + b`, `x = f(...)` y
+    `return(expr)` (el RET pasa a nombrar x).
+    """
+    while True:
+        quads = list(quads)
+        blocks = block_ids(quads)
+        live = live_temps(quads)
+        removed: Set[int] = set()
+        for j, q in enumerate(quads):
+            if q.op != ASSIGN or not is_temp(q.left) or q.left in live[j]:
+                continue
+            temp, target = q.left, q.res
+            # definición de t que llega a la copia dentro del bloque
+            i = j - 1
+            while i >= 0 and blocks[i] == blocks[j] and (i in removed or temp not in defs(quads[i])):
+                i -= 1
+            if i < 0 or blocks[i] != blocks[j]:
+                continue
+            producer = quads[i]
+            if producer.op not in BINARY_OPS and producer.op != ASSIGN:
+                continue
+            between = [quads[k] for k in range(i + 1, j) if k not in removed]
+            if any(temp in uses(b) or target in uses(b) or _clobbers(b, target) for b in between):
+                continue
+
+            quads[i] = Quadruple(producer.op, producer.left, producer.right, target)
+            removed.add(j)
+            for k in range(j + 1, len(quads)):
+                if blocks[k] != blocks[j] or temp in defs(quads[k]):
+                    break
+                if quads[k].op == RET and quads[k].left == temp:
+                    quads[k] = _replace_use(quads[k], temp, target)
+
+        if not removed:
+            return quads
+        quads = relink(quads, set(range(len(quads))) - removed)[0]
+
+
+# ------------------------------------------------------------
+# Subexpresiones comunes
+# ------------------------------------------------------------
+_COMMUTATIVE = {OPCODES[sym] for sym in ("+", "*", "!=", "==")}
+
+
+class _Values:
+    """
+    Numeración de valores en un punto del programa: número de valor de cada
+    dirección, número de valor de cada expresión (op, vn izq, vn der) y las
+    direcciones que lo contienen. Una dirección que se vuelve a escribir
+    cambia de número, así que las expresiones viejas ya no coinciden.
+    """
+
+    def __init__(self, numbers):
+        self.numbers = numbers
+        self.vn: Dict[int, int] = {}
+        self.exprs: Dict[tuple, int] = {}
+        self.holders: Dict[int, List[int]] = {}
+
+    def copy(self) -> "_Values":
+        values = _Values(self.numbers)
+        values.vn = dict(self.vn)
+        values.exprs = dict(self.exprs)
+        values.holders = {value: list(addrs) for value, addrs in self.holders.items()}
+        return values
+
+    def number(self, addr) -> int:
+        # Un valor que no se conoce (parámetro, variable de otro bloque) es nuevo
+        if addr not in self.vn:
+            self.assign(addr, next(self.numbers))
+        return self.vn[addr]
+
+    def assign(self, addr, value: int):
+        self.vn[addr] = value
+        self.holders.setdefault(value, []).append(addr)
+
+    def holder(self, value: int) -> Optional[int]:
+        for addr in self.holders.get(value, []):
+            if self.vn.get(addr) == value:
+                return addr
+        return None
+
+    def forget(self, addrs):
+        for addr in addrs:
+            self.vn.pop(addr, None)
+
+
+def _number_block(quads: List, start: int, end: int, values: _Values):
+    # Numeración local: una operación ya calculada se vuelve copia de la
+    # dirección que todavía tiene el resultado
+    for k in range(start, end):
+        q = quads[k]
+        if q.op in CALL_OPS:
+            values.forget([addr for addr in values.vn if is_global(addr)])
+        elif q.op == ASSIGN:
+            values.assign(q.res, values.number(q.left))
+        elif q.op in BINARY_OPS:
+            left, right = values.number(q.left), values.number(q.right)
+            if q.op in _COMMUTATIVE and right < left:
+                left, right = right, left
+            key = (q.op, left, right)
+            value = values.exprs.get(key)
+            if value is None:
+                value = values.exprs[key] = next(values.numbers)
+            else:
+                holder = values.holder(value)
+                if holder is not None:
+                    quads[k] = Quadruple(ASSIGN, holder, None, q.res)
+            values.assign(q.res, value)
+
+
+def _written_between(graph: BlockGraph, quads: List, idom: int, block: int):
+    """
+    Direcciones que se escriben en algún camino idom -> block (sin contar
+    idom) y si en esos caminos hay una llamada.
+    """
+    def walk(start, edges):
+        seen = set()
+        work = [b for b in start if b != idom]
+        while work:
+            b = work.pop()
+            if b not in seen:
+                seen.add(b)
+                work.extend(n for n in edges[b] if n != idom)
+        return seen
+
+    between = walk(graph.succ[idom], graph.succ) & walk(graph.pred[block], graph.pred)
+    written: Set[int] = set()
+    calls = False
+    for b in between:
+        start, end = graph.ranges[b]
+        for q in quads[start:end]:
+            written.update(defs(q))
+            calls = calls or q.op in CALL_OPS
+    return written, calls
+
+
+def _by_depth(idom: List[Optional[int]]) -> List[int]:
+    # Bloques ordenados por profundidad en el árbol de dominadores: cada uno
+    # después de su dominador inmediato
+    depth: List[int] = []
+    for block in range(len(idom)):
+        d, b = 0, block
+        while idom[b] is not None:
+            d, b = d + 1, idom[b]
+        depth.append(d)
+    return sorted(range(len(idom)), key=lambda b: depth[b])
+
+
+def number_values(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Elimina subexpresiones comunes: (op, a, b, t2) cuando a op b ya se calculó
+    en t1 y desde entonces no cambiaron a, b ni t1 se vuelve (=, t1, _, t2),
+    que propagate_copies y remove_dead_temps terminan de quitar.
+
+    Dentro de un bloque es numeración de valores local; cada bloque parte de
+    lo que se conoce al final de su dominador inmediato, quitando lo que se
+    escribe en los caminos entre ambos (p. ej. el cuerpo de un ciclo para su
+    condición), así que también reutiliza valores de bloques anteriores.
+    """
+    quads = list(quads)
+    graph = BlockGraph(quads)
+    idom = dominators(quads, graph)
+    numbers = itertools.count()
+
+    at_end: Dict[int, _Values] = {}
+    for block in _by_depth(idom):
+        parent = idom[block]
+        if parent is None:
+            values = _Values(numbers)
+        else:
+            values = at_end[parent].copy()
+            written, calls = _written_between(graph, quads, parent, block)
+            if calls:
+                written |= {addr for addr in values.vn if is_global(addr)}
+            values.forget(written)
+        start, end = graph.ranges[block]
+        _number_block(quads, start, end, values)
+        at_end[block] = values
+    return quads
+
+
+# ------------------------------------------------------------
+# Propagación de constantes
+# ------------------------------------------------------------
+def _propagate_block(quads: List, start: int, end: int, known: Dict[int, int], constants: Dict[int, object]):
+    # known: dirección -> constante que contiene en este punto
+    for k in range(start, end):
+        q = quads[k]
+        for addr in uses(q):
+            if addr in known:
+                q = _replace_use(q, addr, known[addr])
+        if q.op in BINARY_OPS and q.left in constants and q.right in constants:
+            value = fold_binary(q.op, constants[q.left], constants[q.right])
+            addr = None if value is NOT_FOLDABLE else _constant(constants, value)
+            if addr is not None:
+                q = Quadruple(ASSIGN, addr, None, q.res)
+        quads[k] = q
+        if q.op in CALL_OPS:
+            for addr in [addr for addr in known if is_global(addr)]:
+                del known[addr]
+        for addr in defs(q):
+            known.pop(addr, None)
+        if q.op == ASSIGN and q.left in constants:
+            known[q.res] = q.left
+
+
+def propagate_constants(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Una variable o temporal que contiene una constante se lee como esa
+    constante, y una operación cuyos dos operandos quedan constantes se
+    evalúa aquí (folding.fold_binary, igual que el listener en -O1):
+        (=, 5, _, x) (+, x, 1, y) (*, y, 2, t) -> (=, 5, _, x) (=, 6, _, y) (=, 12, _, t)
+    Las condiciones que quedan constantes las quita fold_branches.
+
+    Como number_values, cada bloque parte de lo que se conoce al final de su
+    dominador inmediato menos lo que se escribe en los caminos entre ambos;
+    una llamada puede cambiar cualquier global. El valor plegado es el que
+    se calcularía en ejecución, así que su constante va en el segmento de su
+    tipo de Python (un float puede guardar un int).
+    """
+    quads = list(quads)
+    graph = BlockGraph(quads)
+    idom = dominators(quads, graph)
+
+    at_end: Dict[int, Dict[int, int]] = {}
+    for block in _by_depth(idom):
+        parent = idom[block]
+        if parent is None:
+            known: Dict[int, int] = {}
+        else:
+            known = dict(at_end[parent])
+            written, calls = _written_between(graph, quads, parent, block)
+            for addr in list(known):
+                if addr in written or (calls and is_global(addr)):
+                    del known[addr]
+        start, end = graph.ranges[block]
+        _propagate_block(quads, start, end, known, constants)
+        at_end[block] = known
+    return quads
+
+
+# Operaciones que pueden fallar en ejecución: no se eliminan aunque su
+# resultado no se use, para conservar el error (salvo con divisor constante
+# distinto de cero)
+_TRAPPING_OPS = {OPCODES["/"], OPCODES["%"]}
+
+
+def _may_trap(q, constants: Dict[int, object]) -> bool:
+    return q.op in _TRAPPING_OPS and not (q.right in constants and constants[q.right] != 0)
+
+
+def remove_dead_temps(quads: List, constants: Dict[int, object]) -> List:
+    # Definiciones de temporales cuyo valor ya no se lee
+    while True:
+        live = live_temps(quads)
+        keep = {
+            index
+            for index, q in enumerate(quads)
+            if not (
+                (q.op == ASSIGN or q.op in BINARY_OPS)
+                and not _may_trap(q, constants)
+                and is_temp(q.res)
+                and q.res not in live[index]
+            )
+        }
+        if len(keep) == len(quads):
+            return quads
+        quads = relink(quads, keep)[0]
+
+
+# ------------------------------------------------------------
+# Código invariante de ciclos
+# ------------------------------------------------------------
+def _invariants(quads: List, loop: Loop, constants: Dict[int, object]) -> List[int]:
+    """
+    Índices de los cuádruplos del ciclo que calculan siempre lo mismo: sus
+    operandos son constantes, no se escriben dentro del ciclo o vienen de
+    otro invariante. Solo se mueven operaciones que no fallan y que escriben
+    un temporal definido una sola vez en el ciclo y que no llega vivo a la
+    cabecera (ningún uso ve un valor de otra vuelta o de antes del ciclo).
+    """
+    written: Dict[int, int] = {}
+    calls = False
+    for index in loop.indices:
+        for addr in defs(quads[index]):
+            written[addr] = written.get(addr, 0) + 1
+        calls = calls or quads[index].op in CALL_OPS
+
+    head = quads[loop.header]
+    live = live_temps(quads)
+    live_at_header = (live[loop.header] - set(defs(head))) | {a for a in uses(head) if is_temp(a)}
+
+    hoisted: List[int] = []
+    moved: Set[int] = set()
+
+    def invariant(addr) -> bool:
+        if addr in constants:
+            return True
+        if calls and is_global(addr):
+            return False
+        return addr not in written or addr in moved
+
+    changed = True
+    while changed:
+        changed = False
+        for index in sorted(loop.indices):
+            q = quads[index]
+            if index in hoisted or not (q.op in BINARY_OPS or q.op == ASSIGN):
+                continue
+            if _may_trap(q, constants) or not is_temp(q.res):
+                continue
+            if written[q.res] != 1 or q.res in live_at_header:
+                continue
+            if all(invariant(addr) for addr in uses(q)):
+                hoisted.append(index)
+                moved.add(q.res)
+                changed = True
+    return hoisted
+
+
+def _move_to_preheader(quads: List, loop: Loop, hoisted: List[int]) -> List:
+    # Quita los cuádruplos de su lugar y los pone, en el orden en que se
+    # marcaron, justo antes de la cabecera. Lo que entra al ciclo desde
+    # fuera llega a ellos; los saltos de regreso siguen yendo a la cabecera
+    moved = [quads[index] for index in hoisted]
+    quads, remap = relink(quads, set(range(len(quads))) - set(hoisted))
+    header = remap[loop.header]
+    inside = {remap[index] for index in loop.indices if index not in hoisted}
+    return _insert(quads, header, moved, set(range(len(quads))) - inside)
+
+
+def _insert(quads: List, at: int, new: List, entering: Set[int]) -> List:
+    """
+    Inserta `new` antes de quads[at] y renumera los destinos. Los saltos a
+    `at` desde los índices de `entering` llegan a lo insertado; los demás
+    siguen yendo al cuádruplo original. Las llamadas (GOSUB, TAILCALL)
+    siempre llegan a lo insertado, aunque vengan de dentro del ciclo: cuando
+    la cabecera es el inicio de una función, la llamada recursiva empieza un
+    marco nuevo que no tiene nada de lo que calculó el preencabezado.
+    """
+    shifted = []
+    for index, q in enumerate(quads):
+        if index == at:
+            shifted.extend(new)
+        res = q.res
+        if q.op in TARGET_OPS and isinstance(res, int):
+            if res > at or (res == at and index not in entering and q.op not in CALL_OPS):
+                res += len(new)
+        shifted.append(Quadruple(q.op, q.left, q.right, res))
+    return shifted
+
+
+def hoist_invariants(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Movimiento de código invariante: en cada ciclo natural (cfg.natural_loops),
+    los cálculos que dan lo mismo en todas las vueltas (p. ej. `limite * 2`
+    dentro de un while) se hacen una vez en un preencabezado antes de la
+    condición. Se procesan primero los ciclos internos; lo que se sacó de
+    uno puede volver a salir del ciclo que lo contiene.
+    """
+    changed = True
+    while changed:
+        changed = False
+        for loop in natural_loops(quads):
+            hoisted = _invariants(quads, loop, constants)
+            if hoisted:
+                quads = _move_to_preheader(quads, loop, hoisted)
+                changed = True
+                break
+    return quads
+
+
+# ------------------------------------------------------------
+# Reducción de fuerza y simplificación algebraica (nivel 3)
+# ------------------------------------------------------------
+# Los tipos son los que fijó el cubo semántico (SemanticCube.check_op) al
+# escoger el segmento de cada dirección: en uno *_int solo hay int. Las
+# reglas usan solo constantes int para conservar exactamente el valor y el
+# tipo del resultado (x * 1.0 es float aunque x sea int, y x + 0 convierte
+# -0.0 en 0.0, por eso esa regla pide x int).
+ADD, SUB, MUL, MOD, AND = (OPCODES[sym] for sym in ("+", "-", "*", "%", "&"))
+
+
+def _int_value(constants: Dict[int, object], addr) -> Optional[int]:
+    return constants[addr] if is_int(addr) and addr in constants else None
+
+
+# Segmento de constantes según el tipo de Python del valor
+_CONST_SEGMENTS = {bool: "const_bool", int: "const_int", float: "const_float", str: "const_string"}
+
+
+def _constant(constants: Dict[int, object], value) -> Optional[int]:
+    # Dirección de la constante `value`; si no existe se agrega a la tabla
+    # (None si el segmento ya está lleno)
+    start, size = SEGMENT_LAYOUT[_CONST_SEGMENTS[type(value)]]
+    last = start - 1
+    for addr, existing in constants.items():
+        if start <= addr < start + size:
+            if existing == value and type(existing) is type(value):
+                return addr
+            last = max(last, addr)
+    if last + 1 >= start + size:
+        return None
+    constants[last + 1] = value
+    return last + 1
+
+
+def _simplify(q, constants: Dict[int, object], negated: Dict[int, int]) -> Quadruple:
+    left, right, res = q.left, q.right, q.res
+    lv, rv = _int_value(constants, left), _int_value(constants, right)
+    if q.op == MUL:
+        for x, k, k_addr in ((left, rv, right), (right, lv, left)):
+            if k == 1:
+                return Quadruple(ASSIGN, x, None, res)
+            if k == 2:
+                return Quadruple(ADD, x, x, res)
+            if k == 0 and is_int(x):
+                return Quadruple(ASSIGN, k_addr, None, res)
+    elif q.op == ADD:
+        for x, k, other in ((left, rv, right), (right, lv, left)):
+            if k == 0 and is_int(x):
+                return Quadruple(ASSIGN, x, None, res)
+            if other in negated and is_int(x):
+                return Quadruple(SUB, x, negated[other], res)
+    elif q.op == SUB:
+        if rv == 0:
+            return Quadruple(ASSIGN, left, None, res)
+        if right in negated:
+            if lv == 0:
+                return Quadruple(ASSIGN, negated[right], None, res)
+            if is_int(left):
+                return Quadruple(ADD, left, negated[right], res)
+    elif q.op == MOD and is_int(left) and rv is not None and rv > 0 and rv & (rv - 1) == 0:
+        mask = _constant(constants, rv - 1)
+        if mask is not None:
+            return Quadruple(AND, left, mask, res)
+    return q
+
+
+def simplify_algebra(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Identidades y operaciones más baratas con el mismo resultado:
+        x * 1, x - 0, x + 0 (x int)           -> (=, x, _, d)
+        x * 0 (x int)                          -> (=, 0, _, d)
+        x * 2                                  -> (+, x, x, d)
+        x % 2^k (x int)                        -> (&, x, 2^k - 1, d)
+        0 - (0 - x)                            -> (=, x, _, d)
+        a + (0 - x), a - (0 - x) (a y x int)   -> (-, a, x, d), (+, a, x, d)
+    Las copias que quedan como (=, x, _, x) se eliminan. Las negaciones (0 - x, el menos unario) se siguen dentro del bloque
+    mientras no se escriba ni el temporal ni x. Para x int y 2^k > 0,
+    x % 2^k == x & (2^k - 1) también con x negativo (así es en Python).
+    """
+    quads = list(quads)
+    blocks = block_ids(quads)
+    # temporal -> x, para (-, 0, x, temporal) con x int
+    negated: Dict[int, int] = {}
+    for index, q in enumerate(quads):
+        if index and blocks[index] != blocks[index - 1]:
+            negated = {}
+        if q.op in BINARY_OPS:
+            q = quads[index] = _simplify(q, constants, negated)
+        negated = {
+            temp: x for temp, x in negated.items() if not (_clobbers(q, temp) or _clobbers(q, x))
+        }
+        if (
+            q.op == SUB
+            and _int_value(constants, q.left) == 0
+            and is_int(q.right)
+            and is_temp(q.res)
+            and q.res != q.right
+        ):
+            negated[q.res] = q.right
+
+    keep = {index for index, q in enumerate(quads) if not (q.op == ASSIGN and q.left == q.res)}
+    if len(keep) == len(quads):
+        return quads
+    return relink(quads, keep)[0]
+
+
+def _fresh_temp(quads: List, segment: str = "temp_int") -> Optional[int]:
+    # Un temporal de `segment` que no usa nadie; allocate_temps lo compacta
+    # después
+    start, size = SEGMENT_LAYOUT[segment]
+    used = [
+        addr
+        for q in quads
+        for addr in (q.left, q.right, q.res)
+        if isinstance(addr, int) and start <= addr < start + size
+    ]
+    addr = max(used, default=start - 1) + 1
+    return addr if addr < start + size else None
+
+
+def _reduce_one(quads: List, constants: Dict[int, object]) -> Optional[List]:
+    for loop in natural_loops(quads):
+        written: Dict[int, int] = {}
+        calls = False
+        for index in loop.indices:
+            for addr in defs(quads[index]):
+                written[addr] = written.get(addr, 0) + 1
+            calls = calls or quads[index].op in CALL_OPS
+
+        # variable de inducción -> (índice de su actualización, paso)
+        steps: Dict[int, tuple] = {}
+        for index in loop.indices:
+            q = quads[index]
+            if q.op not in (ADD, SUB) or not is_int(q.res) or written[q.res] != 1:
+                continue
+            if calls and is_global(q.res):
+                continue
+            if q.left == q.res and _int_value(constants, q.right) is not None:
+                step = _int_value(constants, q.right)
+                steps[q.res] = (index, step if q.op == ADD else -step)
+            elif q.op == ADD and q.right == q.res and _int_value(constants, q.left) is not None:
+                steps[q.res] = (index, _int_value(constants, q.left))
+
+        for index in sorted(loop.indices):
+            q = quads[index]
+            if q.op != MUL:
+                continue
+            for var, k_addr in ((q.left, q.right), (q.right, q.left)):
+                k = _int_value(constants, k_addr)
+                if var not in steps or k in (None, 0, 1):
+                    continue
+                update, step = steps[var]
+                temp = _fresh_temp(quads)
+                increment = _constant(constants, step * k)
+                if temp is None or increment is None:
+                    continue
+
+                # t = i * k se vuelve t = j; j += paso * k después de i += paso
+                quads = list(quads)
+                quads[index] = Quadruple(ASSIGN, temp, None, q.res)
+                quads = _insert(quads, update + 1, [Quadruple(ADD, temp, increment, temp)], set())
+                inside = {i + (i > update) for i in loop.indices} | {update + 1}
+                header = loop.header + (loop.header > update)
+                outside = set(range(len(quads))) - inside
+                return _insert(quads, header, [Quadruple(MUL, var, k_addr, temp)], outside)
+    return None
+
+
+def reduce_induction_variables(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Reducción de fuerza en ciclos: si la única escritura de i dentro del
+    ciclo es (+, i, c, i) (o (-, i, c, i)) con i y c int, cada (*, i, k, t)
+    con k constante int lee un temporal j = i * k que se calcula una vez en
+    el preencabezado y al que se le suma c * k justo después de actualizar i:
+    una suma por vuelta en lugar de una multiplicación.
+    """
+    while True:
+        reduced = _reduce_one(quads, constants)
+        if reduced is None:
+            return quads
+        quads = reduced
+
+
+# ------------------------------------------------------------
+# Expansión en línea
+# ------------------------------------------------------------
+# Cuádruplos (sin contar ENDFUNC) de la función más grande que se expande
+INLINE_LIMIT = 12
+
+# Segmentos del marco de activación (locales y temporales)
+_FRAME_SEGMENTS = {
+    start // SEGMENT_SIZE
+    for name, (start, _) in SEGMENT_LAYOUT.items()
+    if name.startswith(("loc_", "temp_"))
+}
+
+
+def _recursive(quads: List, ranges) -> Set[str]:
+    # Funciones que se llaman a sí mismas, directa o indirectamente
+    calls = {
+        frange.name: {q.left for q in quads[frange.start:frange.end] if q.op in CALL_OPS}
+        for frange in ranges
+    }
+    recursive = set()
+    for name, callees in calls.items():
+        seen: Set[str] = set()
+        work = list(callees)
+        while work:
+            callee = work.pop()
+            if callee == name:
+                recursive.add(name)
+                break
+            if callee not in seen:
+                seen.add(callee)
+                work.extend(calls.get(callee, ()))
+    return recursive
+
+
+def _frame_slots(quads: List, callee, params: List[int], mapping: Dict[int, int], extents) -> bool:
+    # Completa `mapping` (dirección en el marco de la función -> casilla
+    # nueva en el marco del llamador); False si algún segmento se llena
+    addrs = set(params)
+    for q in quads[callee.start:callee.end]:
+        addrs.update(uses(q) + defs(q) + ([q.left] if q.op == RET else []))
+    for addr in sorted(a for a in addrs if is_local(a) or is_temp(a)):
+        if addr in mapping:
+            continue
+        seg = addr // SEGMENT_SIZE
+        offset = extents.get(seg, 0)
+        if offset >= SEGMENT_SIZE:
+            return False
+        mapping[addr] = seg * SEGMENT_SIZE + offset
+        extents[seg] = offset + 1
+    return True
+
+
+def _call_start(quads: List, g: int, start: int) -> Optional[int]:
+    # Índice del ERA de la llamada que termina en el GOSUB quads[g] (entre
+    # ellos solo hay PARAM); None si no está en la misma función
+    e = g - 1
+    while e >= start and quads[e].op == PARAM:
+        e -= 1
+    if e < start or quads[e].op != ERA or quads[e].res != quads[g].left:
+        return None
+    return e
+
+
+def _live_at_entry(quads: List, start: int, live_locals: List[Set[int]]) -> Set[int]:
+    # Locales que la función que empieza en `start` lee antes de escribirlos
+    head = quads[start]
+    return (live_locals[start] - set(defs(head))) | {a for a in uses(head) if is_local(a)}
+
+
+def _inline_one(quads: List, slots: Dict[tuple, Dict[int, int]]) -> Optional[List]:
+    ranges = function_ranges(quads)
+    by_name = {frange.name: frange for frange in ranges}
+    recursive = _recursive(quads, ranges)
+    params = function_params(quads)
+    extents = frame_extents(quads, _FRAME_SEGMENTS)
+    live_locals = live_addresses(quads, is_local)
+
+    for caller in ranges:
+        for g in range(caller.start, caller.end):
+            if quads[g].op != GOSUB:
+                continue
+            name = quads[g].left
+            callee = by_name.get(name)
+            if callee is None or name in recursive or name == caller.name:
+                continue
+            if callee.end - callee.start - 1 > INLINE_LIMIT:
+                continue
+            # Un TAILCALL dentro del cuerpo reemplazaría el marco del llamador
+            if any(q.op == TAILCALL for q in quads[callee.start:callee.end]):
+                continue
+            e = _call_start(quads, g, caller.start)
+            if e is None:
+                continue
+            # Un local (no parámetro) que se lee antes de escribirse tendría
+            # el valor de otra llamada en el marco del llamador
+            if _live_at_entry(quads, callee.start, live_locals) - set(params.get(name, [])):
+                continue
+            mapping = slots.setdefault((caller.name, name), {})
+            if not _frame_slots(quads, callee, params.get(name, []), mapping, extents.setdefault(caller.name, {})):
+                continue
+            return _expand(quads, e, g, callee, mapping)
+    return None
+
+
+def _expand(quads: List, e: int, g: int, callee, mapping: Dict[int, int]) -> List:
+    """
+    Reemplaza ERA ... PARAM ... GOSUB (índices e..g) por copias de los
+    argumentos a los parámetros y el cuerpo de la función con sus locales y
+    temporales en `mapping`; RET salta al cuádruplo que seguía al GOSUB.
+    """
+    # índice en la función -> índice nuevo
+    position: Dict[int, int] = {}
+    size = g - e - 1
+    for j in range(callee.start, callee.end):
+        position[j] = e + size
+        if quads[j].op != ENDFUNC:
+            size += 1
+    after = e + size
+    delta = size - (g - e + 1)
+
+    def shift(target):
+        if target < e:
+            return target
+        if target <= g:
+            return e
+        return target + delta
+
+    body = [Quadruple(ASSIGN, p.left, None, mapping[p.res]) for p in quads[e + 1:g]]
+    for j in range(callee.start, callee.end):
+        q = _rename(quads[j], mapping)
+        if q.op == ENDFUNC:
+            continue
+        if q.op == RET:
+            q = Quadruple(GOTO, None, None, after)
+        elif q.op in JUMP_OPS:
+            q = Quadruple(q.op, q.left, q.right, position.get(q.res, after))
+        elif q.op in CALL_OPS:
+            q = Quadruple(q.op, q.left, q.right, shift(q.res))
+        body.append(q)
+
+    expanded = []
+    for index, q in enumerate(quads):
+        if index == e:
+            expanded.extend(body)
+        if e <= index <= g:
+            continue
+        if q.op in TARGET_OPS and isinstance(q.res, int):
+            q = Quadruple(q.op, q.left, q.right, shift(q.res))
+        expanded.append(q)
+    return expanded
+
+
+def inline_functions(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Expande en línea las llamadas a funciones pequeñas (INLINE_LIMIT) que no
+    son recursivas según el grafo de llamadas de los GOSUB: ERA, PARAM,
+    GOSUB, el marco nuevo y ENDFUNC se vuelven copias de los argumentos y el
+    cuerpo de la función, con sus locales y temporales en casillas nuevas del
+    marco del llamador (las mismas para todas las llamadas a esa función
+    desde ese llamador: nunca están activas dos a la vez). El valor de
+    retorno sigue en su global. Las funciones que quedan sin llamadas las
+    elimina remove_unreachable.
+    """
+    slots: Dict[tuple, Dict[int, int]] = {}
+    while True:
+        expanded = _inline_one(quads, slots)
+        if expanded is None:
+            return quads
+        quads = expanded
+
+
+# ------------------------------------------------------------
+# Llamadas de cola
+# ------------------------------------------------------------
+def _in_tail_position(quads: List, g: int) -> bool:
+    """
+    ¿Lo que sigue al GOSUB quads[g] termina la función (RET o ENDFUNC) sin
+    cambiar nada que vea el llamador? Se permiten GOTO, copias a locales y
+    temporales (el marco se descarta al regresar) y copias que dejan un
+    global con el valor que tenía al regresar la llamada, como
+    (=, ret_f, _, t), (=, t, _, ret_f) de `return(f(...))` dentro de f.
+    """
+    # dirección -> dirección cuyo valor (al regresar la llamada) tiene
+    value: Dict[int, int] = {}
+    seen: Set[int] = set()
+    index = g + 1
+    while index < len(quads) and index not in seen:
+        seen.add(index)
+        q = quads[index]
+        if q.op in (RET, ENDFUNC):
+            return True
+        if q.op == GOTO:
+            index = q.res
+            continue
+        if q.op != ASSIGN:
+            return False
+        source = value.get(q.left, q.left)
+        if is_global(q.res):
+            if source != q.res:
+                return False
+        elif not (is_local(q.res) or is_temp(q.res)):
+            return False
+        value[q.res] = source
+        index += 1
+    return False
+
+
+def _parameter_copies(quads: List, e: int, g: int) -> List:
+    # Copias argumento -> parámetro de los PARAM entre e y g, con el efecto
+    # de asignarlas todas a la vez: un argumento que es un parámetro ya
+    # copiado pasa antes por un temporal. None si no hay temporales libres
+    saved, copies = [], []
+    written: Set[int] = set()
+    for p in quads[e + 1:g]:
+        source = p.left
+        if source in written:
+            segment = next(
+                name for name, (start, size) in SEGMENT_LAYOUT.items() if start <= source < start + size
+            )
+            temp = _fresh_temp(quads + saved, "temp_" + segment.split("_")[1])
+            if temp is None:
+                return None
+            saved.append(Quadruple(ASSIGN, source, None, temp))
+            source = temp
+        if source != p.res:
+            copies.append(Quadruple(ASSIGN, source, None, p.res))
+            written.add(p.res)
+    return saved + copies
+
+
+def _replace(quads: List, first: int, last: int, new: List) -> List:
+    # Cambia quads[first..last] por `new` y renumera los destinos
+    delta = len(new) - (last - first + 1)
+    replaced = []
+    for index, q in enumerate(quads):
+        if index == first:
+            replaced.extend(new)
+        if first <= index <= last:
+            continue
+        if q.op in TARGET_OPS and isinstance(q.res, int) and q.res > first:
+            res = first if q.res <= last else q.res + delta
+            q = Quadruple(q.op, q.left, q.right, res)
+        replaced.append(q)
+    return replaced
+
+
+def _eliminate_one(quads: List) -> Optional[List]:
+    live_locals = live_addresses(quads, is_local)
+    for frange in function_ranges(quads):
+        if frange.name is None:
+            continue
+        for g in range(frange.start, frange.end):
+            if quads[g].op != GOSUB or not _in_tail_position(quads, g):
+                continue
+            e = _call_start(quads, g, frange.start)
+            if e is None:
+                continue
+            # Al regresar al inicio los locales conservan el valor de la
+            # vuelta anterior: solo sirve si se escriben antes de leerse
+            if quads[g].left == frange.name and not (
+                _live_at_entry(quads, frange.start, live_locals) - set(frange.params)
+            ):
+                copies = _parameter_copies(quads, e, g)
+                if copies is not None:
+                    return _replace(quads, e, g, copies + [Quadruple(GOTO, None, None, frange.start)])
+            quads = list(quads)
+            q = quads[g]
+            quads[g] = Quadruple(TAILCALL, q.left, q.right, q.res)
+            return quads
+    return None
+
+
+def eliminate_tail_calls(quads: List, constants: Dict[int, object]) -> List:
+    """
+    Llamadas en posición de cola (_in_tail_position). Si la función se llama
+    a sí misma, ERA ... PARAM ... GOSUB se vuelve la copia de cada argumento
+    a su parámetro y un GOTO al inicio de la función: la recursión con
+    acumulador queda como un ciclo, sin marcos ni ips de regreso nuevos. Las
+    demás (otra función, o la misma si lee un local antes de escribirlo)
+    cambian el GOSUB por TAILCALL: el marco nuevo reemplaza al actual y la
+    función llamada regresa directo al llamador de la actual, así que la
+    pila tampoco crece. Lo que seguía al GOSUB lo quita remove_unreachable.
+    """
+    while True:
+        eliminated = _eliminate_one(quads)
+        if eliminated is None:
+            return quads
+        quads = eliminated
+
+
+# nivel -> pasadas, en orden; cada una es pasada(quads, constants) -> quads
+PASSES = {
+    2: [
+        fold_branches,
+        remove_unreachable,
+        inline_functions,
+        eliminate_tail_calls,
+        remove_unreachable,
+        split_temps,
+        propagate_constants,
+        fold_branches,
+        remove_unreachable,
+        number_values,
+        propagate_copies,
+        forward_results,
+        remove_dead_temps,
+        hoist_invariants,
+        merge_compare_branches,
+        thread_jumps,
+        remove_jumps_to_next,
+        remove_unreachable,
+        allocate_temps,
+    ],
+    3: [
+        reduce_induction_variables,
+        simplify_algebra,
+        propagate_copies,
+        # las copias propagadas dejan constantes nuevas a la vista (x + 0)
+        simplify_algebra,
+        forward_results,
+        remove_dead_temps,
+        # las simplificaciones pueden dejar saltos fusionados entre constantes
+        fold_branches,
+        remove_unreachable,
+        allocate_temps,
+    ],
+}
+
+
+def optimize(program: Program, level: int) -> Program:
+    """
+    Regresa un Program nuevo con las pasadas de los niveles <= level.
+    El Program original no se modifica.
+    """
+    quads = [Quadruple(q.op, q.left, q.right, q.res) for q in program.quadruples]
+    # Algunas pasadas agregan constantes (p. ej. la máscara de x & (2^k - 1))
+    constants = dict(program.constants)
+    for pass_level in sorted(PASSES):
+        if pass_level > level:
+            break
+        for run_pass in PASSES[pass_level]:
+            quads = run_pass(quads, constants)
+
+    return Program(
+        quads,
+        constants,
+        _relocate_functions(program.functions, quads),
+        _debug_names(program.symbols, quads, constants),
+        program.layout,
+    )
+
+
+def _debug_names(symbols: Dict[int, str], quads: List, constants: Dict[int, object]) -> Dict[int, str]:
+    # Alias de debug para los temporales que el listener no llegó a usar y
+    # para las constantes nuevas
+    named = dict(symbols)
+    for addr, value in constants.items():
+        named.setdefault(addr, repr(value))
+    count = sum(1 for addr in symbols if is_temp(addr))
+    for q in quads:
+        for addr in (q.left, q.right, q.res):
+            if is_temp(addr) and addr not in named:
+                named[addr] = f"t{count}"
+                count += 1
+    return named
+
+
+def _relocate_functions(functions: Dict[str, dict], quads: List) -> Dict[str, dict]:
+    # Las llamadas ya tienen el inicio renumerado; las funciones sin llamadas
+    # que se eliminaron quedan sin inicio
+    starts = {q.left: q.res for q in quads if q.op in CALL_OPS}
+    relocated = {}
+    for name, finfo in functions.items():
+        finfo = dict(finfo)
+        if name != "global":
+            finfo["start"] = starts.get(name)
+        relocated[name] = finfo
+    return relocated
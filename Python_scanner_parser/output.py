@@ -0,0 +1,57 @@
+"""
+Canal de salida de la Máquina Virtual para PRINT.
+
+En vez de un print() (una escritura) por cuádruplo, los valores se acumulan
+en memoria y se escriben al destino en bloques de `buffer_size` caracteres;
+el resto se escribe en flush(), que la VM llama al terminar (también si la
+ejecución falla, para no perder lo que ya se imprimió).
+
+Un print(a, b, c) llega como PRINTA a, PRINTA b, PRINT c: los argumentos se
+separan con un espacio y la línea termina en el PRINT final.
+
+El destino puede ser cualquier objeto con write(): sys.stdout (None), un
+io.StringIO o un buffer binario (io.BytesIO, archivo abierto en "wb"); en este
+último caso el texto se codifica con `encoding`.
+"""
+import io
+import sys
+
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class OutputSink:
+    def __init__(self, stream=None, buffer_size: int = DEFAULT_BUFFER_SIZE, encoding: str = "utf-8"):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.parts = []
+        self.size = 0
+
+    def arg(self, value):
+        # Argumento intermedio de un print con varios valores (PRINTA)
+        text = "" if value is None else str(value)
+        self.parts.append(text)
+        self.parts.append(" ")
+        self.size += len(text) + 1
+
+    def line(self, value):
+        # Último argumento (PRINT): cierra la línea
+        text = "" if value is None else str(value)
+        self.parts.append(text)
+        self.parts.append("\n")
+        self.size += len(text) + 1
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.parts:
+            return
+        text = "".join(self.parts)
+        self.parts = []
+        self.size = 0
+        stream = self.stream if self.stream is not None else sys.stdout
+        if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+            stream.write(text.encode(self.encoding))
+        else:
+            stream.write(text)
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional
+
+from execution_memory import frame_sizes
+from linker import link
+from opcodes import OPCODES
+from output import DEFAULT_BUFFER_SIZE
+from py_backend import compile_program
+from virtual_machine import VirtualMachine
+from virtual_memory import SEGMENT_LAYOUT
+
+
+class Program:
+    """
+    Artefacto compilado de Patito: todo lo que la VM necesita para ejecutar
+    sin volver a pasar por el lexer/parser/listener.
+
+    - quadruples: lista de Quadruple
+    - constants: direccion -> valor
+    - functions: mismo formato que FuncDir.functions (metadatos)
+    - symbols: direccion -> nombre amigable (solo depuracion)
+    - layout: mapa de segmentos con el que se asignaron las direcciones
+
+    Un mismo Program se puede ejecutar muchas veces con run(); lo que cada
+    motor prepara a partir de los cuádruplos (decodificación del linker,
+    código Python generado) se guarda en el Program y se reutiliza.
+    """
+
+    def __init__(
+        self,
+        quadruples: List,
+        constants: Dict[int, object],
+        functions: Optional[Dict[str, dict]] = None,
+        symbols: Optional[Dict[int, str]] = None,
+        layout: Optional[Dict[str, tuple]] = None,
+    ):
+        self.quadruples = quadruples
+        self.constants = constants
+        self.functions = functions or {}
+        self.symbols = symbols or {}
+        self.layout = layout or SEGMENT_LAYOUT.copy()
+        self._linked = None
+        self._python_code = None
+        self._frame_sizes = None
+
+    @classmethod
+    def from_listener(cls, listener):
+        return cls(
+            listener.quadruples,
+            listener.constants,
+            listener.funcdir.functions,
+            listener.build_symbol_table(),
+            listener.memory.layout(),
+        )
+
+    # ------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------
+    def run(
+        self,
+        stdout=None,
+        engine: str = "table",
+        memory: Optional[str] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        """
+        Ejecuta el programa en una VM nueva. La salida de PRINT va a `stdout`
+        (cualquier objeto con write(), p. ej. io.StringIO o io.BytesIO);
+        None = sys.stdout. Se escribe en bloques de `buffer_size` caracteres.
+        """
+        if engine == "linked" and self._linked is None:
+            self._linked = link(self.quadruples, self.constants)
+        if engine == "python" and self._python_code is None:
+            self._python_code = compile_program(self.quadruples, self.constants)
+        if self._frame_sizes is None:
+            self._frame_sizes = frame_sizes(self.quadruples)
+
+        vm = VirtualMachine(
+            self.quadruples,
+            self.constants,
+            memory=memory,
+            engine=engine,
+            stdout=stdout,
+            buffer_size=buffer_size,
+            linked=self._linked,
+            python_code=self._python_code,
+            frame_sizes=self._frame_sizes,
+        )
+        vm.run()
+        return vm
+
+    # ------------------------------------------------------------
+    # Depuración
+    # ------------------------------------------------------------
+    def dump_quads(self, stdout=None):
+        # Cuádruplos generados
+        print("\n=== CUADRUPLOS GENERADOS ===", file=stdout)
+        for i, q in enumerate(self.quadruples):
+            print(f"{i:03}  {q}", file=stdout)
+
+        # Cuádruplos amigables con nombres y opcodes
+        print("\n=== CUADRUPLOS (para efectos del DEBUGING) ===", file=stdout)
+        op_names = {v: k for k, v in OPCODES.items()}
+
+        def pretty(addr):
+            if addr is None:
+                return None
+            return self.symbols.get(addr, addr)
+
+        for i, q in enumerate(self.quadruples):
+            op = op_names.get(q.op, q.op)
+            print(f"{i:03}  ({op}, {pretty(q.left)}, {pretty(q.right)}, {pretty(q.res)})", file=stdout)
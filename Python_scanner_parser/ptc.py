@@ -0,0 +1,313 @@
+"""
+Formato binario .ptc: programa de Patito ya compilado.
+
+Guarda cuádruplos, tabla de constantes, directorio de funciones, mapa de
+segmentos y tabla de símbolos para que una corrida de producción solo pague
+el costo de la VM. Todo es little-endian y se lee con struct.unpack_from /
+struct.iter_unpack directamente sobre un memoryview (sin copiar secciones).
+
+Estructura:
+    encabezado   HEADER
+    strings      N x (u32 longitud, bytes utf-8)
+    segmentos    N x SEGMENT      (nombre, inicio, tamaño)
+    constantes   N x CONSTANT     (dir, tipo, payload de 8 bytes)
+    funciones    N x FUNCTION + (params + vars) x VARIABLE
+    cuádruplos   N x QUAD         (op, left, right, res)
+    símbolos     N x SYMBOL       (dir, nombre)
+
+Operandos de cuádruplos: NONE (-1) para None, >= 0 para direcciones/índices
+de cuádruplo y -(2 + i) para el string i (nombres de función en ERA/GOSUB).
+
+FORMAT_VERSION sube con cada opcode nuevo, para que un runtime anterior
+rechace el archivo al cargarlo y no a media ejecución:
+    1  formato inicial
+    2  PRINTA
+    3  GOTOF>, GOTOF<, GOTOF!=, GOTOF==
+    4  &
+    5  TAILCALL
+Al cargar también se rechazan opcodes desconocidos y un mapa de segmentos
+distinto de virtual_memory.SEGMENT_LAYOUT (las direcciones no serían válidas).
+"""
+import mmap
+import struct
+from typing import Dict, List
+
+from opcodes import OPCODES
+from quads import Quadruple
+from program import Program
+from VarInfo import VarInfo
+from virtual_memory import SEGMENT_LAYOUT
+
+
+MAGIC = b"PTC\x00"
+FORMAT_VERSION = 5
+
+HEADER = struct.Struct("<4sHHIIIIII")
+U32 = struct.Struct("<I")
+SEGMENT = struct.Struct("<Iii")
+CONSTANT = struct.Struct("<iB3x8s")
+INT64 = struct.Struct("<q")
+FLOAT64 = struct.Struct("<d")
+FUNCTION = struct.Struct("<IIiiBxHH")
+VARIABLE = struct.Struct("<IIi")
+QUAD = struct.Struct("<iiii")
+SYMBOL = struct.Struct("<iI")
+
+NONE = -1
+
+# Etiquetas de tipo de constante
+TAG_INT, TAG_FLOAT, TAG_BOOL, TAG_STRING, TAG_BIGINT = range(5)
+
+
+class PtcFormatError(Exception):
+    pass
+
+
+class _Strings:
+    def __init__(self):
+        self.items: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def add(self, text: str) -> int:
+        if text not in self.index:
+            self.index[text] = len(self.items)
+            self.items.append(text)
+        return self.index[text]
+
+
+# ------------------------------------------------------------
+# Escritura
+# ------------------------------------------------------------
+def _opt(value) -> int:
+    return NONE if value is None else value
+
+
+def _operand(value, strings: _Strings) -> int:
+    if value is None:
+        return NONE
+    if isinstance(value, str):
+        return -(2 + strings.add(value))
+    return value
+
+
+def _constant(addr: int, value, strings: _Strings) -> bytes:
+    if isinstance(value, bool):
+        return CONSTANT.pack(addr, TAG_BOOL, INT64.pack(int(value)))
+    if isinstance(value, int):
+        if -(2 ** 63) <= value < 2 ** 63:
+            return CONSTANT.pack(addr, TAG_INT, INT64.pack(value))
+        return CONSTANT.pack(addr, TAG_BIGINT, INT64.pack(strings.add(str(value))))
+    if isinstance(value, float):
+        return CONSTANT.pack(addr, TAG_FLOAT, FLOAT64.pack(value))
+    if isinstance(value, str):
+        return CONSTANT.pack(addr, TAG_STRING, INT64.pack(strings.add(value)))
+    raise PtcFormatError(f"Constante no serializable en {addr}: {value!r}")
+
+
+def dumps(program: Program) -> bytes:
+    strings = _Strings()
+
+    segments = [
+        SEGMENT.pack(strings.add(name), start, size)
+        for name, (start, size) in program.layout.items()
+    ]
+    constants = [
+        _constant(addr, value, strings) for addr, value in sorted(program.constants.items())
+    ]
+
+    functions = []
+    for name, finfo in program.functions.items():
+        params = finfo["params"]
+        variables = list(finfo["vars"].values())
+        functions.append(
+            FUNCTION.pack(
+                strings.add(name),
+                strings.add(finfo["ret"]),
+                _opt(finfo["start"]),
+                _opt(finfo["return_addr"]),
+                1 if finfo["has_return"] else 0,
+                len(params),
+                len(variables),
+            )
+        )
+        for p in params:
+            functions.append(
+                VARIABLE.pack(strings.add(p["name"]), strings.add(p["type"]), p["address"])
+            )
+        for v in variables:
+            functions.append(
+                VARIABLE.pack(strings.add(v.name), strings.add(v.var_type), v.address)
+            )
+
+    quads = [
+        QUAD.pack(
+            q.op,
+            _operand(q.left, strings),
+            _operand(q.right, strings),
+            _operand(q.res, strings),
+        )
+        for q in program.quadruples
+    ]
+    symbols = [
+        SYMBOL.pack(addr, strings.add(name)) for addr, name in sorted(program.symbols.items())
+    ]
+
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        0,
+        len(strings.items),
+        len(program.layout),
+        len(program.constants),
+        len(program.functions),
+        len(program.quadruples),
+        len(program.symbols),
+    )
+    string_table = []
+    for text in strings.items:
+        raw = text.encode("utf-8")
+        string_table.append(U32.pack(len(raw)))
+        string_table.append(raw)
+
+    return b"".join(
+        [header] + string_table + segments + constants + functions + quads + symbols
+    )
+
+
+def dump(program: Program, path: str):
+    with open(path, "wb") as fh:
+        fh.write(dumps(program))
+
+
+# ------------------------------------------------------------
+# Lectura
+# ------------------------------------------------------------
+def is_ptc(data) -> bool:
+    return bytes(data[: len(MAGIC)]) == MAGIC
+
+
+def loads(data) -> Program:
+    view = memoryview(data)
+    try:
+        return _read(view)
+    except (struct.error, IndexError, ValueError) as err:
+        # Campos fuera de rango: índices a la tabla de strings, UTF-8
+        # inválido, enteros grandes mal formados, ...
+        raise PtcFormatError(f"Archivo .ptc truncado o corrupto: {err}") from None
+    finally:
+        view.release()
+
+
+def _read(view: memoryview) -> Program:
+    (
+        magic,
+        version,
+        _,
+        n_strings,
+        n_segments,
+        n_constants,
+        n_functions,
+        n_quads,
+        n_symbols,
+    ) = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise PtcFormatError("No es un archivo .ptc de Patito")
+    if version != FORMAT_VERSION:
+        raise PtcFormatError(
+            f"Versión de .ptc no soportada: {version} (se esperaba {FORMAT_VERSION})"
+        )
+    offset = HEADER.size
+
+    strings: List[str] = []
+    for _ in range(n_strings):
+        (length,) = U32.unpack_from(view, offset)
+        offset += U32.size
+        if offset + length > len(view):
+            raise PtcFormatError("Archivo .ptc truncado")
+        strings.append(str(view[offset:offset + length], "utf-8"))
+        offset += length
+
+    def section(fmt: struct.Struct, count: int):
+        nonlocal offset
+        end = offset + fmt.size * count
+        if end > len(view):
+            raise PtcFormatError("Archivo .ptc truncado")
+        # list(): un iterador vivo (p. ej. en el traceback de un error) no
+        # deja cerrar el mmap de load()
+        rows = list(fmt.iter_unpack(view[offset:end]))
+        offset = end
+        return rows
+
+    layout = {
+        strings[name]: (start, size) for name, start, size in section(SEGMENT, n_segments)
+    }
+    if layout != SEGMENT_LAYOUT:
+        raise PtcFormatError("Mapa de segmentos del .ptc distinto al de esta VM")
+
+    constants: Dict[int, object] = {}
+    for addr, tag, payload in section(CONSTANT, n_constants):
+        if tag == TAG_FLOAT:
+            (value,) = FLOAT64.unpack(payload)
+        else:
+            (raw,) = INT64.unpack(payload)
+            if tag == TAG_INT:
+                value = raw
+            elif tag == TAG_BOOL:
+                value = bool(raw)
+            elif tag == TAG_STRING:
+                value = strings[raw]
+            elif tag == TAG_BIGINT:
+                value = int(strings[raw])
+            else:
+                raise PtcFormatError(f"Tipo de constante desconocido: {tag}")
+        constants[addr] = value
+
+    functions: Dict[str, dict] = {}
+    for _ in range(n_functions):
+        name, ret, start, return_addr, has_return, n_params, n_vars = FUNCTION.unpack_from(
+            view, offset
+        )
+        offset += FUNCTION.size
+        params = [
+            {"name": strings[p], "type": strings[t], "address": a}
+            for p, t, a in section(VARIABLE, n_params)
+        ]
+        variables = {}
+        for v, t, a in section(VARIABLE, n_vars):
+            variables[strings[v]] = VarInfo(strings[v], strings[t], a)
+        functions[strings[name]] = {
+            "ret": strings[ret],
+            "vars": variables,
+            "params": params,
+            "start": None if start == NONE else start,
+            "return_addr": None if return_addr == NONE else return_addr,
+            "has_return": bool(has_return),
+        }
+
+    def operand(value):
+        if value == NONE:
+            return None
+        if value < NONE:
+            return strings[-value - 2]
+        return value
+
+    known_ops = set(OPCODES.values())
+    quads = []
+    for op, left, right, res in section(QUAD, n_quads):
+        if op not in known_ops:
+            raise PtcFormatError(f"Opcode desconocido en el .ptc: {op}")
+        quads.append(Quadruple(op, operand(left), operand(right), operand(res)))
+    symbols = {addr: strings[name] for addr, name in section(SYMBOL, n_symbols)}
+
+    return Program(quads, constants, functions, symbols, layout)
+
+
+def load(path: str) -> Program:
+    with open(path, "rb") as fh:
+        try:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Archivo vacío: mmap no acepta longitud 0
+            raise PtcFormatError("Archivo .ptc vacío") from None
+        with mapped:
+            return loads(mapped)
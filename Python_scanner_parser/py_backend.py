@@ -0,0 +1,435 @@
+"""
+Backend que traduce el programa de cuádruplos a código fuente Python.
+
+Cada función de Patito (rangos de cfg.function_ranges) se vuelve una función
+de Python: parámetros, locales y temporales son variables locales, los
+globales son variables del módulo generado y las constantes van como
+literales. ERA/PARAM/GOSUB se convierten en una llamada nativa, así que la
+recursión (fib en tests/test_1.txt) usa la pila de Python en lugar de marcos
+de activación simulados. El valor de retorno sigue pasando por la dirección
+global de retorno, igual que en la VM. Como el límite de recursión de Python
+(~1000) es mucho menor que lo que aguantan los marcos de la VM, run_program
+ejecuta el programa en un hilo con pila grande y RECURSION_LIMIT. Ese hilo se
+crea una sola vez y atiende las corridas de una en una, así que el tamaño de
+pila del módulo threading cambia solo mientras se crea (bajo _WORKER_LOCK) y
+los cambios al límite de recursión de distintos llamadores no se intercalan.
+
+Efecto en todo el proceso: sys.setrecursionlimit es del intérprete, no del
+hilo, así que mientras corre un programa con engine="python" los demás hilos
+también ven RECURSION_LIMIT (una recursión sin fin en ellos agota su pila en
+lugar de lanzar RecursionError). Al terminar cada corrida se restaura el
+límite anterior; `python benchmark.py dispatch` lo verifica.
+
+El flujo de control se reconstruye como if/else y `while True` cuando los
+saltos siguen los patrones que genera el listener (CFG reducible); si una
+función no encaja, esa función se emite como máquina de estados sobre sus
+bloques básicos.
+
+El código objeto se cachea por texto fuente generado.
+"""
+import hashlib
+import queue
+import sys
+import threading
+from typing import Dict, List, Optional, Set
+
+from cfg import (
+    BRANCH_COMPARE,
+    COND_JUMP_OPS,
+    ENDFUNC,
+    ERA,
+    GOSUB,
+    GOTO,
+    JUMP_OPS,
+    PARAM,
+    RET,
+    TAILCALL,
+    FunctionRange,
+    data_operands,
+    function_ranges,
+)
+from execution_memory import SEGMENT_NAMES, default_for_segment
+from linker import OPCODE_NAMES
+from opcodes import OPCODES
+from virtual_memory import SEGMENT_SIZE
+
+
+BINARY_SYMBOLS = {
+    OPCODES["+"]: "+",
+    OPCODES["-"]: "-",
+    OPCODES["*"]: "*",
+    OPCODES["/"]: "/",
+    OPCODES["%"]: "%",
+    OPCODES["&"]: "&",
+    OPCODES[">"]: ">",
+    OPCODES["<"]: "<",
+    OPCODES["!="]: "!=",
+    OPCODES["=="]: "==",
+}
+
+MAIN_NAME = "patito_main"
+
+# Profundidad de llamadas de Patito y pila del hilo que ejecuta el programa
+RECURSION_LIMIT = 1_000_000
+STACK_SIZE = 512 * 1024 * 1024
+
+_CODE_CACHE: Dict[str, object] = {}
+
+# Hilo único que ejecuta los programas: cola de (función, evento de fin)
+_WORKER_LOCK = threading.Lock()
+_worker_jobs: Optional[queue.Queue] = None
+
+
+class TranspileError(Exception):
+    pass
+
+
+class _Unstructured(Exception):
+    # La función no sigue los patrones if/while: se usa máquina de estados
+    pass
+
+
+def _segment_name(addr: int) -> str:
+    name = SEGMENT_NAMES.get(addr // SEGMENT_SIZE) if isinstance(addr, int) else None
+    if name is None:
+        raise TranspileError(f"Direccion {addr} fuera del mapa de memoria")
+    return name
+
+
+class _Loop:
+    def __init__(self, header: int, exit: int):
+        self.header = header
+        self.exit = exit
+
+
+class PythonTranspiler:
+    def __init__(self, quadruples: List, constants: Optional[Dict[int, object]] = None):
+        self.quads = quadruples
+        self.constants = constants or {}
+        self.ranges = function_ranges(quadruples)
+        self.functions = {r.name: r for r in self.ranges if r.name is not None}
+        self.globals_used: Set[int] = set()
+
+    # ------------------------------------------------------------
+    # Operandos
+    # ------------------------------------------------------------
+    def read(self, addr) -> str:
+        if addr in self.constants:
+            return repr(self.constants[addr])
+        return self.var(addr)
+
+    def var(self, addr) -> str:
+        seg = _segment_name(addr)
+        if seg.startswith("const_"):
+            raise TranspileError(f"Direccion {addr} no inicializada en {seg}")
+        if seg.startswith("glob_"):
+            self.globals_used.add(addr)
+            return f"g{addr}"
+        return f"v{addr}"
+
+    # ------------------------------------------------------------
+    # Traducción
+    # ------------------------------------------------------------
+    def transpile(self) -> str:
+        body: List[str] = []
+        for frange in self.ranges:
+            body.extend(self.function(frange))
+            body.append("")
+
+        header = ["# Generado por py_backend a partir de cuadruplos de Patito"]
+        for addr in sorted(self.globals_used):
+            header.append(f"g{addr} = {default_for_segment(_segment_name(addr))!r}")
+        return "\n".join(header + [""] + body)
+
+    def function(self, frange: FunctionRange) -> List[str]:
+        name = MAIN_NAME if frange.name is None else self.func_name(frange.name)
+        params = [self.var(addr) for addr in frange.params]
+
+        try:
+            stmts = self.structured(frange)
+        except _Unstructured:
+            stmts = self.state_machine(frange)
+
+        written_globals = set()
+        local_vars = set()
+        for addr in self.addresses(frange):
+            text = self.var(addr)
+            if text.startswith("g"):
+                if self.writes_global(frange, addr):
+                    written_globals.add(text)
+            elif text not in params:
+                local_vars.add((text, addr))
+
+        lines = [f"def {name}({', '.join(params)}):"]
+        if written_globals:
+            lines.append(f"    global {', '.join(sorted(written_globals))}")
+        # Las lecturas sin asignación previa regresan el default del segmento
+        for text, addr in sorted(local_vars):
+            lines.append(f"    {text} = {default_for_segment(_segment_name(addr))!r}")
+        lines.extend("    " + s for s in stmts)
+        if not stmts or stmts[-1] != "return":
+            lines.append("    return")
+        return lines
+
+    def func_name(self, name: str) -> str:
+        return f"f_{name}"
+
+    def addresses(self, frange: FunctionRange):
+        seen = set()
+        for q in self.quads[frange.start:frange.end]:
+            for addr in self.operands(q):
+                if addr not in seen and addr not in self.constants:
+                    seen.add(addr)
+                    yield addr
+        for addr in frange.params:
+            if addr not in seen:
+                seen.add(addr)
+                yield addr
+
+    def operands(self, q) -> List[int]:
+        return data_operands(q)
+
+    def writes_global(self, frange: FunctionRange, addr: int) -> bool:
+        for q in self.quads[frange.start:frange.end]:
+            if q.op in BINARY_SYMBOLS or q.op == OPCODES["="]:
+                if q.res == addr:
+                    return True
+        return False
+
+    # ------------------------------------------------------------
+    # Sentencias sin control de flujo
+    # ------------------------------------------------------------
+    def simple(self, index: int, pending: List) -> List[str]:
+        q = self.quads[index]
+        op = q.op
+        if op in BINARY_SYMBOLS:
+            return [f"{self.var(q.res)} = {self.read(q.left)} {BINARY_SYMBOLS[op]} {self.read(q.right)}"]
+        if op == OPCODES["="]:
+            return [f"{self.var(q.res)} = {self.read(q.left)}"]
+        if op == OPCODES["PRINT"]:
+            value = '""' if q.left is None else self.read(q.left)
+            return [f"_print({value})"]
+        if op == OPCODES["PRINTA"]:
+            return [f"_print_arg({self.read(q.left)})"]
+        if op == ERA:
+            pending.append((q.res, {}))
+            return []
+        if op == PARAM:
+            if not pending:
+                raise TranspileError(f"PARAM sin ERA en el cuadruplo {index}")
+            pending[-1][1][q.res] = self.read(q.left)
+            return []
+        if op in (GOSUB, TAILCALL):
+            if not pending or pending[-1][0] != q.left:
+                raise TranspileError(f"{OPCODE_NAMES[op]} sin ERA en el cuadruplo {index}")
+            fname, args = pending.pop()
+            frange = self.functions[fname]
+            values = [args.get(addr, self.var(addr)) for addr in frange.params]
+            call = f"{self.func_name(fname)}({', '.join(values)})"
+            # Python no elimina llamadas de cola: TAILCALL es llamada + return
+            return [call] if op == GOSUB else [call, "return"]
+        if op in (RET, ENDFUNC):
+            return ["return"]
+        raise TranspileError(f"Opcode no soportado: {OPCODE_NAMES.get(op, op)}")
+
+    # ------------------------------------------------------------
+    # Flujo estructurado (if / if-else / while)
+    # ------------------------------------------------------------
+    def structured(self, frange: FunctionRange) -> List[str]:
+        self._pending: List = []
+        # header -> índices de los GOTO que regresan a él
+        self._back_edges: Dict[int, List[int]] = {}
+        for j in range(frange.start, frange.end):
+            q = self.quads[j]
+            if q.op == GOTO and q.res is not None and frange.start <= q.res <= j:
+                self._back_edges.setdefault(q.res, []).append(j)
+        return self.emit_range(frange.start, frange.end, None, None)
+
+    def back_edge(self, header: int, hi: int) -> Optional[int]:
+        # GOTO más lejano (dentro del rango) que regresa a `header`
+        found = [j for j in self._back_edges.get(header, ()) if j < hi]
+        return max(found) if found else None
+
+    def cond(self, q, negate: bool) -> str:
+        # Condición con la que NO se toma el salto (o la contraria con negate)
+        if q.op in BRANCH_COMPARE:
+            symbol = BINARY_SYMBOLS[BRANCH_COMPARE[q.op]]
+            value = f"{self.read(q.left)} {symbol} {self.read(q.right)}"
+            return f"not ({value})" if negate else value
+        value = self.read(q.left)
+        return f"not {value}" if negate else value
+
+    def emit_range(self, lo: int, hi: int, loop: Optional[_Loop], skip_header: Optional[int]) -> List[str]:
+        out: List[str] = []
+        i = lo
+        while i < hi:
+            q = self.quads[i]
+
+            if i != skip_header:
+                back = self.back_edge(i, hi)
+                if back is not None:
+                    inner = _Loop(i, back + 1)
+                    body = self.emit_range(i, back, inner, i)
+                    out.append("while True:")
+                    out.extend("    " + s for s in (body or ["pass"]))
+                    i = back + 1
+                    continue
+
+            if q.op in COND_JUMP_OPS:
+                target = q.res
+                if loop and target == loop.exit:
+                    out.append(f"if {self.cond(q, True)}:")
+                    out.append("    break")
+                    i += 1
+                    continue
+                if not (i < target <= hi):
+                    raise _Unstructured()
+                last = self.quads[target - 1]
+                if target - 1 > i and last.op == GOTO and target <= last.res <= hi:
+                    then_body = self.emit_range(i + 1, target - 1, loop, None)
+                    else_body = self.emit_range(target, last.res, loop, None)
+                    out.append(f"if {self.cond(q, False)}:")
+                    out.extend("    " + s for s in (then_body or ["pass"]))
+                    if else_body:
+                        out.append("else:")
+                        out.extend("    " + s for s in else_body)
+                    i = last.res
+                else:
+                    then_body = self.emit_range(i + 1, target, loop, None)
+                    out.append(f"if {self.cond(q, False)}:")
+                    out.extend("    " + s for s in (then_body or ["pass"]))
+                    i = target
+                continue
+
+            if q.op == GOTO:
+                if q.res == i + 1:
+                    i += 1
+                    continue
+                if loop and q.res == loop.header:
+                    out.append("continue")
+                elif loop and q.res == loop.exit:
+                    out.append("break")
+                else:
+                    raise _Unstructured()
+                i += 1
+                continue
+
+            out.extend(self.simple(i, self._pending))
+            i += 1
+        return out
+
+    # ------------------------------------------------------------
+    # Respaldo: máquina de estados por bloques básicos
+    # ------------------------------------------------------------
+    def state_machine(self, frange: FunctionRange) -> List[str]:
+        start, end = frange.start, frange.end
+        leaders = {start}
+        for i in range(start, end):
+            q = self.quads[i]
+            if q.op in JUMP_OPS:
+                leaders.add(q.res)
+                leaders.add(i + 1)
+            elif q.op in (RET, ENDFUNC, TAILCALL):
+                leaders.add(i + 1)
+        leaders = sorted(x for x in leaders if start <= x <= end)
+
+        out = [f"pc = {start}", "while True:"]
+        pending: List = []
+        for idx, leader in enumerate(leaders):
+            if leader == end:
+                continue
+            stop = leaders[idx + 1] if idx + 1 < len(leaders) else end
+            keyword = "if" if idx == 0 else "elif"
+            out.append(f"    {keyword} pc == {leader}:")
+            body: List[str] = []
+            falls_through = True
+            for i in range(leader, stop):
+                q = self.quads[i]
+                if q.op == GOTO:
+                    body.append(f"pc = {q.res}")
+                    body.append("continue")
+                    falls_through = False
+                elif q.op in COND_JUMP_OPS:
+                    body.append(f"if {self.cond(q, True)}:")
+                    body.append(f"    pc = {q.res}")
+                    body.append("    continue")
+                else:
+                    body.extend(self.simple(i, pending))
+                    if q.op in (RET, ENDFUNC, TAILCALL):
+                        falls_through = False
+            if falls_through:
+                body.append(f"pc = {stop}")
+            out.extend("        " + s for s in body)
+        # Saltos fuera de la función (fin del programa) terminan la llamada
+        out.append("    else:")
+        out.append("        return")
+        return out
+
+
+def transpile(quadruples: List, constants: Optional[Dict[int, object]] = None) -> str:
+    return PythonTranspiler(quadruples, constants).transpile()
+
+
+def compile_program(quadruples: List, constants: Optional[Dict[int, object]] = None):
+    """
+    Regresa el código objeto del módulo generado (cacheado por su fuente).
+    """
+    source = transpile(quadruples, constants)
+    key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    code = _CODE_CACHE.get(key)
+    if code is None:
+        code = compile(source, "<patito>", "exec")
+        _CODE_CACHE[key] = code
+    return code
+
+
+def _serve(jobs: queue.Queue):
+    while True:
+        run, done = jobs.get()
+        try:
+            run()
+        finally:
+            done.set()
+
+
+def _jobs() -> queue.Queue:
+    # threading.stack_size aplica a todos los hilos que se crean después:
+    # se cambia solo para crear el hilo y bajo el lock
+    global _worker_jobs
+    with _WORKER_LOCK:
+        if _worker_jobs is None:
+            jobs = queue.Queue()
+            old_stack = threading.stack_size(STACK_SIZE)
+            try:
+                worker = threading.Thread(target=_serve, args=(jobs,), name="patito", daemon=True)
+                worker.start()
+            finally:
+                threading.stack_size(old_stack)
+            _worker_jobs = jobs
+        return _worker_jobs
+
+
+def run_program(code, output):
+    # output: OutputSink de la VM
+    namespace = {"__name__": "patito", "_print": output.line, "_print_arg": output.arg}
+    exec(code, namespace)
+    main = namespace[MAIN_NAME]
+    failure = []
+
+    def target():
+        # El límite de recursión es de todo el intérprete: se restaura al
+        # terminar. Solo el hilo de _serve lo cambia, una corrida a la vez.
+        old_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(old_limit, RECURSION_LIMIT))
+        try:
+            main()
+        except BaseException as err:
+            failure.append(err)
+        finally:
+            sys.setrecursionlimit(old_limit)
+
+    done = threading.Event()
+    _jobs().put((target, done))
+    done.wait()
+    if failure:
+        raise failure[0]
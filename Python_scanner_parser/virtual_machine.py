@@ -1,7 +1,11 @@
 from typing import Callable, Dict, List, Optional
 
-from execution_memory import ExecutionMemory
+from closure_compiler import compile_closures
+from execution_memory import MEMORY_ENGINES, frame_sizes as compute_frame_sizes
+from linker import BINARY_FUNCS, BRANCH_FUNCS, link
 from opcodes import OPCODES
+from output import DEFAULT_BUFFER_SIZE, OutputSink
+from py_backend import compile_program, run_program
 
 
 OPCODE_NAMES = {v: k for k, v in OPCODES.items()}
@@ -11,28 +15,101 @@ class VirtualMachine:
     """
     Ejecuta cuádruplos simples usando el mapa de memoria definido.
     Dentro de esta entrega soporta expresiones, asignaciones, saltos y print.
+
+    `memory` elige el motor de memoria: "dict" (ventanas con diccionarios)
+    o "flat" (buffers preasignados por segmento, resolucion O(1)).
+    `engine` elige el despacho: "table" (lista de handlers indexada por opcode),
+    "reference" (cadena de if en _execute_quad, se conserva como referencia)
+    "linked" (cuádruplos pre-decodificados por linker.link) o "closure"
+    (un closure especializado por cuádruplo); estos dos requieren "flat".
+    "python" traduce el programa a código Python (py_backend) y lo ejecuta con
+    exec(); ese motor no usa la memoria de ejecución.
+    Si no se indica `memory` se usa la que prefiera el motor.
+
+    `stdout` recibe la salida de PRINT (None = sys.stdout al momento de imprimir)
+    a través de un OutputSink con buffer de `buffer_size` caracteres (0 = una
+    escritura por línea); lo pendiente se escribe al terminar run().
+    `linked` / `python_code` / `frame_sizes` permiten reutilizar la
+    decodificación, el código generado o el tamaño de los marcos de una
+    corrida anterior del mismo programa. `pool_frames` reusa los marcos de
+    activación de llamadas que ya regresaron.
     """
 
-    def __init__(self, quadruples: List, constants: Optional[Dict[int, object]] = None):
+    ENGINES = ("table", "reference", "linked", "closure", "python")
+    FLAT_ENGINES = ("linked", "closure")
+
+    def __init__(
+        self,
+        quadruples: List,
+        constants: Optional[Dict[int, object]] = None,
+        memory: Optional[str] = None,
+        engine: str = "table",
+        stdout=None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        linked: Optional[List] = None,
+        python_code=None,
+        frame_sizes: Optional[Dict[str, Dict[int, int]]] = None,
+        pool_frames: bool = True,
+    ):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Motor de ejecucion desconocido: {engine}")
+        if memory is None:
+            memory = "flat" if engine in self.FLAT_ENGINES else "dict"
+        if memory not in MEMORY_ENGINES:
+            raise ValueError(f"Motor de memoria desconocido: {memory}")
+        if engine in self.FLAT_ENGINES and memory != "flat":
+            raise ValueError(f"El motor '{engine}' requiere memory='flat'")
+        self.engine = engine
         self.quadruples = quadruples
         self.ip = 0
-        self.memory = ExecutionMemory(constants or {})
+        if memory == "flat" and frame_sizes is None:
+            frame_sizes = compute_frame_sizes(quadruples)
+        self.memory = MEMORY_ENGINES[memory](constants or {}, frame_sizes, pool_frames)
         self.memory.push_activation("main")
+        self.output = OutputSink(stdout, buffer_size)
+        self.memory.output = self.output
         self.return_ips: List[int] = []
 
-        self.binary_ops: Dict[int, Callable] = {
-            OPCODES["+"]: lambda a, b: a + b,
-            OPCODES["-"]: lambda a, b: a - b,
-            OPCODES["*"]: lambda a, b: a * b,
-            OPCODES["/"]: lambda a, b: a / b,
-            OPCODES["%"]: lambda a, b: a % b,
-            OPCODES[">"]: lambda a, b: a > b,
-            OPCODES["<"]: lambda a, b: a < b,
-            OPCODES["!="]: lambda a, b: a != b,
-            OPCODES["=="]: lambda a, b: a == b,
-        }
+        self.binary_ops: Dict[int, Callable] = dict(BINARY_FUNCS)
+        self.dispatch = self._build_dispatch()
+        # La decodificación ocurre una vez por programa, no por instrucción
+        if engine == "linked" and linked is None:
+            linked = link(quadruples, constants)
+        self.linked = linked
+        self.compiled = (
+            compile_closures(quadruples, self.memory, constants) if engine == "closure" else None
+        )
+        if engine == "python" and python_code is None:
+            python_code = compile_program(quadruples, constants)
+        self.python_code = python_code
 
     def run(self):
+        try:
+            if self.engine == "reference":
+                return self._run_reference()
+            if self.engine == "linked":
+                return self._run_linked()
+            if self.engine == "closure":
+                return self._run_closures()
+            if self.engine == "python":
+                return run_program(self.python_code, self.output)
+            return self._run_table()
+        finally:
+            self.output.flush()
+
+    def _run_table(self):
+        quads = self.quadruples
+        dispatch = self.dispatch
+        end = len(quads)
+        while self.ip < end:
+            quad = quads[self.ip]
+            jump_target = dispatch[quad.op](quad)
+            if jump_target is None:
+                self.ip += 1
+            else:
+                self.ip = jump_target
+
+    def _run_reference(self):
         while self.ip < len(self.quadruples):
             quad = self.quadruples[self.ip]
             jump_target = self._execute_quad(quad)
@@ -41,44 +118,145 @@ class VirtualMachine:
             else:
                 self.ip = jump_target
 
+    def _run_linked(self):
+        code = self.linked
+        mem = self.memory
+        end = len(code)
+        ip = self.ip
+        try:
+            while ip < end:
+                handler, ls, lo, rs, ro, ds, do = code[ip]
+                jump_target = handler(mem, ls, lo, rs, ro, ds, do)
+                ip = ip + 1 if jump_target is None else jump_target
+        finally:
+            self.ip = ip
+
+    def _run_closures(self):
+        code = self.compiled
+        end = len(code)
+        ip = self.ip
+        try:
+            while ip < end:
+                ip = code[ip]()
+        finally:
+            self.ip = ip
+
+    # ------------------------------------------------------------
+    # Tabla de despacho: opcode -> handler(quad)
+    # ------------------------------------------------------------
+    def _build_dispatch(self) -> List[Callable]:
+        table: List[Callable] = [self._unsupported] * (max(OPCODES.values()) + 1)
+        for op, fn in self.binary_ops.items():
+            table[op] = self._binary_handler(fn)
+        for op, fn in BRANCH_FUNCS.items():
+            table[op] = self._branch_handler(fn)
+        table[OPCODES["="]] = self._assign
+        table[OPCODES["GOTO"]] = self._goto
+        table[OPCODES["GOTOF"]] = self._gotof
+        table[OPCODES["PRINT"]] = self._print
+        table[OPCODES["PRINTA"]] = self._print_arg
+        table[OPCODES["ERA"]] = self._era
+        table[OPCODES["PARAM"]] = self._param
+        table[OPCODES["GOSUB"]] = self._gosub
+        table[OPCODES["TAILCALL"]] = self._tailcall
+        table[OPCODES["RET"]] = self._ret
+        table[OPCODES["ENDFUNC"]] = self._endfunc
+        return table
+
+    def _binary_handler(self, fn: Callable) -> Callable:
+        # El operador queda capturado: no hay busqueda en binary_ops por quad
+        load = self.memory.load
+        store = self.memory.store
+
+        def handler(quad):
+            store(quad.res, fn(load(quad.left), load(quad.right)))
+
+        return handler
+
+    def _branch_handler(self, fn: Callable) -> Callable:
+        load = self.memory.load
+
+        def handler(quad):
+            if not fn(load(quad.left), load(quad.right)):
+                return quad.res
+            return None
+
+        return handler
+
+    def _unsupported(self, quad):
+        raise NotImplementedError(f"Opcode no soportado: {OPCODE_NAMES.get(quad.op, quad.op)}")
+
     # ------------------------------------------------------------
     # Ejecucion de instrucciones
     # ------------------------------------------------------------
     def _execute_quad(self, quad):
+        # Motor de referencia: cuerpos en línea, no comparte los handlers
+        # de la tabla de despacho con los que se compara
         op = quad.op
+        memory = self.memory
 
         if op in self.binary_ops:
             return self._binary_op(quad)
 
         if op == OPCODES["="]:
-            return self._assign(quad)
+            memory.store(quad.res, memory.load(quad.left))
+            return None
 
         if op == OPCODES["GOTO"]:
             return quad.res
 
         if op == OPCODES["GOTOF"]:
-            cond = self.memory.load(quad.left)
+            cond = memory.load(quad.left)
+            return quad.res if not cond else None
+
+        if op in BRANCH_FUNCS:
+            # GOTOF fusionado: la comparación de binary_ops y el salto de GOTOF
+            compare = self.binary_ops[OPCODES[OPCODE_NAMES[op][len("GOTOF"):]]]
+            cond = compare(memory.load(quad.left), memory.load(quad.right))
             return quad.res if not cond else None
 
         if op == OPCODES["PRINT"]:
-            value = None if quad.left is None else self.memory.load(quad.left)
-            print(value if value is not None else "")
+            value = None if quad.left is None else memory.load(quad.left)
+            self.output.line(value)
+            return None
+
+        if op == OPCODES["PRINTA"]:
+            self.output.arg(memory.load(quad.left))
             return None
 
         if op == OPCODES["ERA"]:
-            return self._era(quad)
+            tag = quad.res if quad.res is not None else "call"
+            memory.prepare_activation(str(tag))
+            return None
 
         if op == OPCODES["PARAM"]:
-            return self._param(quad)
+            memory.store_pending(quad.res, memory.load(quad.left))
+            return None
 
         if op == OPCODES["GOSUB"]:
-            return self._gosub(quad)
+            self.return_ips.append(self.ip + 1)
+            memory.push_prepared_activation()
+            return quad.res
+
+        if op == OPCODES["TAILCALL"]:
+            if not self.return_ips:
+                raise RuntimeError("TAILCALL sin direccion de retorno")
+            memory.replace_activation()
+            return quad.res
 
         if op == OPCODES["RET"]:
-            return self._ret()
+            if not self.return_ips:
+                raise RuntimeError("RET sin direccion de retorno")
+            target = self.return_ips.pop()
+            memory.pop_activation()
+            return target
 
         if op == OPCODES["ENDFUNC"]:
-            return self._endfunc()
+            if not self.return_ips:
+                raise RuntimeError("ENDFUNC sin direccion de retorno")
+            target = self.return_ips.pop()
+            memory.pop_activation()
+            return target
 
         raise NotImplementedError(f"Opcode no soportado: {OPCODE_NAMES.get(op, op)}")
 
@@ -95,6 +273,22 @@ class VirtualMachine:
         self.memory.store(quad.res, value)
         return None
 
+    def _goto(self, quad):
+        return quad.res
+
+    def _gotof(self, quad):
+        cond = self.memory.load(quad.left)
+        return quad.res if not cond else None
+
+    def _print(self, quad):
+        value = None if quad.left is None else self.memory.load(quad.left)
+        self.output.line(value)
+        return None
+
+    def _print_arg(self, quad):
+        self.output.arg(self.memory.load(quad.left))
+        return None
+
     def _era(self, quad):
         # Prepara un nuevo marco para la llamada
         tag = quad.res if quad.res is not None else "call"
@@ -112,14 +306,22 @@ class VirtualMachine:
         self.memory.push_prepared_activation()
         return quad.res
 
-    def _ret(self):
+    def _tailcall(self, quad):
+        # La función llamada regresa directo a donde iba a regresar la actual:
+        # return_ips no crece y su marco reemplaza al actual
+        if not self.return_ips:
+            raise RuntimeError("TAILCALL sin direccion de retorno")
+        self.memory.replace_activation()
+        return quad.res
+
+    def _ret(self, quad=None):
         if not self.return_ips:
             raise RuntimeError("RET sin direccion de retorno")
         target = self.return_ips.pop()
         self.memory.pop_activation()
         return target
 
-    def _endfunc(self):
+    def _endfunc(self, quad=None):
         if not self.return_ips:
             raise RuntimeError("ENDFUNC sin direccion de retorno")
         target = self.return_ips.pop()
@@ -41,6 +41,9 @@ class MemorySegment:
         self.next += 1
         return addr
 
+    def reset(self):
+        self.next = self.start
+
 
 class VirtualMemory:
     def __init__(self):
@@ -57,6 +60,12 @@ class VirtualMemory:
     def alloc_temp(self, vtype):
         return getattr(self, f"temp_{vtype}").alloc()
 
+    def reset_temps(self):
+        # Los temporales son por activación: cada función empieza desde la base
+        for name in SEGMENT_LAYOUT:
+            if name.startswith("temp_"):
+                getattr(self, name).reset()
+
     def layout(self):
         """
         Devuelve el mapa de segmentos para ser reutilizado por la